@@ -0,0 +1,244 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncHour
+from django.utils import timezone
+
+from theater_api.models import (
+    Performance,
+    Reservation,
+    RollupWatermark,
+    SalesRollupDaily,
+    SalesRollupHourly,
+    Ticket,
+)
+
+WATERMARK = "sales"
+BATCH_SIZE = 50_000
+# How far back recount_recent_sales looks for late booking transactions.
+RECOUNT_WINDOW = timedelta(days=1)
+
+GROUPS = {
+    "play": ("play_id", "play__title"),
+    "hall": ("theater_hall_id", "theater_hall__name"),
+    "genre": ("play__genres__id", "play__genres__name"),
+    "performance": ("performance_id", "performance__show_time"),
+}
+
+
+def _aggregate_tickets(tickets):
+    # Held waitlist seats are counted by the recount once the offer is taken.
+    return (
+        tickets.filter(reservation__status=Reservation.CONFIRMED)
+        .annotate(hour=TruncHour("reservation__created_at"))
+        .values(
+            "hour",
+            "performance_id",
+            "performance__play_id",
+            "performance__theater_hall_id",
+        )
+        .annotate(count=Count("id"), total=Coalesce(Sum("price"), Decimal(0)))
+        .order_by()
+    )
+
+
+def _add_to_hourly(rows):
+    rows = list(rows)
+    existing = {
+        (rollup.hour, rollup.performance_id): rollup
+        for rollup in SalesRollupHourly.objects.filter(
+            performance_id__in={row["performance_id"] for row in rows},
+            hour__in={row["hour"] for row in rows},
+        )
+    }
+    created, updated = [], []
+    for row in rows:
+        rollup = existing.get((row["hour"], row["performance_id"]))
+        if rollup is None:
+            created.append(
+                SalesRollupHourly(
+                    hour=row["hour"],
+                    performance_id=row["performance_id"],
+                    play_id=row["performance__play_id"],
+                    theater_hall_id=row["performance__theater_hall_id"],
+                    tickets=row["count"],
+                    revenue=row["total"],
+                )
+            )
+        else:
+            rollup.tickets += row["count"]
+            rollup.revenue += row["total"]
+            updated.append(rollup)
+    SalesRollupHourly.objects.bulk_create(created)
+    SalesRollupHourly.objects.bulk_update(updated, ["tickets", "revenue"])
+    return {timezone.localdate(row["hour"]) for row in rows}
+
+
+def _rebuild_daily(days):
+    if not days:
+        return
+    ranges = Q()
+    for day in days:
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        ranges |= Q(hour__gte=start, hour__lt=start + timedelta(days=1))
+    SalesRollupDaily.objects.filter(day__in=days).delete()
+    SalesRollupDaily.objects.bulk_create(
+        SalesRollupDaily(**row)
+        for row in SalesRollupHourly.objects.filter(ranges)
+        .annotate(day=TruncDate("hour"))
+        .values("day", "performance_id", "play_id", "theater_hall_id")
+        .annotate(tickets=Sum("tickets"), revenue=Sum("revenue"))
+        .order_by()
+    )
+
+
+def _lock_watermark():
+    RollupWatermark.objects.get_or_create(name=WATERMARK)
+    return RollupWatermark.objects.select_for_update().get(name=WATERMARK)
+
+
+def _recount_dirty(watermark, batch_size):
+    performances = list(
+        Performance.objects.filter(sales_dirty=True)
+        .select_for_update()
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if not performances:
+        return set()
+    stale = SalesRollupHourly.objects.filter(performance_id__in=performances)
+    days = {timezone.localdate(hour) for hour in stale.values_list("hour", flat=True)}
+    stale.delete()
+    days |= _add_to_hourly(
+        _aggregate_tickets(
+            Ticket.objects.filter(
+                performance_id__in=performances, id__lte=watermark.last_ticket_id
+            )
+        )
+    )
+    Performance.objects.filter(id__in=performances).update(sales_dirty=False)
+    return days
+
+
+def refresh_rollups(batch_size=BATCH_SIZE):
+    """Bring the sales rollups up to date, one transaction per batch.
+
+    New tickets are added on top of the rollups in ticket id order, once
+    they are ``SALES_SETTLE_SECONDS`` old. A booking transaction that stays
+    open longer than that commits tickets behind the watermark, and they are
+    only counted by recount_recent_sales. The performances that released
+    tickets since the last run are recounted. Returns the number of tickets
+    added.
+    """
+    added = 0
+    while True:
+        with transaction.atomic():
+            watermark = _lock_watermark()
+            new = Ticket.objects.filter(
+                id__gt=watermark.last_ticket_id,
+                reservation__created_at__lte=timezone.now()
+                - timedelta(seconds=settings.SALES_SETTLE_SECONDS),
+            )
+            boundary = new.order_by("id").values_list("id", flat=True)[
+                batch_size - 1 : batch_size
+            ]
+            upper = (
+                next(iter(boundary), None) or new.aggregate(upper=Max("id"))["upper"]
+            )
+
+            days = _recount_dirty(watermark, batch_size)
+            if upper is not None:
+                batch = Ticket.objects.filter(
+                    id__gt=watermark.last_ticket_id, id__lte=upper
+                )
+                days |= _add_to_hourly(_aggregate_tickets(batch))
+                added += batch.filter(reservation__status=Reservation.CONFIRMED).count()
+                watermark.last_ticket_id = upper
+                watermark.save(update_fields=["last_ticket_id"])
+            _rebuild_daily(days)
+        if upper is None and not days:
+            return added
+
+
+def recount_recent_sales(window=RECOUNT_WINDOW, batch_size=BATCH_SIZE):
+    """Recount the performances with tickets sold within ``window``.
+
+    Picks up the tickets that committed behind the watermark without
+    dropping the rollups like rebuild_rollups does.
+    """
+    Performance.objects.filter(
+        tickets__reservation__created_at__gte=timezone.now() - window
+    ).update(sales_dirty=True)
+    return refresh_rollups(batch_size)
+
+
+def rebuild_rollups(batch_size=BATCH_SIZE):
+    with transaction.atomic():
+        _lock_watermark()
+        SalesRollupDaily.objects.all().delete()
+        SalesRollupHourly.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK).update(last_ticket_id=0)
+        Performance.objects.filter(sales_dirty=True).update(sales_dirty=False)
+    return refresh_rollups(batch_size)
+
+
+def sales(start, end, group_by, daily):
+    """Tickets sold and revenue between ``start`` and ``end`` by sale time."""
+    if daily:
+        rollups = SalesRollupDaily.objects.filter(day__gte=start, day__lte=end)
+        day = F("day")
+    else:
+        rollups = SalesRollupHourly.objects.filter(hour__gte=start, hour__lte=end)
+        day = TruncDate("hour")
+    if group_by == "day":
+        rollups = rollups.annotate(key=day, label=day)
+    else:
+        key, label = GROUPS[group_by]
+        rollups = rollups.annotate(key=F(key), label=F(label))
+    return list(
+        rollups.values("key", "label")
+        .annotate(tickets=Sum("tickets"), revenue=Sum("revenue"))
+        .order_by(F("key").asc(nulls_last=True))
+    )
+
+
+def occupancy(start, end, group_by):
+    """Sold share of the seats of the performances shown in the range.
+
+    Seats held for a waitlist offer are not sold until the offer is taken,
+    so tickets are counted instead of reading ``sold_count``.
+    """
+    confirmed = (
+        Ticket.objects.filter(
+            performance=OuterRef("pk"), reservation__status=Reservation.CONFIRMED
+        )
+        .values("performance")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    performances = Performance.objects.filter(
+        show_time__gte=start, show_time__lte=end
+    ).annotate(confirmed=Coalesce(Subquery(confirmed), 0))
+    if group_by == "day":
+        performances = performances.annotate(
+            key=TruncDate("show_time"), label=TruncDate("show_time")
+        )
+    elif group_by == "performance":
+        performances = performances.annotate(key=F("id"), label=F("show_time"))
+    else:
+        key, label = GROUPS[group_by]
+        performances = performances.annotate(key=F(key), label=F(label))
+    rows = list(
+        performances.values("key", "label")
+        .annotate(
+            performances=Count("id"),
+            sold=Sum("confirmed"),
+            capacity=Sum(F("theater_hall__rows") * F("theater_hall__seats_in_row")),
+        )
+        .order_by(F("key").asc(nulls_last=True))
+    )
+    for row in rows:
+        row["rate"] = round(row["sold"] / row["capacity"], 4) if row["capacity"] else 0
+    return rows
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TheaterApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "theater_api"
+
+    def ready(self):
+        from theater_api import signals, waitlist  # noqa: F401
@@ -0,0 +1,90 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from theater_api.models import (
+    DoorEvent,
+    Performance,
+    Reservation,
+    Ticket,
+    WaitlistEntry,
+)
+from theater_api.tasks import enqueue
+
+BATCH_SIZE = 1000
+
+
+def _delete_returning(queryset, returning):
+    """Delete the rows of ``queryset`` with one DELETE statement.
+
+    Unlike ``QuerySet.delete()`` this does not load the rows into the
+    deletion collector first, so the caller handles rows referencing them.
+    """
+    model = queryset.model
+    select, params = queryset.values("pk").query.sql_with_params()
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    columns = ", ".join(connection.ops.quote_name(column) for column in returning)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {pk} IN ({select}) RETURNING {columns}",
+            params,
+        )
+        return cursor.fetchall()
+
+
+def release_tickets(tickets, batch_size=BATCH_SIZE):
+    """Delete ``tickets`` in batches and give their seats back.
+
+    Every batch is its own transaction that also lowers the sold counters,
+    records the cancellations for the door scanners and removes the
+    reservations it left without tickets. Returns the number of released
+    seats.
+    """
+    released = 0
+    performance_ids = set()
+    while True:
+        with transaction.atomic():
+            rows = _delete_returning(
+                tickets.order_by("pk")[:batch_size],
+                ("reservation_id", "performance_id", "id", "row", "seat"),
+            )
+            if not rows:
+                break
+            sold = Counter(performance_id for _, performance_id, *_ in rows)
+            Performance.adjust_sold_counts(
+                {performance_id: -count for performance_id, count in sold.items()}
+            )
+            DoorEvent.record_cancellations(row[1:] for row in rows)
+            emptied = _delete_returning(
+                Reservation.objects.filter(
+                    pk__in={reservation_id for reservation_id, *_ in rows}
+                ).exclude(Exists(Ticket.objects.filter(reservation=OuterRef("pk")))),
+                ("id",),
+            )
+            if emptied:
+                WaitlistEntry.objects.filter(
+                    reservation_id__in=[reservation_id for reservation_id, in emptied]
+                ).update(reservation=None)
+            released += len(rows)
+            performance_ids.update(sold)
+        if len(rows) < batch_size:
+            break
+
+    if released:
+        enqueue("refresh_popularity", unique=True)
+    for performance_id in sorted(performance_ids):
+        enqueue("offer_released_seats", unique=True, performance_id=performance_id)
+    return released
+
+
+def cancel_reservation(reservation, batch_size=BATCH_SIZE):
+    released = release_tickets(reservation.tickets.all(), batch_size)
+    # A reservation without tickets is not removed by release_tickets.
+    Reservation.objects.filter(pk=reservation.pk).delete()
+    return released
+
+
+def cancel_performance(performance, batch_size=BATCH_SIZE):
+    return release_tickets(Ticket.objects.filter(performance=performance), batch_size)
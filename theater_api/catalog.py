@@ -0,0 +1,75 @@
+from django.db import transaction
+from rest_framework import serializers
+
+from theater_api.models import Actor, Genre, Play
+from theater_api.search import refresh_search_documents
+
+BATCH_SIZE = 1000
+
+
+class PlayImportSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(allow_blank=True)
+    genres = serializers.ListField(
+        child=serializers.CharField(max_length=255), default=list
+    )
+    actors = serializers.ListField(child=serializers.IntegerField(), default=list)
+
+
+def import_plays(items, batch_size=BATCH_SIZE):
+    """Create plays from validated PlayImportSerializer data in bulk.
+
+    Genres are matched by name and created when missing. Actors must exist.
+    Returns the created plays and the number of genres created.
+    """
+    actor_ids = {actor_id for item in items for actor_id in item["actors"]}
+    known_actors = set(
+        Actor.objects.filter(id__in=actor_ids).values_list("id", flat=True)
+    )
+    unknown = sorted(actor_ids - known_actors)
+    if unknown:
+        raise serializers.ValidationError(
+            {"actors": f"Unknown actor ids: {', '.join(map(str, unknown))}."}
+        )
+
+    with transaction.atomic():
+        names = {name for item in items for name in item["genres"]}
+        genre_ids = {}
+        for genre_id, name in (
+            Genre.objects.filter(name__in=names)
+            .order_by("-id")
+            .values_list("id", "name")
+        ):
+            genre_ids[name] = genre_id
+        new_genres = Genre.objects.bulk_create(
+            [Genre(name=name) for name in sorted(names - genre_ids.keys())],
+            batch_size=batch_size,
+        )
+        genre_ids.update((genre.name, genre.id) for genre in new_genres)
+
+        plays = Play.objects.bulk_create(
+            [
+                Play(title=item["title"], description=item["description"])
+                for item in items
+            ],
+            batch_size=batch_size,
+        )
+        Play.genres.through.objects.bulk_create(
+            [
+                Play.genres.through(play_id=play.id, genre_id=genre_id)
+                for play, item in zip(plays, items)
+                for genre_id in {genre_ids[name] for name in item["genres"]}
+            ],
+            batch_size=batch_size,
+        )
+        Play.actors.through.objects.bulk_create(
+            [
+                Play.actors.through(play_id=play.id, actor_id=actor_id)
+                for play, item in zip(plays, items)
+                for actor_id in set(item["actors"])
+            ],
+            batch_size=batch_size,
+        )
+        # bulk_create sends no signals, so the search text is built here.
+        refresh_search_documents([play.id for play in plays])
+    return plays, len(new_genres)
@@ -0,0 +1,94 @@
+import base64
+import hashlib
+import json
+import logging
+import zlib
+from functools import lru_cache
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signing import BadSignature
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+@lru_cache(maxsize=None)
+def private_key() -> Ed25519PrivateKey:
+    """The Ed25519 key from DEVICE_SIGNING_KEY.
+
+    Outside production a missing key is replaced by one that lasts until
+    the process exits.
+    """
+    if settings.DEVICE_SIGNING_KEY:
+        key = serialization.load_pem_private_key(
+            settings.DEVICE_SIGNING_KEY.encode(), password=None
+        )
+        if not isinstance(key, Ed25519PrivateKey):
+            raise ImproperlyConfigured(
+                "DEVICE_SIGNING_KEY must be an Ed25519 private key."
+            )
+        return key
+    if settings.PRODUCTION:
+        raise ImproperlyConfigured("DEVICE_SIGNING_KEY is required in production.")
+    logger.warning("DEVICE_SIGNING_KEY is not set, signing with a temporary key.")
+    return Ed25519PrivateKey.generate()
+
+
+def public_key_bytes() -> bytes:
+    return (
+        private_key()
+        .public_key()
+        .public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+    )
+
+
+def key_id() -> str:
+    return _encode(hashlib.sha256(public_key_bytes()).digest()[:6])
+
+
+def public_key_info():
+    """What a scanner needs to check payloads offline."""
+    return {
+        "algorithm": "Ed25519",
+        "key_id": key_id(),
+        "public_key": _encode(public_key_bytes()),
+    }
+
+
+def dumps(data, purpose: str) -> str:
+    """Sign ``data`` as ``key id.body.signature``.
+
+    The body is zlib-compressed JSON and the signature covers
+    ``purpose:key id.body``, all base64url without padding, so a payload
+    signed for one purpose is not accepted for another.
+    """
+    body = _encode(zlib.compress(json.dumps(data, separators=(",", ":")).encode()))
+    signed = f"{key_id()}.{body}"
+    signature = private_key().sign(f"{purpose}:{signed}".encode())
+    return f"{signed}.{_encode(signature)}"
+
+
+def loads(payload: str, purpose: str):
+    """Data of a payload signed by dumps, or raise BadSignature."""
+    try:
+        signed, signature = payload.rsplit(".", 1)
+        kid, body = signed.split(".")
+        if kid != key_id():
+            raise BadSignature("Unknown signing key.")
+        private_key().public_key().verify(
+            _decode(signature), f"{purpose}:{signed}".encode()
+        )
+        return json.loads(zlib.decompress(_decode(body)))
+    except (ValueError, InvalidSignature, zlib.error) as exc:
+        raise BadSignature("Payload signature does not match.") from exc
@@ -0,0 +1,104 @@
+from django.core.signing import BadSignature
+from django.db import transaction
+from django.utils import timezone
+
+from theater_api import device_signing
+from theater_api.models import DoorEvent, Performance, Reservation, Ticket
+
+SNAPSHOT_SALT = "theater_api.door"
+
+
+def door_version(performance_id):
+    return (
+        Performance.objects.filter(id=performance_id)
+        .values_list("door_version", flat=True)
+        .get()
+    )
+
+
+def snapshot(performance_id):
+    """Sign every ticket of the performance into one compact payload.
+
+    The payload holds the version and [ticket id, row, seat, checked in]
+    rows sorted by ticket id, so scanners can binary search it offline. It
+    is signed with the device key, which scanners check with the public key.
+    The version is read first: changes that land in between are in the
+    tickets as well as in the next delta, and applying them twice is
+    harmless.
+    """
+    version = door_version(performance_id)
+    tickets = [
+        [ticket_id, row, seat, int(checked_in_at is not None)]
+        for ticket_id, row, seat, checked_in_at in Ticket.objects.filter(
+            performance_id=performance_id, reservation__status=Reservation.CONFIRMED
+        )
+        .order_by("id")
+        .values_list("id", "row", "seat", "checked_in_at")
+    ]
+    return {
+        "performance": performance_id,
+        "version": version,
+        "count": len(tickets),
+        "snapshot": device_signing.dumps(
+            {"p": performance_id, "v": version, "t": tickets}, SNAPSHOT_SALT
+        ),
+    }
+
+
+def read_snapshot(payload):
+    try:
+        data = device_signing.loads(payload, SNAPSHOT_SALT)
+    except BadSignature:
+        return None
+    return {"performance": data["p"], "version": data["v"], "tickets": data["t"]}
+
+
+def changes(performance_id, since):
+    """Check-ins and cancellations after version ``since``."""
+    version = door_version(performance_id)
+    delta = {"version": version, "checked_in": [], "cancelled": []}
+    events = (
+        DoorEvent.objects.filter(
+            performance_id=performance_id, version__gt=since, version__lte=version
+        )
+        .order_by("version")
+        .values_list("kind", "ticket_id", "row", "seat")
+    )
+    for kind, ticket_id, row, seat in events:
+        key = "checked_in" if kind == DoorEvent.CHECK_IN else "cancelled"
+        delta[key].append([ticket_id, row, seat])
+    return delta
+
+
+def check_in(performance_id, ticket_ids):
+    """Check in the tickets of the performance that are not checked in yet."""
+    ticket_ids = set(ticket_ids)
+    with transaction.atomic():
+        tickets = (
+            Ticket.objects.filter(
+                performance_id=performance_id,
+                id__in=ticket_ids,
+                reservation__status=Reservation.CONFIRMED,
+            )
+            .order_by("id")
+            .select_for_update()
+        )
+        known = {
+            ticket_id: (row, seat, checked_in_at)
+            for ticket_id, row, seat, checked_in_at in tickets.values_list(
+                "id", "row", "seat", "checked_in_at"
+            )
+        }
+        fresh = sorted(ticket_id for ticket_id, (*_, at) in known.items() if at is None)
+        if fresh:
+            Ticket.objects.filter(id__in=fresh).update(checked_in_at=timezone.now())
+            DoorEvent.record(
+                performance_id,
+                DoorEvent.CHECK_IN,
+                [(ticket_id, *known[ticket_id][:2]) for ticket_id in fresh],
+            )
+    return {
+        "checked_in": fresh,
+        "already_checked_in": sorted(known.keys() - set(fresh)),
+        "unknown": sorted(ticket_ids - known.keys()),
+    }
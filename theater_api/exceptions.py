@@ -0,0 +1,42 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class SeatsAlreadyTaken(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some of the requested seats are already taken."
+    default_code = "seats_taken"
+
+    def __init__(self, seats):
+        super().__init__()
+        self.detail = {"detail": self.default_detail, "seats": seats}
+
+
+class ScheduleConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The theater hall is already booked at that time."
+    default_code = "schedule_conflict"
+
+
+class OfferExpired(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The waitlist offer is no longer available."
+    default_code = "offer_expired"
+
+
+class NotAdmitted(APIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = "This performance has a waiting room, join its queue first."
+    default_code = "not_admitted"
+
+    def __init__(self, performance_id, queue_status=None):
+        super().__init__()
+        self.detail = {"detail": self.default_detail, "performance": performance_id}
+        if queue_status is not None:
+            self.wait = queue_status["wait"]
+            self.detail = {
+                "detail": "Your turn in the waiting room has not come yet.",
+                "performance": performance_id,
+                "position": queue_status["position"],
+                "admit_at": queue_status["admit_at"].isoformat(),
+            }
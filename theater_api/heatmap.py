@@ -0,0 +1,120 @@
+from itertools import islice
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce
+
+from theater_api.models import Performance, Ticket
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+HEATMAP_KEY = "theater_api:heatmap:{}"
+HEATMAP_TIMEOUT = 24 * 60 * 60
+CHUNK_SIZE = 10_000
+
+
+def _seat_counts(tickets):
+    """Yield chunks of (row, seat, count) rows, grouped by the database."""
+    rows = (
+        tickets.values_list("row", "seat")
+        .annotate(count=Count("id"))
+        .order_by()
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    while chunk := list(islice(rows, CHUNK_SIZE)):
+        yield chunk
+
+
+def _add_counts(counts, hall, tickets):
+    """Add the tickets to a flat rows x seats_in_row list of counts.
+
+    Returns the new counts and the number of tickets read.
+    """
+    size = hall.rows * hall.seats_in_row
+    added = 0
+    if np is not None:
+        matrix = np.array(counts, dtype=np.int64)
+        for chunk in _seat_counts(tickets):
+            row, seat, count = np.array(chunk, dtype=np.int64).T
+            added += int(count.sum())
+            # Seats outside the hall are left over from before a resize.
+            inside = (row <= hall.rows) & (seat <= hall.seats_in_row)
+            index = (row[inside] - 1) * hall.seats_in_row + seat[inside] - 1
+            matrix += np.bincount(index, weights=count[inside], minlength=size).astype(
+                np.int64
+            )
+        return matrix.tolist(), added
+    for chunk in _seat_counts(tickets):
+        for row, seat, count in chunk:
+            added += count
+            if row <= hall.rows and seat <= hall.seats_in_row:
+                counts[(row - 1) * hall.seats_in_row + seat - 1] += count
+    return counts, added
+
+
+def hall_heatmap(hall):
+    """How many tickets were sold for each seat of the hall.
+
+    The counts are cached with the highest ticket id they include, so a later
+    call only adds the newer tickets. When the hall's sold_count total no
+    longer matches, tickets were released and the counts are rebuilt.
+    """
+    key = HEATMAP_KEY.format(hall.id)
+    tickets = Ticket.objects.filter(performance__theater_hall=hall)
+    totals = Performance.objects.filter(theater_hall=hall).aggregate(
+        performances=Count("id"), sold=Coalesce(Sum("sold_count"), 0)
+    )
+    last_ticket_id = tickets.aggregate(last=Max("id"))["last"] or 0
+
+    heatmap = cache.get(key)
+    if heatmap is not None:
+        if (heatmap["rows"], heatmap["seats_in_row"]) != (hall.rows, hall.seats_in_row):
+            heatmap = None
+        elif heatmap["last_ticket_id"] == last_ticket_id:
+            if heatmap["sold"] == totals["sold"]:
+                return _present(hall, heatmap, totals)
+            heatmap = None
+
+    if heatmap is not None:
+        counts, added = _add_counts(
+            heatmap["counts"],
+            hall,
+            tickets.filter(id__gt=heatmap["last_ticket_id"], id__lte=last_ticket_id),
+        )
+        if heatmap["sold"] + added != totals["sold"]:
+            heatmap = None
+    if heatmap is None:
+        counts, _ = _add_counts(
+            [0] * (hall.rows * hall.seats_in_row),
+            hall,
+            tickets.filter(id__lte=last_ticket_id),
+        )
+
+    heatmap = {
+        "rows": hall.rows,
+        "seats_in_row": hall.seats_in_row,
+        "last_ticket_id": last_ticket_id,
+        "sold": totals["sold"],
+        "counts": counts,
+    }
+    cache.set(key, heatmap, HEATMAP_TIMEOUT)
+    return _present(hall, heatmap, totals)
+
+
+def _present(hall, heatmap, totals):
+    counts = heatmap["counts"]
+    width = hall.seats_in_row
+    return {
+        "hall": hall.id,
+        "rows": hall.rows,
+        "seats_in_row": width,
+        "performances": totals["performances"],
+        "tickets": sum(counts),
+        "max": max(counts, default=0),
+        "counts": [
+            counts[start : start + width] for start in range(0, len(counts), width)
+        ],
+    }
@@ -0,0 +1,127 @@
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from theater_api.cancellation import cancel_performance
+from theater_api.exceptions import SeatsAlreadyTaken
+from theater_api.models import Performance, Play, Task, TheaterHall
+from theater_api.serializers import ReservationSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress test concurrent reservations of one performance. "
+        "Test data is removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--attempts", type=int, default=2000)
+        parser.add_argument("--seats", type=int, default=2)
+        parser.add_argument("--rows", type=int, default=40)
+        parser.add_argument("--seats-in-row", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        count = options["seats"]
+        requests = [
+            [
+                (row, first + offset)
+                for offset in range(count)
+                for row in [rng.randint(1, options["rows"])]
+            ]
+            for first in (
+                rng.randint(1, options["seats_in_row"] - count + 1)
+                for _ in range(options["attempts"])
+            )
+        ]
+
+        self.stdout.write(
+            f"{options['attempts']} reservations of {count} seats, "
+            f"{options['threads']} threads, "
+            f"{options['rows'] * options['seats_in_row']} seat hall"
+        )
+        self.run(requests, options)
+
+    def run(self, requests, options):
+        hall = TheaterHall.objects.create(
+            name="Benchmark hall",
+            rows=options["rows"],
+            seats_in_row=options["seats_in_row"],
+        )
+        play = Play.objects.create(title="Benchmark", description="")
+        performance = Performance.objects.create(
+            play=play,
+            theater_hall=hall,
+            show_time=timezone.now() + timedelta(days=3650),
+        )
+        users = [
+            get_user_model().objects.create_user(
+                email=f"benchmark-booking-{n}@example.com", password=None
+            )
+            for n in range(options["threads"])
+        ]
+        last_task = Task.objects.order_by("-id").values_list("id", flat=True).first()
+
+        def book(index):
+            payload = {
+                "tickets": [
+                    {"row": row, "seat": seat, "performance": performance.id}
+                    for row, seat in requests[index]
+                ]
+            }
+            started = time.perf_counter()
+            try:
+                serializer = ReservationSerializer(data=payload)
+                serializer.is_valid(raise_exception=True)
+                serializer.save(user=users[index % len(users)])
+                outcome = "booked"
+            except SeatsAlreadyTaken:
+                outcome = "conflict"
+            except Exception:
+                outcome = "error"
+            return outcome, time.perf_counter() - started
+
+        def worker(indexes):
+            try:
+                return [book(index) for index in indexes]
+            finally:
+                connection.close()
+
+        threads = options["threads"]
+        chunks = [range(n, len(requests), threads) for n in range(threads)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = [
+                result for chunk in executor.map(worker, chunks) for result in chunk
+            ]
+        elapsed = time.perf_counter() - started
+
+        try:
+            outcomes = [outcome for outcome, _ in results]
+            latencies = sorted(latency for _, latency in results)
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f"{outcomes.count('booked') / elapsed:.1f} bookings/s  "
+                f"booked {outcomes.count('booked')}, "
+                f"conflicts {outcomes.count('conflict')}, "
+                f"errors {outcomes.count('error')}  "
+                f"p50 {quantiles[49] * 1000:.1f} ms, "
+                f"p95 {quantiles[94] * 1000:.1f} ms, "
+                f"p99 {quantiles[98] * 1000:.1f} ms"
+            )
+        finally:
+            cancel_performance(performance)
+            Task.objects.filter(id__gt=last_task or 0).delete()
+            performance.delete()
+            hall.delete()
+            play.delete()
+            get_user_model().objects.filter(id__in=[user.id for user in users]).delete()
@@ -0,0 +1,96 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from theater_api.cancellation import cancel_performance
+from theater_api.models import Performance, Play, Reservation, TheaterHall, Ticket
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark cancelling a sold-out performance: the ORM cascade delete "
+        "against batched set-based deletes. Nothing is left in the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=40)
+        parser.add_argument("--seats-in-row", type=int, default=50)
+        parser.add_argument("--tickets-per-reservation", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def sell_out(self, options):
+        hall = TheaterHall.objects.create(
+            name="Benchmark hall",
+            rows=options["rows"],
+            seats_in_row=options["seats_in_row"],
+        )
+        performance = Performance.objects.create(
+            play=Play.objects.create(title="Benchmark", description=""),
+            theater_hall=hall,
+            show_time=timezone.now() + timedelta(days=3650),
+        )
+        user = get_user_model().objects.create_user(
+            email="benchmark-cancellation@example.com", password=None
+        )
+        seats = [
+            (row, seat)
+            for row in range(1, hall.rows + 1)
+            for seat in range(1, hall.seats_in_row + 1)
+        ]
+        per_reservation = options["tickets_per_reservation"]
+        reservations = Reservation.objects.bulk_create(
+            Reservation(user=user) for _ in range(0, len(seats), per_reservation)
+        )
+        Ticket.objects.bulk_create(
+            Ticket(
+                row=row,
+                seat=seat,
+                performance=performance,
+                reservation=reservations[index // per_reservation],
+            )
+            for index, (row, seat) in enumerate(seats)
+        )
+        Performance.objects.filter(id=performance.id).update(sold_count=len(seats))
+        return performance, len(seats)
+
+    def measure(self, label, options, cancel):
+        try:
+            with transaction.atomic():
+                performance, sold = self.sell_out(options)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    cancel(performance)
+                    elapsed = time.perf_counter() - started
+                left = Ticket.objects.filter(performance=performance).count()
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(
+            f"{label:<24} {elapsed * 1000:10.1f} ms {len(queries):6} queries "
+            f"({sold - left} of {sold} seats released)"
+        )
+
+    def handle(self, *args, **options):
+        self.measure(
+            "ORM cascade delete",
+            options,
+            lambda performance: Reservation.objects.filter(
+                tickets__performance=performance
+            ).delete(),
+        )
+        self.measure(
+            "batched set-based delete",
+            options,
+            lambda performance: cancel_performance(
+                performance, batch_size=options["batch_size"]
+            ),
+        )
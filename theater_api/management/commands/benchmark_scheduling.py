@@ -0,0 +1,79 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+
+from theater_api.scheduling import HallSchedule
+
+
+class Command(BaseCommand):
+    help = "Benchmark hall overlap checks at a season-scale number of performances."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--performances", type=int, default=20000)
+        parser.add_argument("--halls", type=int, default=10)
+        parser.add_argument("--checks", type=int, default=20000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        season_start = datetime(2026, 9, 1, tzinfo=timezone.utc)
+        slot = timedelta(hours=3)
+        per_hall = options["performances"] // options["halls"]
+
+        intervals = {
+            hall_id: [
+                (
+                    hall_id * per_hall + n,
+                    season_start + n * slot,
+                    season_start + n * slot + timedelta(hours=2),
+                )
+                for n in range(per_hall)
+            ]
+            for hall_id in range(options["halls"])
+        }
+        season_end = season_start + per_hall * slot
+        probes = [
+            (
+                rng.randrange(options["halls"]),
+                season_start + (season_end - season_start) * rng.random(),
+            )
+            for _ in range(options["checks"])
+        ]
+
+        started = time.perf_counter()
+        schedules = {
+            hall_id: HallSchedule(hall_intervals)
+            for hall_id, hall_intervals in intervals.items()
+        }
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        indexed_conflicts = sum(
+            schedules[hall_id].conflict(start, start + timedelta(minutes=30))
+            is not None
+            for hall_id, start in probes
+        )
+        indexed = time.perf_counter() - started
+
+        linear_probes = probes[: max(1, options["checks"] // 100)]
+        started = time.perf_counter()
+        for hall_id, start in linear_probes:
+            end = start + timedelta(minutes=30)
+            any(s < end and e > start for _, s, e in intervals[hall_id])
+        linear = (time.perf_counter() - started) / len(linear_probes) * len(probes)
+
+        self.stdout.write(
+            f"{options['performances']} performances in {options['halls']} halls, "
+            f"{len(probes)} overlap checks ({indexed_conflicts} conflicts)"
+        )
+        self.stdout.write(f"build schedules:         {build * 1000:10.1f} ms")
+        self.stdout.write(
+            f"binary search checks:    {indexed * 1000:10.1f} ms "
+            f"({indexed / len(probes) * 1e6:.2f} us/check)"
+        )
+        self.stdout.write(
+            f"linear scan (estimated): {linear * 1000:10.1f} ms "
+            f"({linear / len(probes) * 1e6:.2f} us/check)"
+        )
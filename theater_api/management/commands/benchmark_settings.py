@@ -0,0 +1,106 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+PROFILES = ("development", "production")
+
+
+class Command(BaseCommand):
+    help = "Compare startup time and request latency of the settings profiles."
+    # Keep the URLconf unimported until throttling is switched off.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--starts", type=int, default=3)
+        parser.add_argument("--path", default="/api/genres/")
+        parser.add_argument("--worker", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["worker"]:
+            self.stdout.write(json.dumps(self.measure_requests(options)))
+            return
+
+        self.stdout.write(
+            f"{'profile':<12} {'startup ms':>11} {'mean ms':>8} "
+            f"{'p50 ms':>8} {'p99 ms':>8}"
+        )
+        for profile in PROFILES:
+            env = {**os.environ, "DJANGO_ENV": profile}
+            startup = min(self.measure_startup(env) for _ in range(options["starts"]))
+            result = subprocess.run(
+                [
+                    sys.executable,
+                    sys.argv[0],
+                    "benchmark_settings",
+                    "--worker",
+                    "--requests",
+                    str(options["requests"]),
+                    "--path",
+                    options["path"],
+                ],
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode:
+                raise CommandError(result.stderr)
+            latencies = json.loads(result.stdout.strip().splitlines()[-1])
+            self.stdout.write(
+                f"{profile:<12} {startup:>11.1f} {latencies['mean']:>8.2f} "
+                f"{latencies['p50']:>8.2f} {latencies['p99']:>8.2f}"
+            )
+
+    @staticmethod
+    def measure_startup(env):
+        started = time.perf_counter()
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "from theater_service.wsgi import application; "
+                "from django.urls import get_resolver; get_resolver().url_patterns",
+            ],
+            env=env,
+            check=True,
+        )
+        return (time.perf_counter() - started) * 1000
+
+    def measure_requests(self, options):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        user = get_user_model().objects.filter(is_active=True).first()
+        if user is None:
+            raise CommandError("Create a user before running the benchmark.")
+
+        rest_framework = {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_CLASSES": []}
+        with override_settings(
+            REST_FRAMEWORK=rest_framework, ALLOWED_HOSTS=["testserver"]
+        ):
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+            client.get(options["path"])
+
+            latencies = []
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                response = client.get(options["path"])
+                latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(
+                    f"GET {options['path']} returned {response.status_code}"
+                )
+
+        latencies.sort()
+        return {
+            "mean": statistics.fmean(latencies),
+            "p50": latencies[len(latencies) // 2],
+            "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        }
@@ -0,0 +1,39 @@
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from drf_spectacular.renderers import OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.validation import validate_schema
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema file served at /api/doc/."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", type=Path, default=None)
+        parser.add_argument("--validate", action="store_true")
+
+    def handle(self, *args, **options):
+        output = options["output"] or settings.OPENAPI_SCHEMA_FILE
+
+        generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+        schema = generator.get_schema(request=None, public=True)
+        if options["validate"]:
+            try:
+                validate_schema(schema)
+            except Exception as e:
+                raise CommandError(e)
+
+        content = OpenApiYamlRenderer().render(schema, renderer_context={})
+        output.parent.mkdir(parents=True, exist_ok=True)
+        partial = output.with_name(output.name + ".partial")
+        partial.write_bytes(content)
+        os.replace(partial, output)
+
+        digest = hashlib.sha256(content).hexdigest()
+        self.stdout.write(
+            self.style.SUCCESS(f"Schema written to {output} (sha256 {digest[:16]})")
+        )
@@ -0,0 +1,40 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from theater_api.catalog import BATCH_SIZE, PlayImportSerializer, import_plays
+
+
+class Command(BaseCommand):
+    help = (
+        "Import plays from a JSON array of objects with title, description, "
+        "genre names and actor ids."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSON file, or - to read stdin")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            if options["path"] == "-":
+                data = json.load(sys.stdin)
+            else:
+                with open(options["path"], encoding="utf-8") as file:
+                    data = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Cannot read {options['path']}: {error}")
+
+        serializer = PlayImportSerializer(data=data, many=True)
+        try:
+            serializer.is_valid(raise_exception=True)
+            plays, genres_created = import_plays(
+                serializer.validated_data, options["batch_size"]
+            )
+        except ValidationError as error:
+            raise CommandError(json.dumps(error.detail))
+        self.stdout.write(
+            f"{len(plays)} plays imported, {genres_created} genres created."
+        )
@@ -0,0 +1,48 @@
+import re
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+STARTUP_SCRIPT = (
+    "from theater_service.wsgi import application; "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+class Command(BaseCommand):
+    help = "Report per-module import time of the web process startup."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=25)
+        parser.add_argument(
+            "--sort", choices=("cumulative", "self"), default="cumulative"
+        )
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+
+        modules = []
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+            if match:
+                own, cumulative, indent, name = match.groups()
+                modules.append((name, int(own), int(cumulative), len(indent) // 2))
+
+        total = sum(own for _, own, _, _ in modules)
+        key = 2 if options["sort"] == "cumulative" else 1
+        modules.sort(key=lambda module: module[key], reverse=True)
+
+        self.stdout.write(f"{'self ms':>9} {'cumulative ms':>14}  module")
+        for name, own, cumulative, _ in modules[: options["limit"]]:
+            self.stdout.write(f"{own / 1000:>9.1f} {cumulative / 1000:>14.1f}  {name}")
+        self.stdout.write(
+            f"{len(modules)} modules imported in {total / 1000:.1f} ms total"
+        )
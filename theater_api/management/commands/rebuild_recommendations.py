@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from theater_api.recommendations import CHUNK_SIZE, TOP_K, rebuild_similarities
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the similar plays table from co-bookings and shared "
+        "genres and actors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, default=TOP_K)
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        stored = rebuild_similarities(options["top_k"], options["chunk_size"])
+        self.stdout.write(f"{stored} play similarities stored.")
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from theater_api.models import Performance, Ticket
+
+
+class Command(BaseCommand):
+    help = "Compare Performance.sold_count with the ticket rows and repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--fix", action="store_true", help="write the recounted values"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        checked = drifted = 0
+        last_id = 0
+
+        while True:
+            with transaction.atomic():
+                performances = Performance.objects.filter(id__gt=last_id).order_by("id")
+                # Locking the batch waits out reservations that already
+                # bumped a counter but have not committed their tickets yet.
+                if options["fix"]:
+                    performances = performances.select_for_update()
+                batch = list(performances.only("id", "sold_count")[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                sold = dict(
+                    Ticket.objects.filter(performance__in=batch)
+                    .values_list("performance_id")
+                    .annotate(count=Count("id"))
+                )
+                stale = []
+                for performance in batch:
+                    actual = sold.get(performance.id, 0)
+                    if performance.sold_count != actual:
+                        self.stdout.write(
+                            f"Performance {performance.id}: "
+                            f"sold_count {performance.sold_count}, tickets {actual}"
+                        )
+                        performance.sold_count = actual
+                        stale.append(performance)
+
+                if stale and options["fix"]:
+                    Performance.objects.bulk_update(stale, ["sold_count"])
+                checked += len(batch)
+                drifted += len(stale)
+
+        action = "repaired" if options["fix"] else "out of date"
+        self.stdout.write(
+            self.style.SUCCESS(f"Checked {checked} performances, {drifted} {action}.")
+        )
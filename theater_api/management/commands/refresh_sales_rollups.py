@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from theater_api.analytics import (
+    BATCH_SIZE,
+    rebuild_rollups,
+    recount_recent_sales,
+    refresh_rollups,
+)
+
+
+class Command(BaseCommand):
+    help = "Add the tickets sold since the last run to the sales rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="drop the rollups and count every ticket again",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="keep refreshing every INTERVAL seconds",
+        )
+        parser.add_argument(
+            "--recount-interval",
+            type=float,
+            default=3600.0,
+            help="with --interval, also recount the last day's sales this often",
+        )
+
+    def handle(self, *args, **options):
+        refresh = rebuild_rollups if options["rebuild"] else refresh_rollups
+        added = refresh(options["batch_size"])
+        self.stdout.write(f"{added} tickets added to the sales rollups.")
+        recounted_at = time.monotonic()
+        while options["interval"]:
+            time.sleep(options["interval"])
+            refresh = refresh_rollups
+            if time.monotonic() - recounted_at >= options["recount_interval"]:
+                refresh, recounted_at = recount_recent_sales, time.monotonic()
+            added = refresh(batch_size=options["batch_size"])
+            self.stdout.write(f"{added} tickets added to the sales rollups.")
@@ -0,0 +1,65 @@
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from theater_api.tasks import prune_tasks, work
+from theater_api.throttling import SlidingWindowRateThrottle
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks in a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+        parser.add_argument(
+            "--prune-interval",
+            type=float,
+            default=300.0,
+            help="seconds between deletions of old finished tasks and throttle windows",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="exit once no task is due instead of polling",
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+
+        def worker():
+            try:
+                return work(stop, options["burst"], options["poll_interval"])
+            finally:
+                connection.close()
+
+        def prune():
+            SlidingWindowRateThrottle.prune()
+            return prune_tasks()
+
+        def pruner():
+            try:
+                pruned = prune()
+                while not options["burst"] and not stop.wait(options["prune_interval"]):
+                    pruned += prune()
+                return pruned
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options["threads"] + 1) as executor:
+            pruning = executor.submit(pruner)
+            futures = [executor.submit(worker) for _ in range(options["threads"])]
+            processed = sum(future.result() for future in futures)
+            stop.set()
+            pruned = pruning.result()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {processed} tasks, pruned {pruned} finished ones."
+            )
+        )
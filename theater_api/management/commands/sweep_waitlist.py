@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from theater_api.models import WaitlistEntry
+from theater_api.waitlist import BATCH_SIZE, expire_offers, offer_seats
+
+
+class Command(BaseCommand):
+    help = "Expire stale waitlist offers and offer free seats to waiting users."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="keep sweeping every INTERVAL seconds",
+        )
+
+    def sweep(self, batch_size):
+        expired = expire_offers(batch_size)
+        performance_ids = (
+            WaitlistEntry.objects.filter(status=WaitlistEntry.WAITING)
+            .filter(
+                performance__sold_count__lt=F("performance__theater_hall__rows")
+                * F("performance__theater_hall__seats_in_row")
+            )
+            .order_by()
+            .values_list("performance_id", flat=True)
+            .distinct()
+        )
+        offered = sum(
+            offer_seats(performance_id, batch_size)
+            for performance_id in performance_ids
+        )
+        self.stdout.write(f"{expired} offers expired, {offered} offers made.")
+
+    def handle(self, *args, **options):
+        self.sweep(options["batch_size"])
+        while options["interval"]:
+            time.sleep(options["interval"])
+            self.sweep(options["batch_size"])
@@ -0,0 +1,179 @@
+import bisect
+import threading
+
+from django.http import HttpResponse
+from drf_spectacular.utils import extend_schema
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.99)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank:
+                if index == len(BUCKETS):
+                    return BUCKETS[-1]
+                lower = BUCKETS[index - 1] if index else 0.0
+                fraction = (rank - seen) / bucket_count
+                return lower + (BUCKETS[index] - lower) * fraction
+            seen += bucket_count
+        return BUCKETS[-1]
+
+
+class RouteStats:
+    def __init__(self):
+        self.duration = Histogram()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.app_seconds = 0.0
+        self.render_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, timings):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats()
+            stats.duration.observe(timings.total)
+            stats.queries += timings.queries
+            stats.db_seconds += timings.db
+            stats.serializer_seconds += timings.serializer
+            stats.app_seconds += timings.app
+            stats.render_seconds += timings.render
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP theater_request_duration_seconds Request duration per route.",
+                "# TYPE theater_request_duration_seconds histogram",
+            ]
+            for route, stats in routes:
+                cumulative = 0
+                for bound, bucket_count in zip(
+                    BUCKETS + ("+Inf",), stats.duration.counts
+                ):
+                    cumulative += bucket_count
+                    lines.append(
+                        f'theater_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'theater_request_duration_seconds_sum{{route="{route}"}} {stats.duration.total:.6f}'
+                )
+                lines.append(
+                    f'theater_request_duration_seconds_count{{route="{route}"}} {stats.duration.count}'
+                )
+
+            lines += [
+                "# HELP theater_request_duration_quantile_seconds Estimated request duration quantiles per route.",
+                "# TYPE theater_request_duration_quantile_seconds gauge",
+            ]
+            for route, stats in routes:
+                for q in QUANTILES:
+                    lines.append(
+                        f'theater_request_duration_quantile_seconds{{route="{route}",quantile="{q}"}} {stats.duration.quantile(q):.6f}'
+                    )
+
+            for name, attribute, kind, help_text in (
+                ("db_queries_total", "queries", "counter", "SQL queries executed."),
+                ("db_seconds_total", "db_seconds", "counter", "Time spent in SQL."),
+                (
+                    "serializer_seconds_total",
+                    "serializer_seconds",
+                    "counter",
+                    "Time spent validating and serializing data.",
+                ),
+                (
+                    "app_seconds_total",
+                    "app_seconds",
+                    "counter",
+                    "Time spent in view code.",
+                ),
+                (
+                    "render_seconds_total",
+                    "render_seconds",
+                    "counter",
+                    "Time spent rendering responses.",
+                ),
+            ):
+                lines.append(f"# HELP theater_{name} {help_text}")
+                lines.append(f"# TYPE theater_{name} {kind}")
+                for route, stats in routes:
+                    value = getattr(stats, attribute)
+                    lines.append(f'theater_{name}{{route="{route}"}} {value:g}')
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class TimedSerializer:
+    """Proxy that times ``is_valid()`` and ``.data`` of a serializer."""
+
+    def __init__(self, serializer, timings):
+        self._serializer = serializer
+        self._timings = timings
+
+    def __getattr__(self, name):
+        return getattr(self._serializer, name)
+
+    def is_valid(self, *args, **kwargs):
+        with self._timings.serializing():
+            return self._serializer.is_valid(*args, **kwargs)
+
+    @property
+    def data(self):
+        with self._timings.serializing():
+            return self._serializer.data
+
+
+class SerializerTimingMixin:
+    """Reports the serializer work of a generic view as its own timing.
+
+    Requests that did not go through RequestMetricsMiddleware, such as the
+    mock requests of schema generation, get the plain serializer.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        timings = getattr(self.request, "timings", None)
+        if timings is None:
+            return serializer
+        return TimedSerializer(serializer, timings)
+
+
+@extend_schema(exclude=True)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,78 @@
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+
+from theater_api.metrics import registry
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.render = 0.0
+        self.render_started = None
+        self.serializer = 0.0
+        self.total = 0.0
+
+    @property
+    def app(self):
+        return max(self.total - self.db - self.render - self.serializer, 0.0)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def serializing(self):
+        """Time serializer work, leaving the SQL it runs to ``db``."""
+        started, db = time.perf_counter(), self.db
+        try:
+            yield
+        finally:
+            self.serializer += time.perf_counter() - started - (self.db - db)
+
+    def rendered(self, response):
+        self.render += time.perf_counter() - self.render_started
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+            f"serializer;dur={self.serializer * 1000:.1f}, "
+            f"app;dur={self.app * 1000:.1f}, "
+            f"render;dur={self.render * 1000:.1f}, "
+            f"total;dur={self.total * 1000:.1f}"
+        )
+
+
+class RequestMetricsMiddleware:
+    """Counts SQL queries and times db, serializer, app and render work.
+
+    The numbers are sent back in a Server-Timing header and aggregated per
+    route into the histograms exposed at /api/_metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = request.timings = RequestTimings()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timings):
+            response = self.get_response(request)
+        timings.total = time.perf_counter() - started
+
+        response["Server-Timing"] = timings.server_timing()
+        match = request.resolver_match
+        if match is not None and match.view_name != "metrics":
+            registry.record(match.view_name, timings)
+        return response
+
+    def process_template_response(self, request, response):
+        request.timings.render_started = time.perf_counter()
+        response.add_post_render_callback(request.timings.rendered)
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.1 on 2026-10-19 05:33
+
+from django.db import migrations, models
+
+
+def set_unlogged(apps, schema_editor):
+    # Throttle counters are disposable, skip the WAL on PostgreSQL.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("ALTER TABLE theater_api_throttlewindow SET UNLOGGED")
+
+
+def set_logged(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("ALTER TABLE theater_api_throttlewindow SET LOGGED")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ThrottleWindow",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("window_index", models.BigIntegerField()),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("previous_hits", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(set_unlogged, set_logged),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-19 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0002_throttlewindow"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="performance",
+            index=models.Index(
+                fields=["show_time", "id"], name="theater_api_show_ti_f4ecb2_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="performance",
+            index=models.Index(
+                fields=["theater_hall", "show_time"],
+                name="theater_api_theater_dc43a8_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.1 on 2026-10-19 05:42
+
+from django.db import migrations, models
+
+
+def fill_search_documents(apps, schema_editor):
+    Play = apps.get_model("theater_api", "Play")
+    plays = list(Play.objects.prefetch_related("actors", "genres"))
+    for play in plays:
+        play.search_document = " ".join(
+            [
+                play.title,
+                play.description,
+                *(
+                    f"{actor.first_name} {actor.last_name}"
+                    for actor in play.actors.all()
+                ),
+                *(genre.name for genre in play.genres.all()),
+            ]
+        ).lower()
+    Play.objects.bulk_update(plays, ["search_document"], batch_size=500)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX theater_api_play_search_vector_idx ON theater_api_play "
+        "USING gin (to_tsvector('simple'::regconfig, COALESCE(search_document, '')))"
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX theater_api_play_search_trgm_idx ON theater_api_play "
+        "USING gin (search_document gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS theater_api_play_search_trgm_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS theater_api_play_search_vector_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0003_performance_show_time_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="play",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
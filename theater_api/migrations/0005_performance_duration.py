@@ -0,0 +1,98 @@
+# Generated by Django 5.2.1 on 2026-10-19 05:58
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_ends_at(apps, schema_editor):
+    Performance = apps.get_model("theater_api", "Performance")
+    Performance.objects.update(ends_at=F("show_time") + F("duration"))
+
+
+def trim_overlaps(apps, schema_editor):
+    """End each existing performance no later than the next one in its hall
+    starts, so the exclusion constraint below can be added."""
+    Performance = apps.get_model("theater_api", "Performance")
+    performances = (
+        Performance.objects.order_by("theater_hall_id", "show_time", "id")
+        .values_list("id", "theater_hall_id", "show_time", "ends_at")
+        .iterator()
+    )
+    clashes, trimmed = [], []
+    previous = None
+    for current in performances:
+        if previous and previous[1] == current[1] and previous[3] > current[2]:
+            if previous[2] == current[2]:
+                clashes.append((previous[0], current[0]))
+            else:
+                trimmed.append(
+                    Performance(
+                        id=previous[0],
+                        duration=current[2] - previous[2],
+                        ends_at=current[2],
+                    )
+                )
+        previous = current
+    if clashes:
+        raise RuntimeError(
+            "Performances starting at the same time in the same hall must be "
+            "moved or deleted before migrating: "
+            + ", ".join(f"{first} and {second}" for first, second in clashes)
+        )
+    Performance.objects.bulk_update(trimmed, ["duration", "ends_at"], batch_size=1000)
+
+
+def add_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'btree_gist'"
+        )
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE theater_api_performance "
+        "ADD CONSTRAINT performance_hall_no_overlap EXCLUDE USING gist "
+        "(theater_hall_id WITH =, tstzrange(show_time, ends_at) WITH &&)"
+    )
+
+
+def drop_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE theater_api_performance "
+        "DROP CONSTRAINT IF EXISTS performance_hall_no_overlap"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0004_play_search_document"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="performance",
+            name="duration",
+            field=models.DurationField(default=datetime.timedelta(seconds=7200)),
+        ),
+        migrations.AddField(
+            model_name="performance",
+            name="ends_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_ends_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="performance",
+            name="ends_at",
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.RunPython(trim_overlaps, migrations.RunPython.noop),
+        migrations.RunPython(add_overlap_constraint, drop_overlap_constraint),
+    ]
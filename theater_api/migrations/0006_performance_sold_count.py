@@ -0,0 +1,31 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_sold_seats(apps, schema_editor):
+    Performance = apps.get_model("theater_api", "Performance")
+    Ticket = apps.get_model("theater_api", "Ticket")
+    sold = (
+        Ticket.objects.filter(performance=OuterRef("pk"))
+        .values("performance")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    Performance.objects.update(sold_count=Coalesce(Subquery(sold), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0005_performance_duration"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="performance",
+            name="sold_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_sold_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.1 on 2026-10-19 06:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0007_task"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PriceTier",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("price", models.DecimalField(decimal_places=2, max_digits=8)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="performance",
+            name="price_multiplier",
+            field=models.DecimalField(decimal_places=2, default=1, max_digits=4),
+        ),
+        migrations.AddField(
+            model_name="theaterhall",
+            name="base_price",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=8),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, editable=False, max_digits=8, null=True
+            ),
+        ),
+        migrations.CreateModel(
+            name="SeatZone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("row_from", models.PositiveIntegerField()),
+                ("row_to", models.PositiveIntegerField()),
+                ("seat_from", models.PositiveIntegerField()),
+                ("seat_to", models.PositiveIntegerField()),
+                (
+                    "theater_hall",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="seat_zones",
+                        to="theater_api.theaterhall",
+                    ),
+                ),
+                (
+                    "tier",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="seat_zones",
+                        to="theater_api.pricetier",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-19 06:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0009_waitlistentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WaitingRoom",
+            fields=[
+                (
+                    "performance",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="waiting_room",
+                        serialize=False,
+                        to="theater_api.performance",
+                    ),
+                ),
+                ("admissions_per_minute", models.PositiveIntegerField()),
+                ("issued", models.PositiveIntegerField(default=0)),
+                ("next_slot", models.FloatField(default=0)),
+            ],
+        ),
+    ]
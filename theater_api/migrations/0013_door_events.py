@@ -0,0 +1,66 @@
+# Generated by Django 5.2.1 on 2026-10-19 06:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0012_play_similarity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="performance",
+            name="door_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="checked_in_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="DoorEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveIntegerField()),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("check_in", "Check-in"), ("cancel", "Cancellation")],
+                        max_length=10,
+                    ),
+                ),
+                ("ticket_id", models.IntegerField()),
+                ("row", models.PositiveIntegerField()),
+                ("seat", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "performance",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="door_events",
+                        to="theater_api.performance",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("performance", "version"),
+                        name="unique_door_event_version",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-19 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0013_door_events"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="deduplicate",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name="task",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("deduplicate", True), ("status", "pending")),
+                fields=("name", "payload"),
+                name="task_unique_pending",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 07:07
+
+from django.db import migrations, models
+
+
+def mark_held_offers(apps, schema_editor):
+    Reservation = apps.get_model("theater_api", "Reservation")
+    Reservation.objects.filter(waitlist_entry__status="offered").update(status="held")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0014_task_unique_pending"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="status",
+            field=models.CharField(
+                choices=[("confirmed", "Confirmed"), ("held", "Held")],
+                default="confirmed",
+                editable=False,
+                max_length=10,
+            ),
+        ),
+        migrations.RunPython(mark_held_offers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0016_queueplace"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="doorevent",
+            name="ticket_id",
+            field=models.BigIntegerField(),
+        ),
+    ]
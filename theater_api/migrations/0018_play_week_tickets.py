@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-19 07:40
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def score_plays(apps, schema_editor):
+    Play = apps.get_model("theater_api", "Play")
+    Performance = apps.get_model("theater_api", "Performance")
+    Play.objects.update(
+        week_tickets=Coalesce(
+            Subquery(
+                Performance.objects.filter(
+                    play=OuterRef("pk"),
+                    show_time__gte=timezone.now() - timedelta(days=7),
+                )
+                .values("play")
+                .annotate(total=Sum("sold_count"))
+                .values("total")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater_api", "0017_door_event_ticket_bigint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="play",
+            name="week_tickets",
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(score_plays, migrations.RunPython.noop),
+    ]
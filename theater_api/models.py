@@ -1,6 +1,9 @@
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import connection, models, transaction
+from django.db.models import F, UniqueConstraint
+from django.db.models.functions import Greatest
 from rest_framework.exceptions import ValidationError
 
 
@@ -28,6 +31,10 @@ class Play(models.Model):
     description = models.TextField()
     genres = models.ManyToManyField(Genre, related_name="plays", blank=True)
     actors = models.ManyToManyField(Actor, related_name="plays", blank=True)
+    # Title, description, actor and genre names, see theater_api.search.
+    search_document = models.TextField(blank=True, default="", editable=False)
+    # Tickets sold for the last week's performances, see theater_api.popularity.
+    week_tickets = models.PositiveIntegerField(default=0, editable=False, db_index=True)
 
     def __str__(self):
         return self.title
@@ -37,11 +44,43 @@ class TheaterHall(models.Model):
     name = models.CharField(max_length=255)
     rows = models.PositiveIntegerField()
     seats_in_row = models.PositiveIntegerField()
+    # Price of the seats not covered by a SeatZone.
+    base_price = models.DecimalField(max_digits=8, decimal_places=2, default=0)
 
     def __str__(self):
         return self.name
 
 
+class PriceTier(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.name} ({self.price})"
+
+
+class SeatZone(models.Model):
+    theater_hall = models.ForeignKey(
+        TheaterHall, on_delete=models.CASCADE, related_name="seat_zones"
+    )
+    tier = models.ForeignKey(
+        PriceTier, on_delete=models.PROTECT, related_name="seat_zones"
+    )
+    row_from = models.PositiveIntegerField()
+    row_to = models.PositiveIntegerField()
+    seat_from = models.PositiveIntegerField()
+    seat_to = models.PositiveIntegerField()
+
+    def __str__(self):
+        return (
+            f"{self.theater_hall}: rows {self.row_from}-{self.row_to}, "
+            f"seats {self.seat_from}-{self.seat_to} ({self.tier.name})"
+        )
+
+
+MAX_PERFORMANCE_DURATION = timedelta(hours=12)
+
+
 class Performance(models.Model):
     play = models.ForeignKey(
         Play, on_delete=models.CASCADE, related_name="performances"
@@ -50,20 +89,117 @@ class Performance(models.Model):
         TheaterHall, on_delete=models.CASCADE, related_name="performances"
     )
     show_time = models.DateTimeField()
+    duration = models.DurationField(default=timedelta(hours=2))
+    # show_time + duration, stored for the hall overlap exclusion constraint.
+    ends_at = models.DateTimeField(editable=False)
+    # Number of tickets sold, kept in step with the Ticket rows,
+    # see adjust_sold_counts and the recount_sold_seats command.
+    sold_count = models.PositiveIntegerField(default=0, editable=False)
+    price_multiplier = models.DecimalField(max_digits=4, decimal_places=2, default=1)
+    # Tickets were released since the sales rollups last counted this
+    # performance, see theater_api.analytics.
+    sales_dirty = models.BooleanField(default=False, editable=False)
+    # Version of the door check-in state, see DoorEvent.
+    door_version = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["show_time", "id"]),
+            models.Index(fields=["theater_hall", "show_time"]),
+        ]
 
     def __str__(self):
         return f"{self.play.title} @ {self.show_time}"
 
+    def save(self, *args, **kwargs):
+        self.ends_at = self.show_time + self.duration
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def adjust_sold_counts(changes: dict):
+        # Ascending ids keep the row lock order the same for every transaction.
+        for performance_id in sorted(changes):
+            delta = changes[performance_id]
+            if delta > 0:
+                Performance.objects.filter(id=performance_id).update(
+                    sold_count=F("sold_count") + delta
+                )
+            elif delta < 0:
+                Performance.objects.filter(id=performance_id).update(
+                    sold_count=Greatest(F("sold_count") + delta, 0), sales_dirty=True
+                )
+
+    @staticmethod
+    def lock_for_booking(performance_ids):
+        """Serialize bookings of the same performances across processes.
+
+        The transaction-level advisory locks are taken in ascending id order
+        and released on commit or rollback.
+        """
+        if connection.vendor != "postgresql":
+            return
+        with connection.cursor() as cursor:
+            for performance_id in sorted(set(performance_ids)):
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [performance_id])
+
+
+class WaitingRoom(models.Model):
+    """Queue mode of a performance, see theater_api.waiting_room."""
+
+    performance = models.OneToOneField(
+        Performance,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="waiting_room",
+    )
+    admissions_per_minute = models.PositiveIntegerField()
+    issued = models.PositiveIntegerField(default=0)
+    # Unix time of the next free admission slot.
+    next_slot = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"Waiting room of {self.performance_id}"
+
+
+class QueuePlace(models.Model):
+    """The admission slot a user holds in a waiting room."""
+
+    room = models.ForeignKey(
+        WaitingRoom, on_delete=models.CASCADE, related_name="places"
+    )
+    user = models.ForeignKey(
+        get_user_model(), on_delete=models.CASCADE, related_name="+"
+    )
+    position = models.PositiveIntegerField()
+    admit_at = models.FloatField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["room", "user"], name="unique_queue_place")
+        ]
+
 
 class Reservation(models.Model):
+    CONFIRMED = "confirmed"
+    # Seats held for a waitlist offer the user has not accepted yet.
+    HELD = "held"
+    STATUS_CHOICES = [(CONFIRMED, "Confirmed"), (HELD, "Held")]
+
     created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey(
         get_user_model(), on_delete=models.CASCADE, related_name="reservations"
     )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=CONFIRMED, editable=False
+    )
 
     def __str__(self):
         return f"Reservation {self.id} by {self.user}"
 
+    @property
+    def total_price(self):
+        return sum(ticket.price or 0 for ticket in self.tickets.all())
+
 
 class Ticket(models.Model):
     row = models.PositiveIntegerField()
@@ -74,6 +210,11 @@ class Ticket(models.Model):
     reservation = models.ForeignKey(
         Reservation, on_delete=models.CASCADE, related_name="tickets"
     )
+    # Seat price at booking time, see theater_api.pricing.
+    price = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True, editable=False
+    )
+    checked_in_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         constraints = [
@@ -87,16 +228,16 @@ class Ticket(models.Model):
         return f"Ticket {self.id} for seat {self.row}-{self.seat}"
 
     @staticmethod
-    def validate_ticket(row: int, seat: int, cinema_hall, error_to_raise):
-        if not (1 <= row <= cinema_hall.rows):
+    def validate_ticket(row: int, seat: int, theater_hall, error_to_raise):
+        if not (1 <= row <= theater_hall.rows):
             raise error_to_raise(
-                {"row": f"Row number must be in range 1 to {cinema_hall.rows}."}
+                {"row": f"Row number must be in range 1 to {theater_hall.rows}."}
             )
 
-        if not (1 <= seat <= cinema_hall.seats_in_row):
+        if not (1 <= seat <= theater_hall.seats_in_row):
             raise error_to_raise(
                 {
-                    "seat": f"Seat number must be in range 1 to {cinema_hall.seats_in_row}."
+                    "seat": f"Seat number must be in range 1 to {theater_hall.seats_in_row}."
                 }
             )
 
@@ -110,4 +251,262 @@ class Ticket(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Performance.adjust_sold_counts({self.performance_id: 1})
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            ticket = (self.performance_id, self.id, self.row, self.seat)
+            result = super().delete(*args, **kwargs)
+            Performance.adjust_sold_counts({self.performance_id: -1})
+            DoorEvent.record_cancellations([ticket])
+        return result
+
+
+class WaitlistEntry(models.Model):
+    WAITING = "waiting"
+    OFFERED = "offered"
+    ACCEPTED = "accepted"
+    EXPIRED = "expired"
+    STATUS_CHOICES = [
+        (WAITING, "Waiting"),
+        (OFFERED, "Offered"),
+        (ACCEPTED, "Accepted"),
+        (EXPIRED, "Expired"),
+    ]
+    MAX_SEATS = 10
+
+    performance = models.ForeignKey(
+        Performance, on_delete=models.CASCADE, related_name="waitlist"
+    )
+    user = models.ForeignKey(
+        get_user_model(), on_delete=models.CASCADE, related_name="waitlist_entries"
+    )
+    seats = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=WAITING)
+    # Holds the offered seats until the user accepts or the offer expires.
+    reservation = models.OneToOneField(
+        Reservation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="waitlist_entry",
+    )
+    offer_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["performance", "status", "created_at"]),
+            models.Index(fields=["status", "offer_expires_at"]),
+        ]
+        constraints = [
+            UniqueConstraint(
+                fields=["performance", "user"],
+                condition=models.Q(status__in=["waiting", "offered"]),
+                name="one_active_waitlist_entry",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} waits for {self.seats} seats of {self.performance_id}"
+
+
+class ThrottleWindow(models.Model):
+    key = models.CharField(max_length=255, primary_key=True)
+    window_index = models.BigIntegerField()
+    hits = models.PositiveIntegerField(default=0)
+    previous_hits = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} @ {self.window_index}: {self.hits}"
+
+
+class Task(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # At most one pending task per name and payload when set.
+    deduplicate = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "payload"],
+                condition=models.Q(status="pending", deduplicate=True),
+                name="task_unique_pending",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class SalesRollupHourly(models.Model):
+    hour = models.DateTimeField()
+    performance = models.ForeignKey(
+        Performance, on_delete=models.CASCADE, related_name="+"
+    )
+    play = models.ForeignKey(Play, on_delete=models.CASCADE, related_name="+")
+    theater_hall = models.ForeignKey(
+        TheaterHall, on_delete=models.CASCADE, related_name="+"
+    )
+    tickets = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["hour", "performance"], name="unique_hourly_sales_rollup"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.hour}: {self.tickets} tickets of {self.performance_id}"
+
+
+class SalesRollupDaily(models.Model):
+    day = models.DateField()
+    performance = models.ForeignKey(
+        Performance, on_delete=models.CASCADE, related_name="+"
+    )
+    play = models.ForeignKey(Play, on_delete=models.CASCADE, related_name="+")
+    theater_hall = models.ForeignKey(
+        TheaterHall, on_delete=models.CASCADE, related_name="+"
+    )
+    tickets = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["day", "performance"], name="unique_daily_sales_rollup"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: {self.tickets} tickets of {self.performance_id}"
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=100, primary_key=True)
+    # Highest Ticket id included in the rollups.
+    last_ticket_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_ticket_id}"
+
+
+class PlaySimilarity(models.Model):
+    play = models.ForeignKey(Play, on_delete=models.CASCADE, related_name="+")
+    similar = models.ForeignKey(Play, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    # Users who booked both plays.
+    cobookings = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["play", "similar"], name="unique_play_similarity"),
+        ]
+
+    def __str__(self):
+        return f"{self.play_id} ~ {self.similar_id} ({self.score:.3f})"
+
+
+class DoorEvent(models.Model):
+    """A check-in or cancellation, numbered by the performance's door_version.
+
+    Door scanners load a snapshot of the tickets and then only fetch the
+    events with a higher version, see theater_api.door.
+    """
+
+    CHECK_IN = "check_in"
+    CANCEL = "cancel"
+    KIND_CHOICES = [(CHECK_IN, "Check-in"), (CANCEL, "Cancellation")]
+
+    performance = models.ForeignKey(
+        Performance, on_delete=models.CASCADE, related_name="door_events"
+    )
+    version = models.PositiveIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Not a foreign key, cancelled tickets are deleted.
+    ticket_id = models.BigIntegerField()
+    row = models.PositiveIntegerField()
+    seat = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["performance", "version"], name="unique_door_event_version"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} of ticket {self.ticket_id} (v{self.version})"
+
+    @staticmethod
+    def record(performance_id, kind, tickets):
+        """Add events for (ticket id, row, seat) tuples in the open transaction.
+
+        Bumping door_version locks the performance row until the commit, so
+        versions become visible in order and a reader never skips one.
+        """
+        tickets = list(tickets)
+        if not tickets:
+            return
+        table = connection.ops.quote_name(Performance._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET door_version = door_version + %s "
+                f"WHERE id = %s RETURNING door_version",
+                [len(tickets), performance_id],
+            )
+            bumped = cursor.fetchone()
+        if bumped is None:
+            return
+        version = bumped[0]
+        first = version - len(tickets) + 1
+        DoorEvent.objects.bulk_create(
+            DoorEvent(
+                performance_id=performance_id,
+                version=first + offset,
+                kind=kind,
+                ticket_id=ticket_id,
+                row=row,
+                seat=seat,
+            )
+            for offset, (ticket_id, row, seat) in enumerate(tickets)
+        )
+
+    @staticmethod
+    def record_cancellations(tickets):
+        """Record (performance id, ticket id, row, seat) tuples as cancelled."""
+        by_performance = {}
+        for performance_id, *ticket in tickets:
+            by_performance.setdefault(performance_id, []).append(ticket)
+        # Same lock order as Performance.adjust_sold_counts.
+        for performance_id in sorted(by_performance):
+            DoorEvent.record(
+                performance_id, DoorEvent.CANCEL, by_performance[performance_id]
+            )
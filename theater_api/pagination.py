@@ -0,0 +1,19 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PerformanceCursorPagination(CursorPagination):
+    ordering = ("show_time", "id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class TicketHistoryPagination(CursorPagination):
+    """Keyset pages of ticket_history rows, soonest upcoming or latest past first."""
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        return ("-show_time", "-id") if view.past else ("show_time", "id")
@@ -1,5 +1,7 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+from theater_api.waiting_room import check_admission
+
 
 class IsAdminAllOrReadOnly(BasePermission):
     def has_permission(self, request, view):
@@ -7,3 +9,15 @@ class IsAdminAllOrReadOnly(BasePermission):
             return True
 
         return request.user and request.user.is_staff
+
+
+class AdmittedFromWaitingRoom(BasePermission):
+    """Requires an admitted queue token for performances in queue mode.
+
+    The view lists the performances of the request in
+    ``waiting_room_performances(request)``.
+    """
+
+    def has_permission(self, request, view):
+        check_admission(request, view.waiting_room_performances(request))
+        return True
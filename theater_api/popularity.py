@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from theater_api.models import Performance, Play
+
+
+def refresh_week_most_popular():
+    """Store on every play the tickets sold for its last week's performances.
+
+    The scores live in the database so every process reads the same ranking,
+    and only plays whose score changed are written.
+    """
+    seven_days_ago = timezone.now() - timedelta(days=7)
+    week_tickets = Coalesce(
+        Subquery(
+            Performance.objects.filter(
+                play=OuterRef("pk"), show_time__gte=seven_days_ago
+            )
+            .values("play")
+            .annotate(total=Sum("sold_count"))
+            .values("total")
+        ),
+        0,
+    )
+    Play.objects.exclude(week_tickets=week_tickets).update(week_tickets=week_tickets)
+    return week_most_popular()
+
+
+def week_most_popular():
+    # The reservation tasks refresh the scores after every booking.
+    return Play.objects.order_by("-week_tickets", "id").values("id", "title").first()
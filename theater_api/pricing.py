@@ -0,0 +1,81 @@
+from array import array
+from decimal import Decimal
+
+from theater_api.caches import TTLCache
+from theater_api.models import SeatZone
+
+CENT = Decimal("0.01")
+
+
+class SeatPriceMap:
+    """Seat prices of one hall compiled into a flat tier index per seat.
+
+    ``tiers[0]`` is the hall base price, ``tiers[i]`` the price of the i-th
+    zoned tier, all in cents. Zones later in id order win where they overlap.
+    """
+
+    __slots__ = ("hall_id", "rows", "seats_in_row", "tiers", "seat_tiers")
+
+    def __init__(self, hall, zones):
+        self.hall_id = hall.id
+        self.rows = hall.rows
+        self.seats_in_row = hall.seats_in_row
+        tiers = [int(hall.base_price * 100)]
+        tier_index = {}
+        self.seat_tiers = array("H", bytes(2 * hall.rows * hall.seats_in_row))
+        for zone in zones:
+            if zone.tier_id not in tier_index:
+                tier_index[zone.tier_id] = len(tiers)
+                tiers.append(int(zone.tier.price * 100))
+            index = tier_index[zone.tier_id]
+            for row in range(zone.row_from, min(zone.row_to, hall.rows) + 1):
+                start = (row - 1) * hall.seats_in_row
+                first = start + zone.seat_from - 1
+                last = start + min(zone.seat_to, hall.seats_in_row)
+                self.seat_tiers[first:last] = array("H", [index]) * (last - first)
+        self.tiers = tuple(tiers)
+
+    @classmethod
+    def compile(cls, hall):
+        zones = SeatZone.objects.filter(theater_hall=hall).select_related("tier")
+        return cls(hall, zones.order_by("id"))
+
+    def cents(self, row, seat):
+        return self.tiers[self.seat_tiers[(row - 1) * self.seats_in_row + seat - 1]]
+
+    def price(self, row, seat, multiplier=1):
+        return (Decimal(self.cents(row, seat)) * multiplier / 100).quantize(CENT)
+
+
+class PriceMapCache:
+    """Compiled SeatPriceMap objects keyed by hall id.
+
+    Signals only invalidate the maps of the process that saved the change,
+    so the short ttl bounds how long other processes keep old prices.
+    """
+
+    def __init__(self, maxsize=256, ttl=60):
+        self._maps = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, hall) -> SeatPriceMap:
+        price_map = self._maps.get(hall.id)
+        if price_map is None or (price_map.rows, price_map.seats_in_row) != (
+            hall.rows,
+            hall.seats_in_row,
+        ):
+            price_map = SeatPriceMap.compile(hall)
+            self._maps.set(hall.id, price_map)
+        return price_map
+
+    def price(self, performance, row, seat):
+        price_map = self.get(performance.theater_hall)
+        return price_map.price(row, seat, performance.price_multiplier)
+
+    def invalidate_hall(self, hall_id):
+        self._maps.pop(hall_id)
+
+    def clear(self):
+        self._maps.clear()
+
+
+price_maps = PriceMapCache()
@@ -0,0 +1,174 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import groupby, permutations
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from theater_api.caches import TTLCache
+from theater_api.models import Play, PlaySimilarity, Ticket
+
+TOP_K = 20
+CHUNK_SIZE = 10_000
+# Share of the score that comes from co-bookings, the rest from shared
+# genres and actors.
+COBOOKING_WEIGHT = 0.7
+# Users who booked more plays than this say little about any pair of them
+# and cost quadratic work, so they are left out.
+MAX_USER_PLAYS = 200
+# Likewise for genres and actors shared by more plays than this.
+MAX_FEATURE_PLAYS = 500
+
+
+def _user_plays(chunk_size):
+    """Yield the set of plays booked by each user, one user at a time."""
+    pairs = (
+        Ticket.objects.values_list("reservation__user_id", "performance__play_id")
+        .distinct()
+        .order_by("reservation__user_id")
+        .iterator(chunk_size=chunk_size)
+    )
+    for _, group in groupby(pairs, key=itemgetter(0)):
+        yield {play_id for _, play_id in group}
+
+
+def cobooking_scores(chunk_size=CHUNK_SIZE):
+    """Cosine similarity of plays by the users who booked them.
+
+    Returns the sparse co-occurrence counts and the scores, both as
+    {play_id: {other_play_id: value}}.
+    """
+    bookers = Counter()
+    together = defaultdict(Counter)
+    for plays in _user_plays(chunk_size):
+        if len(plays) > MAX_USER_PLAYS:
+            continue
+        bookers.update(plays)
+        for play_id, other_id in permutations(plays, 2):
+            together[play_id][other_id] += 1
+    scores = {
+        play_id: {
+            other_id: count / math.sqrt(bookers[play_id] * bookers[other_id])
+            for other_id, count in others.items()
+        }
+        for play_id, others in together.items()
+    }
+    return together, scores
+
+
+def content_scores(chunk_size=CHUNK_SIZE):
+    """Jaccard similarity of plays by their genres and actors.
+
+    Genres and actors with more than MAX_FEATURE_PLAYS plays still count
+    towards each play's feature total but do not pair the plays up.
+    """
+    features = defaultdict(set)
+    for through, field in (
+        (Play.genres.through, "genre_id"),
+        (Play.actors.through, "actor_id"),
+    ):
+        for play_id, feature_id in through.objects.values_list(
+            "play_id", field
+        ).iterator(chunk_size=chunk_size):
+            features[play_id].add((field, feature_id))
+
+    holders = defaultdict(list)
+    for play_id, play_features in features.items():
+        for feature in play_features:
+            holders[feature].append(play_id)
+    shared = defaultdict(Counter)
+    for plays in holders.values():
+        if len(plays) > MAX_FEATURE_PLAYS:
+            continue
+        for play_id, other_id in permutations(plays, 2):
+            shared[play_id][other_id] += 1
+    return {
+        play_id: {
+            other_id: count / (len(features[play_id]) + len(features[other_id]) - count)
+            for other_id, count in others.items()
+        }
+        for play_id, others in shared.items()
+    }
+
+
+def rebuild_similarities(top_k=TOP_K, chunk_size=CHUNK_SIZE):
+    """Recompute the top_k similar plays of every play.
+
+    Returns the number of similarities stored.
+    """
+    together, cobooked = cobooking_scores(chunk_size)
+    content = content_scores(chunk_size)
+    similarities = []
+    for play_id in cobooked.keys() | content.keys():
+        by_bookings = cobooked.get(play_id, {})
+        by_content = content.get(play_id, {})
+        scores = {
+            other_id: COBOOKING_WEIGHT * by_bookings.get(other_id, 0)
+            + (1 - COBOOKING_WEIGHT) * by_content.get(other_id, 0)
+            for other_id in by_bookings.keys() | by_content.keys()
+        }
+        for other_id, score in heapq.nlargest(top_k, scores.items(), key=itemgetter(1)):
+            similarities.append(
+                PlaySimilarity(
+                    play_id=play_id,
+                    similar_id=other_id,
+                    score=score,
+                    cobookings=together[play_id][other_id],
+                )
+            )
+    with transaction.atomic():
+        PlaySimilarity.objects.all().delete()
+        PlaySimilarity.objects.bulk_create(similarities, batch_size=chunk_size)
+    similar_plays.clear()
+    return len(similarities)
+
+
+class SimilarityTable:
+    """The stored top-K similar plays of every play, kept in memory."""
+
+    def __init__(self, ttl=600):
+        self._table = TTLCache(maxsize=1, ttl=ttl)
+
+    def _load(self):
+        table = self._table.get("table")
+        if table is None:
+            table = defaultdict(list)
+            for play_id, similar_id, score in PlaySimilarity.objects.order_by(
+                "play_id", "-score"
+            ).values_list("play_id", "similar_id", "score"):
+                table[play_id].append((similar_id, score))
+            table = dict(table)
+            self._table.set("table", table)
+        return table
+
+    def similar(self, play_id, limit=TOP_K):
+        return self._load().get(play_id, [])[:limit]
+
+    def recommend(self, play_ids, limit=TOP_K):
+        """Plays most similar to all of ``play_ids`` together."""
+        table = self._load()
+        scores = Counter()
+        for play_id in play_ids:
+            for similar_id, score in table.get(play_id, ()):
+                if similar_id not in play_ids:
+                    scores[similar_id] += score
+        return scores.most_common(limit)
+
+    def clear(self):
+        self._table.clear()
+
+
+similar_plays = SimilarityTable()
+
+
+def most_booked_plays(exclude=(), limit=TOP_K):
+    """Fallback for users without bookings: the plays with most tickets sold."""
+    return list(
+        Play.objects.exclude(id__in=exclude)
+        .annotate(sold=Coalesce(Sum("performances__sold_count"), 0))
+        .order_by("-sold", "id")
+        .values_list("id", flat=True)[:limit]
+    )
@@ -0,0 +1,83 @@
+import bisect
+from collections import defaultdict
+
+from theater_api.models import MAX_PERFORMANCE_DURATION, Performance
+
+
+class HallSchedule:
+    """Performances of one hall as non-overlapping intervals sorted by start.
+
+    As intervals never overlap, sorting by start also sorts them by end, so
+    the only candidate for a conflict is the last one starting before the
+    new interval ends: both checks and lookups are a binary search.
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        self._ids = []
+        for performance_id, start, end in sorted(intervals, key=lambda i: i[1]):
+            self.add(performance_id, start, end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def conflict(self, start, end, exclude_id=None):
+        """Id of a performance overlapping [start, end), if any."""
+        index = bisect.bisect_left(self._starts, end) - 1
+        while index >= 0 and self._ends[index] > start:
+            if self._ids[index] != exclude_id:
+                return self._ids[index]
+            index -= 1
+        return None
+
+    def add(self, performance_id, start, end):
+        # list.insert shifts the tail, so this is O(n) rather than O(log n).
+        # Halls hold a few thousand performances at most, where a memmove
+        # beats a tree; intervals loaded in start order only append.
+        index = bisect.bisect_left(self._starts, start)
+        self._starts.insert(index, start)
+        self._ends.insert(index, end)
+        self._ids.insert(index, performance_id)
+
+
+def find_conflict(hall_id, start, end, exclude_id=None):
+    """Performance of the hall overlapping [start, end), read from the
+    (theater_hall, show_time) index within the longest possible duration."""
+    return (
+        Performance.objects.filter(
+            theater_hall_id=hall_id,
+            show_time__gt=start - MAX_PERFORMANCE_DURATION,
+            show_time__lt=end,
+            ends_at__gt=start,
+        )
+        .exclude(id=exclude_id)
+        .values_list("id", flat=True)
+        .first()
+    )
+
+
+def load_schedules(windows):
+    """HallSchedule per hall holding the performances around the given
+    {hall_id: (earliest start, latest end)} windows, one query per hall."""
+    schedules = {}
+    for hall_id, (start, end) in windows.items():
+        schedules[hall_id] = HallSchedule(
+            Performance.objects.filter(
+                theater_hall_id=hall_id,
+                show_time__gt=start - MAX_PERFORMANCE_DURATION,
+                show_time__lt=end,
+            ).values_list("id", "show_time", "ends_at")
+        )
+    return schedules
+
+
+def schedule_windows(items):
+    windows = defaultdict(lambda: (None, None))
+    for hall_id, start, end in items:
+        earliest, latest = windows[hall_id]
+        windows[hall_id] = (
+            start if earliest is None else min(earliest, start),
+            end if latest is None else max(latest, end),
+        )
+    return dict(windows)
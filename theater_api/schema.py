@@ -0,0 +1,68 @@
+import hashlib
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_safe
+
+SchemaArtifact = namedtuple("SchemaArtifact", ["content", "etag"])
+
+_artifacts = {}
+_artifacts_lock = threading.Lock()
+
+
+def lazy_view(view_path, **initkwargs):
+    """Defer importing a class-based view until its first request."""
+    view = None
+
+    @csrf_exempt
+    def wrapper(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(view_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+live_schema_view = lazy_view("drf_spectacular.views.SpectacularAPIView")
+
+
+def load_schema(path):
+    """Read a generated schema once per process; None if it doesn't exist."""
+    artifact = _artifacts.get(path)
+    if artifact is None:
+        with _artifacts_lock:
+            artifact = _artifacts.get(path)
+            if artifact is None:
+                try:
+                    content = path.read_bytes()
+                except FileNotFoundError:
+                    return None
+                artifact = SchemaArtifact(content, hashlib.sha256(content).hexdigest())
+                _artifacts[path] = artifact
+    return artifact
+
+
+def schema_etag(request, *args, **kwargs):
+    artifact = load_schema(settings.OPENAPI_SCHEMA_FILE)
+    return artifact.etag if artifact else None
+
+
+@require_safe
+@condition(etag_func=schema_etag)
+def schema_view(request, *args, **kwargs):
+    artifact = load_schema(settings.OPENAPI_SCHEMA_FILE)
+    if artifact is None:
+        if settings.DEBUG:
+            return live_schema_view(request, *args, **kwargs)
+        raise Http404("The OpenAPI schema has not been generated.")
+
+    response = HttpResponse(
+        artifact.content, content_type="application/vnd.oai.openapi"
+    )
+    response["Cache-Control"] = "public, no-cache"
+    return response
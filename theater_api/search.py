@@ -0,0 +1,203 @@
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+
+from theater_api.models import Play
+
+TOKEN_RE = re.compile(r"\w+")
+TITLE_WEIGHT = 3.0
+PREFIX_WEIGHT = 0.8
+TYPO_WEIGHT = 0.5
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def refresh_search_documents(play_ids):
+    """Rebuild the denormalized search text of the given plays in 3 queries."""
+    play_ids = set(play_ids)
+    if not play_ids:
+        return
+
+    actors = defaultdict(list)
+    for play_id, first_name, last_name in Play.actors.through.objects.filter(
+        play_id__in=play_ids
+    ).values_list("play_id", "actor__first_name", "actor__last_name"):
+        actors[play_id].append(f"{first_name} {last_name}")
+
+    genres = defaultdict(list)
+    for play_id, name in Play.genres.through.objects.filter(
+        play_id__in=play_ids
+    ).values_list("play_id", "genre__name"):
+        genres[play_id].append(name)
+
+    plays = list(Play.objects.filter(id__in=play_ids).only("title", "description"))
+    for play in plays:
+        play.search_document = " ".join(
+            [play.title, play.description, *actors[play.id], *genres[play.id]]
+        ).lower()
+    Play.objects.bulk_update(plays, ["search_document"], batch_size=500)
+    inverted_index.invalidate()
+
+
+def edit_distance_at_most_one(a: str, b: str) -> bool:
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = j = edits = 0
+    while i < len(a) and j < len(b):
+        if a[i] != b[j]:
+            edits += 1
+            if edits > 1:
+                return False
+            if len(a) == len(b):
+                i += 1
+            j += 1
+        else:
+            i += 1
+            j += 1
+    return edits + (len(b) - j) <= 1
+
+
+class InvertedIndex:
+    """In-memory search over plays for databases without full-text search.
+
+    Rebuilt lazily from Play.search_document after invalidate().
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._vocabulary = []
+        self._titles = {}
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._stale = True
+
+    def build(self, documents):
+        postings = defaultdict(dict)
+        titles = {}
+        for play_id, title, document in documents:
+            titles[play_id] = title
+            title_tokens = set(tokenize(title))
+            for token in tokenize(document):
+                weight = TITLE_WEIGHT if token in title_tokens else 1.0
+                postings[token][play_id] = max(postings[token].get(play_id, 0), weight)
+        self._postings = dict(postings)
+        self._vocabulary = sorted(postings)
+        self._titles = titles
+        self._stale = False
+
+    def _ensure_built(self):
+        if self._stale:
+            with self._lock:
+                if self._stale:
+                    self.build(
+                        Play.objects.values_list("id", "title", "search_document")
+                    )
+
+    def _matches(self, term):
+        """Vocabulary tokens matching a query term with their match weight."""
+        matches = {}
+        if term in self._postings:
+            matches[term] = 1.0
+        start = bisect.bisect_left(self._vocabulary, term)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            matches.setdefault(token, PREFIX_WEIGHT)
+        if len(term) >= 4:
+            for token in self._vocabulary:
+                if token[0] == term[0] and edit_distance_at_most_one(term, token):
+                    matches.setdefault(token, TYPO_WEIGHT)
+        return matches
+
+    def search(self, query, limit=20):
+        self._ensure_built()
+        scores = None
+        for term in set(tokenize(query)):
+            term_scores = defaultdict(float)
+            for token, match_weight in self._matches(term).items():
+                for play_id, weight in self._postings[token].items():
+                    term_scores[play_id] = max(
+                        term_scores[play_id], weight * match_weight
+                    )
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    play_id: score + term_scores[play_id]
+                    for play_id, score in scores.items()
+                    if play_id in term_scores
+                }
+        if not scores:
+            return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+inverted_index = InvertedIndex()
+_trigram_available = None
+
+
+def trigram_available():
+    global _trigram_available
+    if _trigram_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_available = cursor.fetchone() is not None
+    return _trigram_available
+
+
+def search_plays(query, limit=20):
+    """Plays matching every word of the query, best first, with a rank."""
+    terms = tokenize(query)
+    if not terms:
+        return []
+
+    if connection.vendor != "postgresql":
+        ranked = inverted_index.search(query, limit)
+        plays = Play.objects.in_bulk([play_id for play_id, _ in ranked])
+        results = []
+        for play_id, rank in ranked:
+            play = plays[play_id]
+            play.rank = rank
+            results.append(play)
+        return results
+
+    from django.contrib.postgres.search import (
+        SearchQuery,
+        SearchRank,
+        SearchVector,
+        TrigramWordSimilarity,
+    )
+
+    vector = SearchVector("search_document", config="simple")
+    search_query = SearchQuery(
+        " & ".join(f"{term}:*" for term in terms), config="simple", search_type="raw"
+    )
+    queryset = Play.objects.annotate(ts_rank=SearchRank(vector, search_query)).defer(
+        "search_document"
+    )
+    match = Q(search_vector=search_query)
+    if trigram_available():
+        queryset = queryset.annotate(
+            similarity=TrigramWordSimilarity(query, "search_document")
+        )
+        match |= Q(search_document__trigram_word_similar=query)
+    else:
+        queryset = queryset.annotate(similarity=Value(0.0, output_field=FloatField()))
+
+    return list(
+        queryset.annotate(search_vector=vector)
+        .filter(match)
+        .annotate(rank=F("ts_rank") + F("similarity"))
+        .order_by("-rank", "id")[:limit]
+    )
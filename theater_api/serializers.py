@@ -1,16 +1,28 @@
-from django.db import transaction
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from theater_api.exceptions import ScheduleConflict, SeatsAlreadyTaken
 from theater_api.models import (
+    MAX_PERFORMANCE_DURATION,
     Genre,
     Actor,
     Play,
+    PriceTier,
+    SeatZone,
     TheaterHall,
     Performance,
     Reservation,
     Ticket,
+    WaitingRoom,
+    WaitlistEntry,
 )
+from theater_api.pricing import price_maps
+from theater_api.scheduling import find_conflict, load_schedules, schedule_windows
+from theater_api.tasks import enqueue
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -28,7 +40,49 @@ class ActorSerializer(serializers.ModelSerializer):
 class TheaterHallSerializer(serializers.ModelSerializer):
     class Meta:
         model = TheaterHall
-        fields = ["id", "name", "rows", "seats_in_row"]
+        fields = ["id", "name", "rows", "seats_in_row", "base_price"]
+
+
+class PriceTierSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PriceTier
+        fields = ["id", "name", "price"]
+
+
+class SeatZoneSerializer(serializers.ModelSerializer):
+    theater_hall = serializers.PrimaryKeyRelatedField(
+        queryset=TheaterHall.objects.all()
+    )
+    tier = serializers.PrimaryKeyRelatedField(queryset=PriceTier.objects.all())
+
+    class Meta:
+        model = SeatZone
+        fields = [
+            "id",
+            "theater_hall",
+            "tier",
+            "row_from",
+            "row_to",
+            "seat_from",
+            "seat_to",
+        ]
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        values = {
+            name: attrs.get(name, getattr(self.instance, name, None))
+            for name in self.Meta.fields[1:]
+        }
+        hall = values["theater_hall"]
+        for start, end, limit in (
+            ("row_from", "row_to", hall.rows),
+            ("seat_from", "seat_to", hall.seats_in_row),
+        ):
+            if not (1 <= values[start] <= values[end] <= limit):
+                raise ValidationError(
+                    {start: f"Expected {start} <= {end} within 1 to {limit}."}
+                )
+        return data
 
 
 class PlayListSerializer(serializers.ModelSerializer):
@@ -67,6 +121,74 @@ class PlayDetailSerializer(serializers.ModelSerializer):
         fields = ["id", "title", "description", "actors", "genres"]
 
 
+class PlaySearchSerializer(serializers.ModelSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Play
+        fields = ["id", "title", "description", "rank"]
+
+
+class PlayRecommendationSerializer(serializers.ModelSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Play
+        fields = ["id", "title", "description", "score"]
+
+
+def performance_interval(attrs, instance=None):
+    hall = attrs.get("theater_hall") or instance.theater_hall
+    start = attrs.get("show_time") or instance.show_time
+    duration = attrs.get("duration") or (
+        instance.duration
+        if instance
+        else Performance._meta.get_field("duration").get_default()
+    )
+    return hall.id, start, start + duration
+
+
+def raise_schedule_conflict(error):
+    if "performance_hall_no_overlap" in str(error):
+        raise ScheduleConflict()
+    raise error
+
+
+class PerformanceBulkSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        intervals = [performance_interval(item) for item in attrs]
+        schedules = load_schedules(schedule_windows(intervals))
+
+        conflicts = []
+        for index, (hall_id, start, end) in enumerate(intervals):
+            schedule = schedules[hall_id]
+            conflict = schedule.conflict(start, end)
+            if conflict is None:
+                schedule.add(("item", index), start, end)
+            elif isinstance(conflict, tuple):
+                conflicts.append(
+                    f"Item {index}: the theater hall is booked for item {conflict[1]} of this request at that time."
+                )
+            else:
+                conflicts.append(
+                    f"Item {index}: the theater hall is booked for performance {conflict} at that time."
+                )
+
+        if conflicts:
+            raise ValidationError({"conflicts": conflicts})
+        return attrs
+
+    def create(self, validated_data):
+        performances = [Performance(**item) for item in validated_data]
+        for performance in performances:
+            performance.ends_at = performance.show_time + performance.duration
+        try:
+            with transaction.atomic():
+                return Performance.objects.bulk_create(performances)
+        except IntegrityError as error:
+            raise_schedule_conflict(error)
+
+
 class PerformanceListSerializer(serializers.ModelSerializer):
     play = serializers.SlugRelatedField(queryset=Play.objects.all(), slug_field="title")
     theater_hall = serializers.SlugRelatedField(
@@ -78,7 +200,52 @@ class PerformanceListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Performance
-        fields = ["id", "play", "theater_hall", "show_time", "available_tickets"]
+        fields = [
+            "id",
+            "play",
+            "theater_hall",
+            "show_time",
+            "duration",
+            "price_multiplier",
+            "available_tickets",
+        ]
+        extra_kwargs = {
+            "duration": {
+                "min_value": timedelta(minutes=1),
+                "max_value": MAX_PERFORMANCE_DURATION,
+            }
+        }
+        list_serializer_class = PerformanceBulkSerializer
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # A bulk request checks the whole batch at once in PerformanceBulkSerializer.
+        if self.parent is None:
+            hall_id, start, end = performance_interval(attrs, self.instance)
+            conflict = find_conflict(
+                hall_id, start, end, exclude_id=getattr(self.instance, "id", None)
+            )
+            if conflict is not None:
+                raise ValidationError(
+                    {
+                        "show_time": f"The theater hall is booked for performance {conflict} at that time."
+                    }
+                )
+        return data
+
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError as error:
+            raise_schedule_conflict(error)
+
+    def update(self, instance, validated_data):
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError as error:
+            raise_schedule_conflict(error)
 
 
 class PerformanceDetailSerializer(serializers.ModelSerializer):
@@ -87,7 +254,32 @@ class PerformanceDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Performance
-        fields = ["id", "play", "theater_hall", "show_time"]
+        fields = [
+            "id",
+            "play",
+            "theater_hall",
+            "show_time",
+            "duration",
+            "price_multiplier",
+        ]
+
+
+class PerformanceField(serializers.PrimaryKeyRelatedField):
+    """Resolves each performance id once per request.
+
+    A nested ``many=True`` serializer shares one field instance between all
+    of its items, so the tickets of a reservation reuse the same lookup.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._resolved = {}
+
+    def to_internal_value(self, data):
+        key = str(data)
+        if key not in self._resolved:
+            self._resolved[key] = super().to_internal_value(data)
+        return self._resolved[key]
 
 
 class TicketSerializer(serializers.ModelSerializer):
@@ -96,11 +288,25 @@ class TicketSerializer(serializers.ModelSerializer):
     show_time = serializers.DateTimeField(
         source="performance.show_time", format="%Y-%m-%d %H:%M", read_only=True
     )
-    performance = serializers.PrimaryKeyRelatedField(queryset=Performance.objects.all())
+    performance = PerformanceField(
+        queryset=Performance.objects.select_related("theater_hall")
+    )
 
     class Meta:
         model = Ticket
-        fields = ["row", "seat", "performance", "play", "hall", "show_time"]
+        fields = [
+            "id",
+            "row",
+            "seat",
+            "performance",
+            "play",
+            "hall",
+            "show_time",
+            "price",
+        ]
+        # Seat uniqueness is enforced by the database constraint on insert,
+        # see ReservationSerializer.create.
+        validators = []
 
     def validate(self, attrs):
         data = super().validate(attrs)
@@ -115,22 +321,115 @@ class TicketSerializer(serializers.ModelSerializer):
             performance.theater_hall,
             ValidationError,
         )
+        data["price"] = price_maps.price(performance, attrs["row"], attrs["seat"])
         return data
 
 
 class ReservationSerializer(serializers.ModelSerializer):
     user = serializers.CharField(source="user.email", read_only=True)
     tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
+    total_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, read_only=True
+    )
+
+    def validate_tickets(self, tickets):
+        seats = [
+            (ticket["performance"].id, ticket["row"], ticket["seat"])
+            for ticket in tickets
+        ]
+        if len(set(seats)) != len(seats):
+            raise ValidationError("The same seat can't be reserved twice.")
+        return tickets
 
     def create(self, validated_data):
+        tickets = validated_data.pop("tickets")
         with transaction.atomic():
-            tickets = validated_data.pop("tickets")
+            Performance.lock_for_booking(ticket["performance"].id for ticket in tickets)
             reservation = Reservation.objects.create(**validated_data)
-            for ticket in tickets:
-                Ticket.objects.create(reservation=reservation, **ticket)
-            return reservation
+            Ticket.objects.bulk_create(
+                [Ticket(reservation=reservation, **ticket) for ticket in tickets],
+                ignore_conflicts=True,
+            )
+            booked = set(
+                reservation.tickets.values_list("performance_id", "row", "seat")
+            )
+            taken = [
+                {
+                    "performance": ticket["performance"].id,
+                    "row": ticket["row"],
+                    "seat": ticket["seat"],
+                }
+                for ticket in tickets
+                if (ticket["performance"].id, ticket["row"], ticket["seat"])
+                not in booked
+            ]
+            if taken:
+                raise SeatsAlreadyTaken(taken)
+            Performance.adjust_sold_counts(
+                Counter(performance_id for performance_id, _, _ in booked)
+            )
+            enqueue("send_reservation_confirmation", reservation_id=reservation.id)
+            enqueue("refresh_popularity", unique=True)
+        return reservation
 
     class Meta:
         model = Reservation
-        fields = ["id", "created_at", "user", "tickets"]
+        fields = ["id", "created_at", "user", "tickets", "total_price"]
         read_only_fields = ["created_at"]
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    performance = serializers.PrimaryKeyRelatedField(read_only=True)
+    seats = serializers.IntegerField(min_value=1, max_value=WaitlistEntry.MAX_SEATS)
+
+    class Meta:
+        model = WaitlistEntry
+        fields = [
+            "id",
+            "performance",
+            "seats",
+            "status",
+            "reservation",
+            "offer_expires_at",
+            "created_at",
+        ]
+        read_only_fields = ["status", "reservation", "offer_expires_at"]
+
+
+class WaitingRoomSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WaitingRoom
+        fields = ["admissions_per_minute", "issued"]
+        read_only_fields = ["issued"]
+        extra_kwargs = {"admissions_per_minute": {"min_value": 1}}
+
+
+class QueueStatusSerializer(serializers.Serializer):
+    token = serializers.CharField()
+    position = serializers.IntegerField()
+    admit_at = serializers.DateTimeField()
+    admitted = serializers.BooleanField()
+
+
+class TicketHistorySerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=8, decimal_places=2, allow_null=True)
+    reservation = serializers.IntegerField(source="reservation_id")
+    performance = serializers.IntegerField(source="performance_id")
+    show_time = serializers.DateTimeField()
+    play = serializers.CharField()
+    hall = serializers.CharField()
+
+
+class TicketPassExportSerializer(serializers.Serializer):
+    payload = serializers.CharField()
+    count = serializers.IntegerField()
+    expires_at = serializers.DateTimeField()
+
+
+class DeviceKeySerializer(serializers.Serializer):
+    algorithm = serializers.CharField()
+    key_id = serializers.CharField()
+    public_key = serializers.CharField(help_text="raw key, base64url")
@@ -0,0 +1,97 @@
+from collections import Counter
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from theater_api.models import (
+    Actor,
+    DoorEvent,
+    Genre,
+    Performance,
+    Play,
+    PriceTier,
+    Reservation,
+    SeatZone,
+    TheaterHall,
+)
+from theater_api.pricing import price_maps
+from theater_api.search import inverted_index, refresh_search_documents
+from theater_api.tasks import enqueue
+
+
+@receiver(post_save, sender=Play)
+def refresh_play_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_search_documents([instance.id])
+
+
+@receiver(post_delete, sender=Play)
+def drop_play_from_index(sender, instance, **kwargs):
+    inverted_index.invalidate()
+
+
+@receiver(m2m_changed, sender=Play.genres.through)
+@receiver(m2m_changed, sender=Play.actors.through)
+def refresh_documents_on_m2m_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            refresh_search_documents([instance.id])
+        return
+
+    if action == "pre_clear":
+        instance._search_play_ids = list(instance.plays.values_list("id", flat=True))
+    elif action == "post_clear":
+        refresh_search_documents(getattr(instance, "_search_play_ids", []))
+    elif action in ("post_add", "post_remove"):
+        refresh_search_documents(pk_set)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Actor)
+def refresh_documents_on_name_change(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        refresh_search_documents(instance.plays.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Actor)
+def remember_plays_before_delete(sender, instance, **kwargs):
+    instance._search_play_ids = list(instance.plays.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Actor)
+def refresh_documents_after_delete(sender, instance, **kwargs):
+    refresh_search_documents(getattr(instance, "_search_play_ids", []))
+
+
+@receiver(pre_delete, sender=Reservation)
+def release_sold_seats(sender, instance, **kwargs):
+    tickets = list(instance.tickets.values_list("performance_id", "id", "row", "seat"))
+    released = Counter(performance_id for performance_id, *_ in tickets)
+    Performance.adjust_sold_counts(
+        {performance_id: -count for performance_id, count in released.items()}
+    )
+    DoorEvent.record_cancellations(tickets)
+    enqueue("refresh_popularity", unique=True)
+    for performance_id in released:
+        enqueue("offer_released_seats", unique=True, performance_id=performance_id)
+
+
+@receiver(post_save, sender=TheaterHall)
+@receiver(post_delete, sender=TheaterHall)
+def invalidate_hall_caches(sender, instance, **kwargs):
+    price_maps.invalidate_hall(instance.id)
+
+
+@receiver(post_save, sender=SeatZone)
+@receiver(post_delete, sender=SeatZone)
+def invalidate_hall_prices(sender, instance, **kwargs):
+    price_maps.invalidate_hall(instance.theater_hall_id)
+
+
+@receiver(post_save, sender=PriceTier)
+def invalidate_tier_prices(sender, instance, **kwargs):
+    price_maps.clear()
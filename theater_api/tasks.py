@@ -0,0 +1,163 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from theater_api.models import Reservation, Task
+from theater_api.popularity import refresh_week_most_popular
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = timedelta(seconds=10)
+BACKOFF_MAX = timedelta(hours=1)
+# A running task not finished by then is assumed to belong to a dead worker.
+STALE_AFTER = timedelta(minutes=15)
+# Finished tasks are deleted after this; failed ones are kept for inspection.
+DONE_RETENTION = timedelta(days=1)
+PRUNE_BATCH_SIZE = 10_000
+
+handlers = {}
+
+
+def task(function):
+    handlers[function.__name__] = function
+    return function
+
+
+def enqueue(name, *, unique=False, **payload):
+    """Queue ``handlers[name](**payload)`` once the current transaction commits.
+
+    With ``unique`` the task is skipped while an identical one is pending,
+    enforced by the ``task_unique_pending`` constraint.
+    """
+    if name not in handlers:
+        raise KeyError(f"Unknown task {name!r}.")
+
+    def create():
+        Task.objects.bulk_create(
+            [
+                Task(
+                    name=name,
+                    payload=payload,
+                    run_at=timezone.now(),
+                    deduplicate=unique,
+                )
+            ],
+            ignore_conflicts=unique,
+        )
+
+    transaction.on_commit(create)
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def claim_tasks(limit=1):
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.filter(
+                Q(status=Task.PENDING, run_at__lte=now)
+                | Q(status=Task.RUNNING, locked_at__lt=now - STALE_AFTER)
+            )
+            .order_by("run_at", "id")
+            .select_for_update(skip_locked=True)[:limit]
+        )
+        for claimed in tasks:
+            claimed.status = Task.RUNNING
+            claimed.locked_at = now
+            claimed.attempts += 1
+        Task.objects.bulk_update(tasks, ["status", "locked_at", "attempts"])
+    return tasks
+
+
+def run_task(claimed):
+    try:
+        handlers[claimed.name](**claimed.payload)
+    except Exception:
+        claimed.last_error = traceback.format_exc()
+        if claimed.attempts >= MAX_ATTEMPTS:
+            claimed.status = Task.FAILED
+            logger.error("Task %s %s failed", claimed.id, claimed.name)
+        else:
+            claimed.status = Task.PENDING
+            claimed.run_at = timezone.now() + backoff(claimed.attempts)
+    else:
+        claimed.status = Task.DONE
+    claimed.locked_at = None
+    try:
+        with transaction.atomic():
+            claimed.save(update_fields=["status", "run_at", "locked_at", "last_error"])
+    except IntegrityError:
+        # An identical unique task was queued while this one ran; that one
+        # takes the retry.
+        Task.objects.filter(id=claimed.id).delete()
+    return claimed.status
+
+
+def prune_tasks(retention=DONE_RETENTION, batch_size=PRUNE_BATCH_SIZE):
+    """Delete tasks finished before ``retention``, a batch per statement."""
+    done = Task.objects.filter(
+        status=Task.DONE, run_at__lt=timezone.now() - retention
+    ).order_by("id")
+    deleted = 0
+    while True:
+        ids = list(done.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Task.objects.filter(id__in=ids).delete()[0]
+
+
+def work(stop, burst=False, poll_interval=1.0):
+    """Run tasks one at a time until ``stop`` is set.
+
+    With ``burst`` the loop also ends once no task is due.
+    """
+    processed = 0
+    while not stop.is_set():
+        close_old_connections()
+        claimed = claim_tasks()
+        if not claimed:
+            if burst:
+                break
+            stop.wait(poll_interval)
+            continue
+        run_task(claimed[0])
+        processed += 1
+    return processed
+
+
+@task
+def send_reservation_confirmation(reservation_id):
+    reservation = (
+        Reservation.objects.select_related("user")
+        .prefetch_related("tickets__performance__play")
+        .filter(id=reservation_id)
+        .first()
+    )
+    if reservation is None:
+        return
+    lines = [
+        f"{ticket.performance.play.title}, "
+        f"{ticket.performance.show_time:%Y-%m-%d %H:%M}, "
+        f"row {ticket.row}, seat {ticket.seat}"
+        for ticket in reservation.tickets.all()
+    ]
+    send_mail(
+        f"Reservation {reservation.id} confirmed",
+        "\n".join(lines),
+        settings.DEFAULT_FROM_EMAIL,
+        [reservation.user.email],
+    )
+
+
+@task
+def refresh_popularity():
+    refresh_week_most_popular()
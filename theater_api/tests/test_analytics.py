@@ -0,0 +1,201 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.timezone import localdate, now
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api.analytics import (
+    rebuild_rollups,
+    recount_recent_sales,
+    refresh_rollups,
+)
+from theater_api.cancellation import cancel_reservation
+from theater_api.models import (
+    Genre,
+    Performance,
+    Play,
+    Reservation,
+    RollupWatermark,
+    SalesRollupDaily,
+    SalesRollupHourly,
+    TheaterHall,
+    Ticket,
+)
+from theater_api.pricing import price_maps
+
+User = get_user_model()
+ANALYTICS_URL = reverse("analytics")
+
+
+class SalesTestCase(APITestCase):
+    def setUp(self):
+        price_maps.clear()
+        self.user = User.objects.create_user(
+            email="buyer@example.com", password="testpass123"
+        )
+        self.drama = Genre.objects.create(name="Drama")
+        self.hamlet = Play.objects.create(title="Hamlet", description="Tragedy")
+        self.hamlet.genres.add(self.drama)
+        self.hall = TheaterHall.objects.create(name="Main", rows=2, seats_in_row=5)
+        self.performance = Performance.objects.create(
+            play=self.hamlet,
+            theater_hall=self.hall,
+            show_time=now() + timedelta(days=1),
+        )
+
+    def sell(self, performance, *seats, sold_at=None):
+        reservation = Reservation.objects.create(user=self.user)
+        for seat in seats:
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                performance=performance,
+                reservation=reservation,
+                price=Decimal("10.00"),
+            )
+        Reservation.objects.filter(id=reservation.id).update(
+            created_at=sold_at or now() - timedelta(hours=1)
+        )
+        return reservation
+
+
+class SalesRollupTests(SalesTestCase):
+    def test_refresh_adds_new_tickets_only_once(self):
+        self.sell(self.performance, 1, 2)
+        self.assertEqual(refresh_rollups(), 2)
+        self.sell(self.performance, 3)
+        self.assertEqual(refresh_rollups(), 1)
+        self.assertEqual(refresh_rollups(), 0)
+
+        rollup = SalesRollupHourly.objects.get()
+        self.assertEqual(rollup.tickets, 3)
+        self.assertEqual(rollup.revenue, Decimal("30.00"))
+        daily = SalesRollupDaily.objects.get()
+        self.assertEqual((daily.tickets, daily.revenue), (3, Decimal("30.00")))
+
+    def test_refresh_in_batches(self):
+        self.sell(self.performance, 1, 2, 3, 4, 5)
+        self.assertEqual(refresh_rollups(batch_size=2), 5)
+        self.assertEqual(SalesRollupHourly.objects.get().tickets, 5)
+
+    def test_recent_tickets_wait_for_the_next_refresh(self):
+        self.sell(self.performance, 1, sold_at=now())
+        self.assertEqual(refresh_rollups(), 0)
+        self.assertFalse(SalesRollupHourly.objects.exists())
+
+    def test_cancellation_recounts_the_performance(self):
+        self.sell(self.performance, 1, 2)
+        reservation = self.sell(self.performance, 3, sold_at=now() - timedelta(days=1))
+        refresh_rollups()
+        self.assertEqual(SalesRollupDaily.objects.count(), 2)
+
+        cancel_reservation(reservation)
+        self.performance.refresh_from_db()
+        self.assertTrue(self.performance.sales_dirty)
+        refresh_rollups()
+
+        self.performance.refresh_from_db()
+        self.assertFalse(self.performance.sales_dirty)
+        daily = SalesRollupDaily.objects.get()
+        self.assertEqual((daily.day, daily.tickets), (localdate(), 2))
+
+    def test_recount_picks_up_tickets_behind_the_watermark(self):
+        self.sell(self.performance, 1)
+        late = self.sell(self.performance, 2)
+        refresh_rollups()
+        # As if the second booking had committed after the refresh.
+        SalesRollupHourly.objects.update(tickets=1, revenue=Decimal("10.00"))
+        self.assertEqual(refresh_rollups(), 0)
+        watermark = RollupWatermark.objects.get().last_ticket_id
+        self.assertLessEqual(late.tickets.get().id, watermark)
+
+        recount_recent_sales()
+        self.assertEqual(SalesRollupHourly.objects.get().tickets, 2)
+        self.assertEqual(SalesRollupDaily.objects.get().tickets, 2)
+
+    def test_rebuild(self):
+        self.sell(self.performance, 1, 2)
+        refresh_rollups()
+        SalesRollupHourly.objects.update(tickets=100)
+        self.assertEqual(rebuild_rollups(), 2)
+        self.assertEqual(SalesRollupHourly.objects.get().tickets, 2)
+
+
+class AnalyticsViewTests(SalesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(
+            User.objects.create_user(
+                email="admin@example.com", password="testpass123", is_staff=True
+            )
+        )
+        other_hall = TheaterHall.objects.create(name="Small", rows=1, seats_in_row=4)
+        self.other = Performance.objects.create(
+            play=Play.objects.create(title="Cats", description="Musical"),
+            theater_hall=other_hall,
+            show_time=now() + timedelta(days=1),
+        )
+        self.sell(self.performance, 1, 2, 3)
+        self.sell(self.other, 1)
+        refresh_rollups()
+        self.params = {
+            "date_from": str(localdate() - timedelta(days=1)),
+            "date_to": str(localdate() + timedelta(days=2)),
+        }
+
+    def test_sales_and_occupancy_by_play(self):
+        response = self.client.get(ANALYTICS_URL, {**self.params, "group_by": "play"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        sales = {row["label"]: row["tickets"] for row in response.data["sales"]}
+        self.assertEqual(sales, {"Hamlet": 3, "Cats": 1})
+        occupancy = {
+            row["label"]: (row["sold"], row["capacity"], row["rate"])
+            for row in response.data["occupancy"]
+        }
+        self.assertEqual(occupancy, {"Hamlet": (3, 10, 0.3), "Cats": (1, 4, 0.25)})
+
+    def test_occupancy_ignores_held_seats(self):
+        held = Reservation.objects.create(user=self.user, status=Reservation.HELD)
+        Ticket.objects.create(
+            row=2, seat=1, performance=self.performance, reservation=held
+        )
+        response = self.client.get(ANALYTICS_URL, {**self.params, "group_by": "play"})
+        occupancy = {row["label"]: row["sold"] for row in response.data["occupancy"]}
+        self.assertEqual(occupancy, {"Hamlet": 3, "Cats": 1})
+
+    def test_sales_by_genre_and_day(self):
+        response = self.client.get(ANALYTICS_URL, {**self.params, "group_by": "genre"})
+        self.assertEqual(
+            [(row["label"], row["tickets"]) for row in response.data["sales"]],
+            [("Drama", 3), (None, 1)],
+        )
+        response = self.client.get(ANALYTICS_URL, self.params)
+        self.assertEqual(
+            [(row["key"], row["tickets"]) for row in response.data["sales"]],
+            [(localdate(), 4)],
+        )
+
+    def test_datetime_bounds_use_hourly_rollups(self):
+        params = {
+            "date_from": (now() - timedelta(minutes=30)).isoformat(),
+            "date_to": (now() + timedelta(days=2)).isoformat(),
+            "group_by": "hall",
+        }
+        response = self.client.get(ANALYTICS_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["sales"], [])
+        self.assertEqual(len(response.data["occupancy"]), 2)
+
+    def test_invalid_parameters(self):
+        response = self.client.get(ANALYTICS_URL)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(ANALYTICS_URL, {**self.params, "group_by": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(ANALYTICS_URL, self.params)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api.cancellation import cancel_reservation
+from theater_api.door import read_snapshot
+from theater_api.models import (
+    DoorEvent,
+    Performance,
+    Play,
+    Reservation,
+    TheaterHall,
+    Ticket,
+)
+from theater_api.pricing import price_maps
+
+User = get_user_model()
+
+
+class DoorTests(APITestCase):
+    def setUp(self):
+        price_maps.clear()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client.force_authenticate(
+            User.objects.create_user(
+                email="door@example.com", password="testpass123", is_staff=True
+            )
+        )
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet", description="Tragedy"),
+            theater_hall=TheaterHall.objects.create(
+                name="Main", rows=2, seats_in_row=5
+            ),
+            show_time=now() + timedelta(hours=1),
+        )
+        self.first = self.book(1, 2)
+        self.second = self.book(3)
+        self.tickets = list(self.performance.tickets.order_by("id"))
+
+    def book(self, *seats):
+        reservation = Reservation.objects.create(user=self.user)
+        for seat in seats:
+            Ticket.objects.create(
+                row=1, seat=seat, performance=self.performance, reservation=reservation
+            )
+        return reservation
+
+    def url(self, name):
+        return reverse(f"performance-{name}", args=[self.performance.id])
+
+    def check_in(self, *tickets):
+        return self.client.post(
+            self.url("door-check-in"), {"tickets": list(tickets)}, format="json"
+        )
+
+    def test_snapshot(self):
+        self.check_in(self.tickets[0].id)
+        response = self.client.get(self.url("door"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data["version"], response.data["count"]), (1, 3))
+
+        snapshot = read_snapshot(response.data["snapshot"])
+        self.assertEqual(snapshot["version"], 1)
+        self.assertEqual(
+            snapshot["tickets"],
+            [
+                [self.tickets[0].id, 1, 1, 1],
+                [self.tickets[1].id, 1, 2, 0],
+                [self.tickets[2].id, 1, 3, 0],
+            ],
+        )
+        self.assertIsNone(read_snapshot(response.data["snapshot"] + "x"))
+
+    def test_check_in(self):
+        first, second, _ = self.tickets
+        self.check_in(first.id)
+        response = self.check_in(first.id, second.id, 0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "checked_in": [second.id],
+                "already_checked_in": [first.id],
+                "unknown": [0],
+            },
+        )
+        second.refresh_from_db()
+        self.assertIsNotNone(second.checked_in_at)
+
+    def test_changes_since_a_version(self):
+        first, second, third = self.tickets
+        version = self.client.get(self.url("door")).data["version"]
+        self.check_in(first.id)
+        cancel_reservation(self.second)
+        Ticket.objects.get(id=second.id).delete()
+
+        response = self.client.get(self.url("door-changes"), {"since": version})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "version": 3,
+                "checked_in": [[first.id, 1, 1]],
+                "cancelled": [[third.id, 1, 3], [second.id, 1, 2]],
+            },
+        )
+        response = self.client.get(self.url("door-changes"), {"since": 3})
+        self.assertEqual(response.data["cancelled"], [])
+
+    def test_reservation_delete_records_cancellations(self):
+        self.first.delete()
+        self.assertEqual(
+            sorted(
+                DoorEvent.objects.filter(kind=DoorEvent.CANCEL).values_list(
+                    "version", "seat"
+                )
+            ),
+            [(1, 1), (2, 2)],
+        )
+
+    def test_door_endpoints_require_staff(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(
+            self.client.get(self.url("door")).status_code, status.HTTP_403_FORBIDDEN
+        )
+        self.assertEqual(
+            self.check_in(self.tickets[0].id).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+    def test_invalid_requests(self):
+        response = self.client.get(self.url("door-changes"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.check_in("x")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,96 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api import heatmap
+from theater_api.cancellation import cancel_reservation
+from theater_api.heatmap import hall_heatmap
+from theater_api.models import Performance, Play, Reservation, TheaterHall, Ticket
+from theater_api.pricing import price_maps
+
+User = get_user_model()
+
+
+class HeatmapTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        price_maps.clear()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.hall = TheaterHall.objects.create(name="Main", rows=2, seats_in_row=3)
+        play = Play.objects.create(title="Hamlet", description="Tragedy")
+        self.first, self.second = (
+            Performance.objects.create(
+                play=play, theater_hall=self.hall, show_time=now() + timedelta(days=n)
+            )
+            for n in (1, 2)
+        )
+
+    def sell(self, performance, *seats):
+        reservation = Reservation.objects.create(user=self.user)
+        for row, seat in seats:
+            Ticket.objects.create(
+                row=row, seat=seat, performance=performance, reservation=reservation
+            )
+        return reservation
+
+    def test_counts_per_seat(self):
+        self.sell(self.first, (1, 1), (2, 3))
+        self.sell(self.second, (1, 1))
+        data = hall_heatmap(self.hall)
+        self.assertEqual(data["counts"], [[2, 0, 0], [0, 0, 1]])
+        self.assertEqual(
+            (data["performances"], data["tickets"], data["max"]), (2, 3, 2)
+        )
+
+    def test_counts_without_numpy(self):
+        self.sell(self.first, (1, 1), (2, 3))
+        self.sell(self.second, (1, 1))
+        with mock.patch.object(heatmap, "np", None):
+            data = hall_heatmap(self.hall)
+        self.assertEqual(data["counts"], [[2, 0, 0], [0, 0, 1]])
+
+    def test_cached_counts_are_updated_incrementally(self):
+        self.sell(self.first, (1, 1))
+        hall_heatmap(self.hall)
+        with self.assertNumQueries(2):
+            hall_heatmap(self.hall)
+
+        self.sell(self.second, (1, 2))
+        with mock.patch.object(
+            heatmap, "_add_counts", wraps=heatmap._add_counts
+        ) as add_counts:
+            data = hall_heatmap(self.hall)
+        add_counts.assert_called_once()
+        self.assertEqual(data["counts"], [[1, 1, 0], [0, 0, 0]])
+
+    def test_released_tickets_rebuild_the_counts(self):
+        reservation = self.sell(self.first, (1, 1))
+        self.sell(self.first, (1, 2))
+        hall_heatmap(self.hall)
+        cancel_reservation(reservation)
+        self.assertEqual(hall_heatmap(self.hall)["counts"], [[0, 1, 0], [0, 0, 0]])
+
+    def test_resized_hall(self):
+        self.sell(self.first, (2, 3))
+        hall_heatmap(self.hall)
+        self.hall.seats_in_row = 2
+        self.hall.save()
+        data = hall_heatmap(self.hall)
+        self.assertEqual(data["counts"], [[0, 0], [0, 0]])
+        self.assertEqual(data["tickets"], 0)
+
+    def test_endpoint(self):
+        self.sell(self.first, (1, 3))
+        self.client.force_authenticate(self.user)
+        url = reverse("theaterhall-heatmap", args=[self.hall.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["counts"], [[0, 0, 1], [0, 0, 0]])
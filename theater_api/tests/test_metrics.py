@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api.metrics import Histogram, registry
+from theater_api.models import Genre
+
+User = get_user_model()
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        registry.reset()
+        self.client.force_authenticate(
+            User.objects.create_user(
+                email="admin@example.com", password="testpass123", is_staff=True
+            )
+        )
+
+    def test_server_timing_header(self):
+        res = self.client.get(reverse("play-list"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        timing = res["Server-Timing"]
+        for metric in (
+            "db;dur=",
+            "serializer;dur=",
+            "app;dur=",
+            "render;dur=",
+            "total;dur=",
+        ):
+            self.assertIn(metric, timing)
+        self.assertIn("queries", timing)
+
+    def test_metrics_endpoint_reports_quantiles_per_route(self):
+        self.client.get(reverse("play-list"))
+        self.client.get(reverse("performance-list"))
+
+        res = self.client.get(reverse("metrics"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        body = res.content.decode()
+        for route in ("play-list", "performance-list"):
+            self.assertIn(
+                f'theater_request_duration_seconds_count{{route="{route}"}} 1', body
+            )
+            self.assertIn(f'route="{route}",quantile="0.99"', body)
+        self.assertNotIn('route="metrics"', body)
+
+    def test_serializer_time_is_reported_apart_from_the_view(self):
+        Genre.objects.create(name="Drama")
+        self.client.get(reverse("genre-list"))
+        self.client.post(reverse("genre-list"), {"name": "Comedy"})
+
+        stats = registry._routes["genre-list"]
+        self.assertGreater(stats.serializer_seconds, 0)
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('theater_serializer_seconds_total{route="genre-list"}', body)
+
+    def test_metrics_endpoint_requires_staff(self):
+        self.client.force_authenticate(
+            User.objects.create_user(email="user@example.com", password="testpass123")
+        )
+        res = self.client.get(reverse("metrics"))
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.logout()
+        res = self.client.get(reverse("metrics"))
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_histogram_quantile(self):
+        histogram = Histogram()
+        for _ in range(99):
+            histogram.observe(0.003)
+        histogram.observe(0.7)
+        self.assertLessEqual(histogram.quantile(0.5), 0.005)
+        self.assertGreater(histogram.quantile(0.995), 0.5)
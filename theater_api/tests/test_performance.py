@@ -1,4 +1,5 @@
 import datetime
+from django.test import SimpleTestCase
 from django.utils.timezone import now
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
@@ -13,6 +14,7 @@ from theater_api.models import (
     Genre,
     Actor,
 )
+from theater_api.scheduling import HallSchedule
 
 User = get_user_model()
 
@@ -72,3 +74,192 @@ class AuthenticatedPerformancePublicTests(BaseTestSetupMixin, APITestCase):
             self.performance.theater_hall.rows
             * self.performance.theater_hall.seats_in_row,
         )
+
+    def test_available_tickets_do_not_trust_sold_count(self):
+        Ticket.objects.create(
+            row=1,
+            seat=1,
+            performance=self.performance,
+            reservation=Reservation.objects.create(user=self.user),
+        )
+        Performance.objects.filter(id=self.performance.id).update(sold_count=0)
+
+        url = reverse("performance-available-tickets", args=[self.performance.id])
+        res = self.client.get(url, {"row": 1})
+        self.assertEqual([seat["seat"] for seat in res.data], [2, 3, 4, 5])
+
+
+class PerformanceScheduleFilterTests(BaseTestSetupMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.create_user())
+        self.tonight = now().replace(hour=20, minute=0, second=0, microsecond=0)
+        self.hamlet = self.create_play()
+        self.comedy = Play.objects.create(title="Twelfth Night", description="Fun")
+        self.comedy.genres.add(self.create_genre("Comedy"))
+        self.main_hall = self.create_theater_hall()
+        self.small_hall = TheaterHall.objects.create(
+            name="Small Hall", rows=1, seats_in_row=1
+        )
+        self.tonight_main = Performance.objects.create(
+            play=self.hamlet, theater_hall=self.main_hall, show_time=self.tonight
+        )
+        self.tonight_small = Performance.objects.create(
+            play=self.comedy, theater_hall=self.small_hall, show_time=self.tonight
+        )
+        self.next_week = Performance.objects.create(
+            play=self.hamlet,
+            theater_hall=self.small_hall,
+            show_time=self.tonight + datetime.timedelta(days=7),
+        )
+        reservation = Reservation.objects.create(user=self.create_user(is_staff=True))
+        Ticket.objects.create(
+            row=1, seat=1, performance=self.tonight_small, reservation=reservation
+        )
+
+    def get_ids(self, **params):
+        res = self.client.get(reverse("performance-list"), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [performance["id"] for performance in res.data["results"]]
+
+    def test_list_is_ordered_and_paginated_by_cursor(self):
+        res = self.client.get(reverse("performance-list"), {"page_size": 2})
+        self.assertEqual(
+            [p["id"] for p in res.data["results"]],
+            [self.tonight_main.id, self.tonight_small.id],
+        )
+        res = self.client.get(res.data["next"])
+        self.assertEqual([p["id"] for p in res.data["results"]], [self.next_week.id])
+
+    def test_available_tickets_annotated(self):
+        res = self.client.get(reverse("performance-list"))
+        available = {p["id"]: p["available_tickets"] for p in res.data["results"]}
+        self.assertEqual(available[self.tonight_main.id], 25)
+        self.assertEqual(available[self.tonight_small.id], 0)
+
+    def test_filter_by_date_range(self):
+        today = self.tonight.date().isoformat()
+        self.assertEqual(
+            self.get_ids(date_from=today, date_to=today),
+            [self.tonight_main.id, self.tonight_small.id],
+        )
+        later = (self.tonight + datetime.timedelta(days=1)).isoformat()
+        self.assertEqual(self.get_ids(date_from=later), [self.next_week.id])
+
+    def test_filter_by_play_hall_and_genre(self):
+        self.assertEqual(
+            self.get_ids(play=self.hamlet.id),
+            [self.tonight_main.id, self.next_week.id],
+        )
+        self.assertEqual(
+            self.get_ids(hall=self.small_hall.id),
+            [self.tonight_small.id, self.next_week.id],
+        )
+        self.assertEqual(self.get_ids(genre="comedy"), [self.tonight_small.id])
+
+    def test_filter_by_has_seats(self):
+        self.assertEqual(
+            self.get_ids(has_seats="true"),
+            [self.tonight_main.id, self.next_week.id],
+        )
+        self.assertEqual(self.get_ids(has_seats="false"), [self.tonight_small.id])
+
+    def test_invalid_filter_rejected(self):
+        res = self.client.get(reverse("performance-list"), {"date_from": "tonight"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(reverse("performance-list"), {"hall": "main"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PerformanceSchedulingTests(BaseTestSetupMixin, APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.create_user(is_staff=True))
+        self.play = self.create_play()
+        self.hall = self.create_theater_hall()
+        self.show_time = now().replace(microsecond=0) + datetime.timedelta(days=2)
+        self.performance = Performance.objects.create(
+            play=self.play, theater_hall=self.hall, show_time=self.show_time
+        )
+
+    def payload(self, show_time, duration="01:30:00"):
+        return {
+            "play": self.play.title,
+            "theater_hall": self.hall.name,
+            "show_time": show_time.isoformat(),
+            "duration": duration,
+        }
+
+    def test_overlapping_performance_rejected(self):
+        res = self.client.post(
+            reverse("performance-list"),
+            self.payload(self.show_time + datetime.timedelta(hours=1)),
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("show_time", res.data)
+
+    def test_back_to_back_performance_allowed(self):
+        res = self.client.post(
+            reverse("performance-list"),
+            self.payload(self.show_time + datetime.timedelta(hours=2)),
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["duration"], "01:30:00")
+
+    def test_update_does_not_conflict_with_itself(self):
+        res = self.client.patch(
+            reverse("performance-detail", args=[self.performance.id]),
+            {"duration": "02:30:00"},
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.performance.refresh_from_db()
+        self.assertEqual(
+            self.performance.ends_at,
+            self.show_time + datetime.timedelta(hours=2, minutes=30),
+        )
+
+    def test_bulk_scheduling(self):
+        later = self.show_time + datetime.timedelta(days=1)
+        res = self.client.post(
+            reverse("performance-bulk-create"),
+            [self.payload(later), self.payload(later + datetime.timedelta(hours=2))],
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Performance.objects.count(), 3)
+
+    def test_bulk_scheduling_rejects_conflicts(self):
+        later = self.show_time + datetime.timedelta(days=1)
+        res = self.client.post(
+            reverse("performance-bulk-create"),
+            [
+                self.payload(self.show_time + datetime.timedelta(minutes=30)),
+                self.payload(later),
+                self.payload(later + datetime.timedelta(hours=1)),
+            ],
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        first, second = res.data["conflicts"]
+        self.assertTrue(first.startswith("Item 0:"))
+        self.assertIn(f"performance {self.performance.id}", first)
+        self.assertTrue(second.startswith("Item 2:"))
+        self.assertIn("item 1", second)
+        self.assertEqual(Performance.objects.count(), 1)
+
+
+class HallScheduleTests(SimpleTestCase):
+    def test_conflict_lookup(self):
+        hour = datetime.timedelta(hours=1)
+        start = now()
+        schedule = HallSchedule(
+            [(2, start + 3 * hour, start + 5 * hour), (1, start, start + 2 * hour)]
+        )
+        self.assertEqual(schedule.conflict(start + hour, start + 2 * hour), 1)
+        self.assertEqual(schedule.conflict(start + 4 * hour, start + 6 * hour), 2)
+        self.assertIsNone(schedule.conflict(start + 2 * hour, start + 3 * hour))
+        self.assertIsNone(
+            schedule.conflict(start, start + hour, exclude_id=1),
+        )
+        self.assertEqual(schedule.conflict(start + hour, start + 4 * hour), 2)
@@ -1,3 +1,10 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
@@ -102,3 +109,67 @@ class AuthenticatedPlayTests(BaseTestSetupMixin, APITestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(len(res.data["results"]), 0)
+
+
+class PlayImportTests(BaseTestSetupMixin, APITestCase):
+    url = reverse("play-bulk-import")
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.create_user(is_staff=True))
+        self.drama = self.create_genre()
+        self.actor = self.create_actor()
+
+    def catalog(self, count, genre="Genre"):
+        return [
+            {
+                "title": f"Play {n}",
+                "description": "Imported",
+                "genres": ["Drama", f"{genre} {n % 3}"],
+                "actors": [self.actor.id],
+            }
+            for n in range(count)
+        ]
+
+    def test_import_plays(self):
+        response = self.client.post(self.url, self.catalog(4), format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"created": 4, "genres_created": 3})
+
+        play = Play.objects.get(title="Play 1")
+        self.assertEqual(
+            sorted(play.genres.values_list("name", flat=True)), ["Drama", "Genre 1"]
+        )
+        self.assertEqual(list(play.actors.all()), [self.actor])
+        self.assertEqual(Genre.objects.filter(name="Drama").count(), 1)
+        self.assertIn("genre 1", play.search_document)
+        self.assertIn("hanks", play.search_document)
+
+    def test_query_count_does_not_grow_with_the_catalog(self):
+        def queries(count, genre):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(
+                    self.url, self.catalog(count, genre), format="json"
+                )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(context)
+
+        self.assertEqual(queries(3, "Small"), queries(60, "Large"))
+
+    def test_unknown_actor_rejects_the_import(self):
+        catalog = self.catalog(2)
+        catalog[1]["actors"] = [self.actor.id + 100]
+        response = self.client.post(self.url, catalog, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Play.objects.exists())
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+            json.dump(self.catalog(2), file)
+            file.flush()
+            call_command("import_plays", file.name, stdout=StringIO())
+        self.assertEqual(Play.objects.count(), 2)
+
+    def test_import_requires_admin(self):
+        self.client.force_authenticate(user=self.create_user())
+        response = self.client.post(self.url, self.catalog(1), format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,194 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api.models import Performance, Play, PriceTier, SeatZone, TheaterHall
+from theater_api.pricing import SeatPriceMap, price_maps
+
+User = get_user_model()
+
+
+class PricingSetupMixin:
+    def setUp(self):
+        price_maps.clear()
+        self.hall = TheaterHall.objects.create(
+            name="Main Hall", rows=4, seats_in_row=5, base_price=Decimal("10")
+        )
+        self.stalls = PriceTier.objects.create(name="Stalls", price=Decimal("25"))
+        self.box = PriceTier.objects.create(name="Box", price=Decimal("40.50"))
+        SeatZone.objects.create(
+            theater_hall=self.hall,
+            tier=self.stalls,
+            row_from=1,
+            row_to=2,
+            seat_from=1,
+            seat_to=5,
+        )
+        SeatZone.objects.create(
+            theater_hall=self.hall,
+            tier=self.box,
+            row_from=2,
+            row_to=3,
+            seat_from=4,
+            seat_to=5,
+        )
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet", description="Tragedy"),
+            theater_hall=self.hall,
+            show_time=now() + timedelta(days=1),
+            price_multiplier=Decimal("1.5"),
+        )
+
+
+class SeatPriceMapTests(PricingSetupMixin, TestCase):
+    def test_zones_compile_to_seat_prices(self):
+        price_map = SeatPriceMap.compile(self.hall)
+        self.assertEqual(price_map.price(1, 1), Decimal("25.00"))
+        self.assertEqual(price_map.price(2, 3), Decimal("25.00"))
+        self.assertEqual(price_map.price(2, 4), Decimal("40.50"))
+        self.assertEqual(price_map.price(3, 5), Decimal("40.50"))
+        self.assertEqual(price_map.price(4, 1), Decimal("10.00"))
+        self.assertEqual(price_map.price(2, 4, Decimal("1.5")), Decimal("60.75"))
+        self.assertEqual(len(price_map.seat_tiers), 20)
+
+    def test_more_tiers_than_a_byte_holds(self):
+        hall = TheaterHall(id=1, rows=1, seats_in_row=300, base_price=Decimal("1"))
+        zones = [
+            SimpleNamespace(
+                tier_id=seat,
+                tier=SimpleNamespace(price=Decimal(seat)),
+                row_from=1,
+                row_to=1,
+                seat_from=seat,
+                seat_to=seat,
+            )
+            for seat in range(1, 301)
+        ]
+        price_map = SeatPriceMap(hall, zones)
+        self.assertEqual(price_map.price(1, 300), Decimal("300.00"))
+
+    def test_cached_map_needs_no_queries(self):
+        price_maps.get(self.hall)
+        with self.assertNumQueries(0):
+            for row in range(1, 5):
+                for seat in range(1, 6):
+                    price_maps.price(self.performance, row, seat)
+
+    def test_zone_change_invalidates_map(self):
+        self.assertEqual(price_maps.get(self.hall).price(4, 1), Decimal("10.00"))
+        SeatZone.objects.create(
+            theater_hall=self.hall,
+            tier=self.box,
+            row_from=4,
+            row_to=4,
+            seat_from=1,
+            seat_to=1,
+        )
+        self.assertEqual(price_maps.get(self.hall).price(4, 1), Decimal("40.50"))
+
+
+class PricingApiTests(PricingSetupMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_available_tickets_include_prices(self):
+        url = reverse("performance-available-tickets", args=[self.performance.id])
+        res = self.client.get(url, {"row": 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [seat["price"] for seat in res.data],
+            ["37.50", "37.50", "37.50", "60.75", "60.75"],
+        )
+
+    def test_reservation_stores_prices_and_total(self):
+        payload = {
+            "tickets": [
+                {"row": 2, "seat": 4, "performance": self.performance.id},
+                {"row": 4, "seat": 1, "performance": self.performance.id},
+            ]
+        }
+        res = self.client.post(reverse("reservation-list"), payload, format="json")
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [ticket["price"] for ticket in res.data["tickets"]], ["60.75", "15.00"]
+        )
+        self.assertEqual(res.data["total_price"], "75.75")
+
+    def test_reservation_list_totals_without_extra_queries(self):
+        for row in (1, 2, 3):
+            payload = {
+                "tickets": [
+                    {"row": row, "seat": seat, "performance": self.performance.id}
+                    for seat in (1, 2)
+                ]
+            }
+            self.client.post(reverse("reservation-list"), payload, format="json")
+
+        # The throttle window, reservations with their user, then tickets
+        # with their performance, play and hall.
+        with self.assertNumQueries(3):
+            res = self.client.get(reverse("reservation-list"))
+        self.assertEqual(
+            sorted(reservation["total_price"] for reservation in res.data),
+            ["30.00", "75.00", "75.00"],
+        )
+
+    def book(self, *seats):
+        payload = {
+            "tickets": [
+                {"row": row, "seat": seat, "performance": self.performance.id}
+                for row, seat in seats
+            ]
+        }
+        return self.client.post(reverse("reservation-list"), payload, format="json")
+
+    def test_price_change_reaches_the_booking_total(self):
+        self.assertEqual(self.book((1, 1)).data["total_price"], "37.50")
+
+        self.stalls.price = Decimal("30")
+        self.stalls.save()
+        self.assertEqual(self.book((1, 2)).data["total_price"], "45.00")
+
+    def test_map_cached_by_another_process_expires(self):
+        self.assertEqual(self.book((1, 1)).data["total_price"], "37.50")
+        # An update that no signal of this process saw.
+        PriceTier.objects.filter(id=self.stalls.id).update(price=Decimal("30"))
+        self.assertEqual(self.book((1, 2)).data["total_price"], "37.50")
+
+        later = time.monotonic() + price_maps._maps.ttl + 1
+        with mock.patch("theater_api.caches.time.monotonic", return_value=later):
+            self.assertEqual(self.book((1, 3)).data["total_price"], "45.00")
+
+    def test_zone_must_fit_hall(self):
+        admin = User.objects.create_user(
+            email="admin@example.com", password="testpass123", is_staff=True
+        )
+        self.client.force_authenticate(admin)
+        payload = {
+            "theater_hall": self.hall.id,
+            "tier": self.box.id,
+            "row_from": 3,
+            "row_to": 5,
+            "seat_from": 1,
+            "seat_to": 2,
+        }
+        res = self.client.post(reverse("seatzone-list"), payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("row_from", res.data)
+
+        payload["row_to"] = 4
+        res = self.client.post(reverse("seatzone-list"), payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,138 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api.models import (
+    Actor,
+    Genre,
+    Performance,
+    Play,
+    PlaySimilarity,
+    Reservation,
+    TheaterHall,
+    Ticket,
+)
+from theater_api.recommendations import (
+    content_scores,
+    rebuild_similarities,
+    similar_plays,
+)
+
+User = get_user_model()
+
+
+class RecommendationTests(APITestCase):
+    def setUp(self):
+        self.hall = TheaterHall.objects.create(name="Main", rows=5, seats_in_row=10)
+        self.hamlet, self.lear, self.cats, self.chicago = (
+            Play.objects.create(title=title, description="")
+            for title in ("Hamlet", "King Lear", "Cats", "Chicago")
+        )
+        tragedy = Genre.objects.create(name="Tragedy")
+        self.hamlet.genres.add(tragedy)
+        self.lear.genres.add(tragedy)
+        self.performances = {
+            play: Performance.objects.create(
+                play=play, theater_hall=self.hall, show_time=now() + timedelta(days=1)
+            )
+            for play in (self.hamlet, self.lear, self.cats, self.chicago)
+        }
+        self.seats = iter(range(1, 11))
+        self.users = [
+            User.objects.create_user(email=f"user{n}@example.com", password="pass")
+            for n in range(4)
+        ]
+        self.book(self.users[0], self.hamlet, self.cats)
+        self.book(self.users[1], self.hamlet, self.cats)
+        self.book(self.users[2], self.hamlet, self.chicago)
+        self.book(self.users[3], self.lear)
+        similar_plays.clear()
+
+    def book(self, user, *plays):
+        reservation = Reservation.objects.create(user=user)
+        seat = next(self.seats)
+        for play in plays:
+            Ticket.objects.create(
+                row=1,
+                seat=seat,
+                performance=self.performances[play],
+                reservation=reservation,
+            )
+
+    def scores(self, play):
+        return {
+            similarity.similar_id: similarity
+            for similarity in PlaySimilarity.objects.filter(play=play)
+        }
+
+    def test_rebuild_blends_cobookings_and_content(self):
+        rebuild_similarities(chunk_size=2)
+        scores = self.scores(self.hamlet)
+        self.assertEqual(set(scores), {self.cats.id, self.chicago.id, self.lear.id})
+        self.assertEqual(scores[self.cats.id].cobookings, 2)
+        self.assertEqual(scores[self.lear.id].cobookings, 0)
+        self.assertAlmostEqual(scores[self.lear.id].score, 0.3)
+        self.assertGreater(scores[self.cats.id].score, scores[self.chicago.id].score)
+
+    def test_rebuild_keeps_top_k(self):
+        rebuild_similarities(top_k=1)
+        self.assertEqual(list(self.scores(self.hamlet)), [self.cats.id])
+
+    def test_shared_actors_count(self):
+        actor = Actor.objects.create(first_name="Judi", last_name="Dench")
+        self.cats.actors.add(actor)
+        self.chicago.actors.add(actor)
+        rebuild_similarities()
+        self.assertAlmostEqual(self.scores(self.cats)[self.chicago.id].score, 0.3)
+
+    def test_crowded_features_are_skipped(self):
+        actor = Actor.objects.create(first_name="Judi", last_name="Dench")
+        self.cats.actors.add(actor)
+        self.chicago.actors.add(actor)
+        with mock.patch("theater_api.recommendations.MAX_FEATURE_PLAYS", 1):
+            scores = content_scores()
+        self.assertNotIn(self.chicago.id, scores.get(self.cats.id, {}))
+
+    def test_similar_endpoint(self):
+        call_command("rebuild_recommendations", stdout=StringIO())
+        self.client.force_authenticate(self.users[0])
+        url = reverse("play-similar", args=[self.hamlet.id])
+        response = self.client.get(url, {"limit": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([play["title"] for play in response.data], ["Cats", "Chicago"])
+        self.assertEqual(
+            self.client.get(reverse("play-similar", args=[0])).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        self.assertEqual(
+            self.client.get(reverse("play-similar", args=["hamlet"])).status_code,
+            status.HTTP_404_NOT_FOUND,
+        )
+        self.assertEqual(
+            self.client.get(url, {"limit": 100}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_recommended_excludes_booked_plays(self):
+        rebuild_similarities()
+        self.client.force_authenticate(self.users[2])
+        response = self.client.get(reverse("play-recommended"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [play["title"] for play in response.data]
+        self.assertEqual(titles, ["Cats", "King Lear"])
+
+    def test_recommended_without_bookings_falls_back_to_most_booked(self):
+        rebuild_similarities()
+        self.client.force_authenticate(
+            User.objects.create_user(email="new@example.com", password="pass")
+        )
+        response = self.client.get(reverse("play-recommended"), {"limit": 1})
+        self.assertEqual([play["title"] for play in response.data], ["Hamlet"])
+        self.assertEqual(response.data[0]["score"], 0.0)
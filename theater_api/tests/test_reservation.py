@@ -1,9 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APIClient, APITransactionTestCase
 from django.utils.timezone import now
 from datetime import timedelta
 
+from theater_api.cancellation import cancel_performance
+from theater_api.pricing import price_maps
 from theater_api.models import (
     Reservation,
     Ticket,
@@ -13,6 +20,7 @@ from theater_api.models import (
     Genre,
     Actor,
 )
+from theater_api.serializers import ReservationSerializer
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -53,6 +61,7 @@ class BaseReservationTestMixin:
 
 class TestReservation(BaseReservationTestMixin, APITestCase):
     def setUp(self):
+        price_maps.clear()
         self.user = self.create_user()
         self.client.force_authenticate(self.user)
         self.performance = self.create_performance()
@@ -82,3 +91,239 @@ class TestReservation(BaseReservationTestMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         reservation_id = response.data["id"]
         self.assertTrue(Ticket.objects.filter(reservation=reservation_id).exists())
+
+    def test_taken_seat_returns_conflict_with_seats(self):
+        url = reverse("reservation-list")
+        self.client.post(
+            url,
+            {"tickets": [{"row": 1, "seat": 1, "performance": self.performance.id}]},
+            format="json",
+        )
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": 1, "performance": self.performance.id},
+                {"row": 1, "seat": 2, "performance": self.performance.id},
+            ]
+        }
+        response = self.client.post(url, payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            response.data["seats"],
+            [{"performance": self.performance.id, "row": 1, "seat": 1}],
+        )
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertFalse(Ticket.objects.filter(row=1, seat=2).exists())
+
+    def test_duplicate_seat_in_payload_rejected(self):
+        url = reverse("reservation-list")
+        ticket = {"row": 2, "seat": 2, "performance": self.performance.id}
+        response = self.client.post(url, {"tickets": [ticket, ticket]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestSoldCount(BaseReservationTestMixin, APITestCase):
+    def setUp(self):
+        price_maps.clear()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.performance = self.create_performance()
+
+    def book(self, *seats):
+        payload = {
+            "tickets": [
+                {"row": row, "seat": seat, "performance": self.performance.id}
+                for row, seat in seats
+            ]
+        }
+        return self.client.post(reverse("reservation-list"), payload, format="json")
+
+    def sold_count(self):
+        self.performance.refresh_from_db()
+        return self.performance.sold_count
+
+    def test_reservation_increments_sold_count(self):
+        self.book((1, 1), (1, 2))
+        self.assertEqual(self.sold_count(), 2)
+
+    def test_rejected_reservation_keeps_sold_count(self):
+        self.book((1, 1))
+        response = self.book((1, 1), (1, 2))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.sold_count(), 1)
+
+    def test_deleting_reservation_releases_seats(self):
+        response = self.book((1, 1), (1, 2))
+        self.book((2, 1))
+        url = reverse("reservation-detail", args=[response.data["id"]])
+        self.assertEqual(
+            self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT
+        )
+        self.assertEqual(self.sold_count(), 1)
+
+    def test_recount_repairs_drift(self):
+        self.book((1, 1), (1, 2))
+        Performance.objects.update(sold_count=7)
+
+        out = StringIO()
+        call_command("recount_sold_seats", stdout=out)
+        self.assertIn("1 out of date", out.getvalue())
+        self.assertEqual(self.sold_count(), 7)
+
+        call_command("recount_sold_seats", "--fix", stdout=StringIO())
+        self.assertEqual(self.sold_count(), 2)
+
+
+class TestCancellation(BaseReservationTestMixin, APITestCase):
+    def setUp(self):
+        price_maps.clear()
+        self.user = self.create_user()
+        self.client.force_authenticate(self.user)
+        self.performance = self.create_performance()
+
+    def book(self, *seats):
+        payload = {
+            "tickets": [
+                {"row": row, "seat": seat, "performance": self.performance.id}
+                for row, seat in seats
+            ]
+        }
+        response = self.client.post(reverse("reservation-list"), payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def sold_count(self):
+        self.performance.refresh_from_db()
+        return self.performance.sold_count
+
+    def test_cancel_single_ticket(self):
+        reservation = self.book((1, 1), (1, 2))
+        first, second = reservation["tickets"]
+        url = reverse(
+            "reservation-cancel-ticket", args=[reservation["id"], first["id"]]
+        )
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.sold_count(), 1)
+        self.assertTrue(Reservation.objects.filter(id=reservation["id"]).exists())
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        url = reverse(
+            "reservation-cancel-ticket", args=[reservation["id"], second["id"]]
+        )
+        self.client.delete(url)
+        self.assertEqual(self.sold_count(), 0)
+        self.assertFalse(Reservation.objects.filter(id=reservation["id"]).exists())
+
+    def test_cancel_reservation_of_another_user(self):
+        reservation = self.book((1, 1))
+        self.client.force_authenticate(self.create_user(is_staff=True))
+        other = self.book((2, 2))
+        self.client.force_authenticate(self.user)
+
+        url = reverse("reservation-detail", args=[other["id"]])
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+        url = reverse("reservation-detail", args=[reservation["id"]])
+        self.assertEqual(
+            self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT
+        )
+        self.assertEqual(self.sold_count(), 1)
+        self.assertFalse(Ticket.objects.filter(reservation=reservation["id"]).exists())
+
+    def test_cancel_performance_releases_all_seats(self):
+        for row in range(1, 4):
+            self.book((row, 1), (row, 2))
+        url = reverse("performance-cancel", args=[self.performance.id])
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.create_user(is_staff=True))
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {"released": 6})
+        self.assertEqual(self.sold_count(), 0)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_cancel_performance_in_batches(self):
+        self.book(*[(1, seat) for seat in range(1, 6)])
+        # Three batches: savepoint, five statements (two of them record the
+        # door events), release; the last one also detaches waitlist holds
+        # from the emptied reservation.
+        with self.assertNumQueries(3 * 7 + 1):
+            released = cancel_performance(self.performance, batch_size=2)
+        self.assertEqual(released, 5)
+        self.assertEqual(self.sold_count(), 0)
+        self.assertFalse(Reservation.objects.exists())
+
+
+class TestTicketValidation(BaseReservationTestMixin, APITestCase):
+    def setUp(self):
+        price_maps.clear()
+        self.performance = self.create_performance()
+
+    def payload(self, seats):
+        return {
+            "tickets": [
+                {"row": row, "seat": seat, "performance": self.performance.id}
+                for row, seat in seats
+            ]
+        }
+
+    def test_validating_reservation_resolves_performance_once(self):
+        seats = [(row, seat) for row in (1, 2) for seat in range(1, 11)]
+        serializer = ReservationSerializer(data=self.payload(seats))
+        price_maps.get(self.performance.theater_hall)
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+
+class TestConcurrentReservation(BaseReservationTestMixin, APITransactionTestCase):
+    threads = 8
+
+    def setUp(self):
+        price_maps.clear()
+        self.user = self.create_user()
+        self.performance = self.create_performance()
+
+    def book(self, seats):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = {
+            "tickets": [
+                {"row": row, "seat": seat, "performance": self.performance.id}
+                for row, seat in seats
+            ]
+        }
+        try:
+            return client.post(reverse("reservation-list"), payload, format="json")
+        finally:
+            connection.close()
+
+    def test_many_threads_booking_same_hall(self):
+        attempts = [
+            [(1, 1), (1, 2), (1, 3)],
+            [(1, 3), (1, 4)],
+            [(1, 4), (1, 5), (2, 1)],
+            [(2, 1), (2, 2)],
+        ] * (self.threads // 2)
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            responses = list(executor.map(self.book, attempts))
+
+        codes = {response.status_code for response in responses}
+        self.assertLessEqual(codes, {status.HTTP_201_CREATED, status.HTTP_409_CONFLICT})
+
+        booked = list(
+            Ticket.objects.filter(performance=self.performance).values_list(
+                "row", "seat"
+            )
+        )
+        self.assertEqual(len(booked), len(set(booked)))
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.sold_count, len(booked))
+
+        created = [r for r in responses if r.status_code == status.HTTP_201_CREATED]
+        self.assertEqual(Reservation.objects.count(), len(created))
+        self.assertEqual(len(booked), sum(len(r.data["tickets"]) for r in created))
+        for response in responses:
+            if response.status_code == status.HTTP_409_CONFLICT:
+                self.assertTrue(response.data["seats"])
@@ -0,0 +1,49 @@
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+
+class SchemaViewTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_generated_schema_served_with_etag(self):
+        schema_file = self.directory / "schema-1.0.0.yaml"
+        call_command("generate_schema", output=schema_file, stdout=None)
+        self.assertTrue(schema_file.read_text().startswith("openapi:"))
+
+        with override_settings(OPENAPI_SCHEMA_FILE=schema_file):
+            res = self.client.get(reverse("schema"))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.content, schema_file.read_bytes())
+            etag = res["ETag"]
+            self.assertFalse(etag.startswith("W/"))
+
+            res = self.client.get(reverse("schema"), HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_user_views_served_off_the_request_thread_are_documented(self):
+        schema_file = self.directory / "schema-1.0.0.yaml"
+        call_command("generate_schema", output=schema_file, stdout=None)
+        schema = schema_file.read_text()
+        for path in ("/api/token/", "/api/user/register/", "/api/user/me/"):
+            self.assertIn(f"\n  {path}:\n", schema)
+
+    def test_missing_schema_not_generated_outside_debug(self):
+        missing = self.directory / "missing.yaml"
+        with override_settings(OPENAPI_SCHEMA_FILE=missing, DEBUG=False):
+            res = self.client.get(reverse("schema"))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_missing_schema_generated_live_in_debug(self):
+        missing = self.directory / "missing.yaml"
+        with override_settings(OPENAPI_SCHEMA_FILE=missing, DEBUG=True):
+            res = self.client.get(reverse("schema"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", res)
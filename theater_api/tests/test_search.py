@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.test import SimpleTestCase
+
+from theater_api.models import Actor, Genre, Play
+from theater_api.search import InvertedIndex
+
+User = get_user_model()
+
+
+class InvertedIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = InvertedIndex()
+        self.index.build(
+            [
+                (1, "Hamlet", "hamlet prince of denmark william shakespeare tragedy"),
+                (2, "Othello", "othello jealousy william shakespeare tragedy"),
+                (3, "The Seagull", "the seagull anton chekhov comedy hamlet"),
+            ]
+        )
+
+    def test_all_words_must_match(self):
+        self.assertEqual(
+            [play_id for play_id, _ in self.index.search("shakespeare tragedy")],
+            [1, 2],
+        )
+        self.assertEqual(self.index.search("chekhov tragedy"), [])
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(
+            [play_id for play_id, _ in self.index.search("hamlet")], [1, 3]
+        )
+
+    def test_prefix_and_typo(self):
+        self.assertEqual([play_id for play_id, _ in self.index.search("chekh")], [3])
+        self.assertEqual([play_id for play_id, _ in self.index.search("othelo")], [2])
+
+
+class PlaySearchTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(
+            User.objects.create_user(email="user@example.com", password="testpass123")
+        )
+        self.tragedy = Genre.objects.create(name="Tragedy")
+        self.shakespeare = Actor.objects.create(first_name="William", last_name="Shake")
+        self.hamlet = Play.objects.create(
+            title="Hamlet", description="Prince of Denmark"
+        )
+        self.hamlet.genres.add(self.tragedy)
+        self.hamlet.actors.add(self.shakespeare)
+        self.seagull = Play.objects.create(
+            title="The Seagull", description="Chekhov on Hamlet"
+        )
+
+    def search(self, query):
+        res = self.client.get(reverse("search"), {"q": query})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [play["id"] for play in res.data]
+
+    def test_ranked_results(self):
+        self.assertEqual(self.search("hamlet"), [self.hamlet.id, self.seagull.id])
+
+    def test_prefix_over_actor_and_genre(self):
+        self.assertEqual(self.search("shak trag"), [self.hamlet.id])
+
+    def test_documents_follow_m2m_and_name_changes(self):
+        comedy = Genre.objects.create(name="Comedy")
+        self.seagull.genres.add(comedy)
+        self.assertEqual(self.search("comedy"), [self.seagull.id])
+
+        self.shakespeare.last_name = "Shakespeare"
+        self.shakespeare.save()
+        self.assertEqual(self.search("shakespeare"), [self.hamlet.id])
+
+        self.hamlet.actors.clear()
+        self.assertEqual(self.search("shakespeare"), [])
+
+    def test_query_required(self):
+        res = self.client.get(reverse("search"))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
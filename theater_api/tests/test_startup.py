@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+# Wall time from interpreter start to the first served response, generous
+# enough for slow CI machines but well below what eager schema generation
+# or importing every optional view costs.
+TIME_TO_FIRST_REQUEST_BUDGET = 3.0
+
+FIRST_REQUEST_SCRIPT = """
+import json, sys
+from theater_service.wsgi import application
+from django.test import Client
+response = Client().get("/api/doc/")
+print(json.dumps({
+    "status": response.status_code,
+    "modules": sorted(name for name in sys.modules if name.startswith("drf_spectacular")),
+}))
+"""
+
+
+class ColdStartTests(SimpleTestCase):
+    def first_request(self, schema_file):
+        env = {
+            **os.environ,
+            "DJANGO_ENV": "production",
+            "ALLOWED_HOSTS": "testserver",
+            "OPENAPI_SCHEMA_FILE": str(schema_file),
+            "SECRET_KEY": "cold-start",
+        }
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", FIRST_REQUEST_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - started
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return elapsed, json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_time_to_first_request_within_budget(self):
+        with tempfile.TemporaryDirectory() as directory:
+            schema_file = Path(directory) / "openapi.yaml"
+            schema_file.write_text("openapi: 3.0.3\n")
+            elapsed, result = self.first_request(schema_file)
+
+        self.assertEqual(result["status"], 200)
+        self.assertNotIn("drf_spectacular.views", result["modules"])
+        self.assertNotIn("drf_spectacular.generators", result["modules"])
+        self.assertLess(elapsed, TIME_TO_FIRST_REQUEST_BUDGET)
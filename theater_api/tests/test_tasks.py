@@ -0,0 +1,193 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api.models import Performance, Play, Task, TheaterHall
+from theater_api.tasks import (
+    claim_tasks,
+    enqueue,
+    handlers,
+    prune_tasks,
+    run_task,
+    work,
+)
+
+User = get_user_model()
+
+
+def flaky(fail_times, calls):
+    def handler(**payload):
+        calls.append(payload)
+        if len(calls) <= fail_times:
+            raise RuntimeError("temporary failure")
+
+    return handler
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        patcher = mock.patch.dict(handlers, {"flaky": flaky(2, self.calls)})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_enqueue_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue("flaky", value=1)
+            self.assertFalse(Task.objects.exists())
+        self.assertEqual(Task.objects.get().payload, {"value": 1})
+
+    def test_unique_task_is_queued_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue("flaky", unique=True)
+            enqueue("flaky", unique=True)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_unique_task_is_enforced_by_the_database(self):
+        Task.objects.create(
+            name="flaky", run_at=now(), status=Task.PENDING, deduplicate=True
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue("flaky", unique=True)
+            enqueue("flaky")
+        self.assertEqual(Task.objects.filter(deduplicate=True).count(), 1)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_retry_yields_to_queued_duplicate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue("flaky", unique=True)
+        task = claim_tasks()[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue("flaky", unique=True)
+
+        self.assertEqual(run_task(task), Task.PENDING)
+        self.assertFalse(Task.objects.filter(id=task.id).exists())
+        self.assertEqual(Task.objects.filter(status=Task.PENDING).count(), 1)
+
+    def test_prune_deletes_old_finished_tasks(self):
+        old = now() - timedelta(days=2)
+        Task.objects.bulk_create(
+            [
+                Task(name="flaky", run_at=old, status=Task.DONE),
+                Task(name="flaky", run_at=old, status=Task.DONE),
+                Task(name="flaky", run_at=old, status=Task.FAILED),
+                Task(name="flaky", run_at=now(), status=Task.DONE),
+            ]
+        )
+        self.assertEqual(prune_tasks(batch_size=1), 2)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(KeyError):
+            enqueue("missing")
+
+    def test_failed_task_is_retried_with_backoff(self):
+        Task.objects.create(name="flaky", run_at=now())
+
+        task = claim_tasks()[0]
+        self.assertEqual(run_task(task), Task.PENDING)
+        task.refresh_from_db()
+        self.assertEqual(task.attempts, 1)
+        self.assertIn("temporary failure", task.last_error)
+        self.assertGreater(task.run_at, now())
+        self.assertEqual(claim_tasks(), [])
+
+        Task.objects.update(run_at=now())
+        run_task(claim_tasks()[0])
+        Task.objects.update(run_at=now())
+        self.assertEqual(run_task(claim_tasks()[0]), Task.DONE)
+        self.assertEqual(len(self.calls), 3)
+
+    def test_task_fails_after_max_attempts(self):
+        Task.objects.create(name="flaky", run_at=now())
+        with mock.patch("theater_api.tasks.MAX_ATTEMPTS", 2):
+            run_task(claim_tasks()[0])
+            Task.objects.update(run_at=now())
+            with self.assertLogs("theater_api.tasks", "ERROR"):
+                self.assertEqual(run_task(claim_tasks()[0]), Task.FAILED)
+        self.assertEqual(claim_tasks(), [])
+
+    def test_stale_running_task_is_reclaimed(self):
+        Task.objects.create(
+            name="flaky",
+            run_at=now(),
+            status=Task.RUNNING,
+            locked_at=now() - timedelta(hours=1),
+        )
+        self.assertEqual(len(claim_tasks()), 1)
+
+
+class ReservationTaskTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet", description="Tragedy"),
+            theater_hall=TheaterHall.objects.create(
+                name="Main Hall", rows=5, seats_in_row=5
+            ),
+            show_time=now() + timedelta(days=1),
+        )
+
+    def test_reservation_queues_confirmation_email(self):
+        payload = {
+            "tickets": [{"row": 1, "seat": 2, "performance": self.performance.id}]
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("reservation-list"), payload, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+
+        # Closing connections would end the test case transaction.
+        with mock.patch("theater_api.tasks.close_old_connections"):
+            self.assertEqual(work(threading.Event(), burst=True), 2)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        self.assertIn("Hamlet", mail.outbox[0].body)
+        self.assertIn("row 1, seat 2", mail.outbox[0].body)
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
+
+    def test_worker_refresh_reaches_the_play_list(self):
+        Play.objects.create(title="Cats", description="Musical")
+        payload = {
+            "tickets": [{"row": 1, "seat": 1, "performance": self.performance.id}]
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("reservation-list"), payload, format="json")
+        with mock.patch("theater_api.tasks.close_old_connections"):
+            work(threading.Event(), burst=True)
+
+        self.assertEqual(Play.objects.get(title="Hamlet").week_tickets, 1)
+        # Nothing but the database is shared with the worker.
+        with mock.patch("django.core.cache.cache.get", side_effect=AssertionError):
+            response = self.client.get(reverse("play-list"))
+        self.assertEqual(response.data["week_most_popular"]["title"], "Hamlet")
+
+
+class RunWorkersCommandTests(TransactionTestCase):
+    def test_burst_run_drains_queue(self):
+        calls = []
+        Task.objects.bulk_create(
+            [Task(name="flaky", payload={"n": n}, run_at=now()) for n in range(10)]
+        )
+        out = StringIO()
+        with mock.patch.dict(handlers, {"flaky": flaky(0, calls)}):
+            call_command("run_workers", "--threads", "3", "--burst", stdout=out)
+
+        self.assertIn("Processed 10 tasks", out.getvalue())
+        self.assertEqual(sorted(call["n"] for call in calls), list(range(10)))
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 10)
@@ -0,0 +1,103 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api.models import Performance, Play, TheaterHall, ThrottleWindow
+from theater_api.throttling import SlidingWindowRateThrottle
+
+User = get_user_model()
+
+RATES = {"anon": "2/day", "user": "3/day", "available_tickets": "5/hour"}
+
+
+@mock.patch.object(SlidingWindowRateThrottle, "THROTTLE_RATES", RATES)
+class SlidingWindowThrottleTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client.force_authenticate(self.user)
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet", description="Tragedy"),
+            theater_hall=TheaterHall.objects.create(
+                name="Main Hall", rows=2, seats_in_row=2
+            ),
+            show_time=now() + datetime.timedelta(days=1),
+        )
+
+    def test_user_throttled_after_rate(self):
+        url = reverse("genre-list")
+        codes = [self.client.get(url).status_code for _ in range(4)]
+        self.assertEqual(codes[:3], [status.HTTP_200_OK] * 3)
+        self.assertEqual(codes[3], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_one_row_per_client(self):
+        url = reverse("genre-list")
+        for _ in range(3):
+            self.client.get(url)
+        window = ThrottleWindow.objects.get()
+        self.assertEqual(window.hits, 3)
+
+    def test_available_tickets_has_separate_limit(self):
+        url = reverse("performance-available-tickets", args=[self.performance.id])
+        codes = [self.client.get(url).status_code for _ in range(6)]
+        self.assertEqual(codes[:5], [status.HTTP_200_OK] * 5)
+        self.assertEqual(codes[5], status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.client.get(reverse("genre-list"))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def throttle_at(self, timestamp):
+        throttle = SlidingWindowRateThrottle.__new__(SlidingWindowRateThrottle)
+        throttle.rate = "3/minute"
+        throttle.num_requests, throttle.duration = throttle.parse_rate(throttle.rate)
+        throttle.get_cache_key = lambda request, view: "throttle_user_1"
+        throttle.timer = lambda: timestamp
+        return throttle
+
+    def hit(self, timestamp):
+        return self.throttle_at(timestamp).allow_request(None, None)
+
+    def test_previous_window_is_weighted(self):
+        self.assertEqual([self.hit(6030) for _ in range(3)], [True] * 3)
+        # 80% of the previous window still counts: 3 * 0.8 + 1 > 3.
+        self.assertFalse(self.hit(6072))
+        # Only 1/12 of it is left: 3 / 12 + 2 <= 3 but 3 / 12 + 3 > 3.
+        self.assertEqual([self.hit(6115) for _ in range(3)], [True, True, False])
+
+    def test_rejected_requests_are_not_counted(self):
+        for _ in range(3):
+            self.hit(6030)
+        self.assertEqual([self.hit(6072) for _ in range(5)], [False] * 5)
+        self.assertEqual(ThrottleWindow.objects.get().hits, 3)
+        self.assertTrue(self.hit(6115))
+
+    def test_wait_until_the_previous_window_fades(self):
+        for _ in range(3):
+            self.hit(6030)
+        throttle = self.throttle_at(6072)
+        self.assertFalse(throttle.allow_request(None, None))
+        # 3 * (1 - t / 60) + 1 <= 3 from t = 20, 8 seconds later.
+        self.assertAlmostEqual(throttle.wait(), 8)
+
+    @mock.patch.object(SlidingWindowRateThrottle, "timer", lambda: 600_000)
+    def test_prune_keeps_windows_still_in_use(self):
+        for key, window_index in [
+            ("throttle_user_1", 9_998),  # minute window 9998 ended 2 minutes ago
+            ("throttle_user_2", 9_999),
+            ("throttle_anon_1", 6),  # day window 6 is the current one
+            ("throttle_available_tickets_1", 160),  # hour window 166 is current
+        ]:
+            ThrottleWindow.objects.create(key=key, window_index=window_index, hits=1)
+
+        with mock.patch.dict(RATES, {"user": "3/minute"}):
+            self.assertEqual(SlidingWindowRateThrottle.prune(), 2)
+        self.assertEqual(
+            set(ThrottleWindow.objects.values_list("key", flat=True)),
+            {"throttle_user_2", "throttle_anon_1"},
+        )
@@ -0,0 +1,118 @@
+from base64 import urlsafe_b64decode
+from datetime import timedelta
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api.models import Performance, Play, Reservation, TheaterHall, Ticket
+from theater_api.ticket_passes import PASS_SALT, read_passes
+
+User = get_user_model()
+TICKETS_URL = reverse("my-tickets")
+EXPORT_URL = reverse("my-tickets-export")
+
+
+class TicketHistoryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.other = User.objects.create_user(
+            email="other@example.com", password="testpass123"
+        )
+        self.hall = TheaterHall.objects.create(name="Main", rows=5, seats_in_row=10)
+        self.play = Play.objects.create(title="Hamlet", description="Tragedy")
+        self.client.force_authenticate(self.user)
+
+    def performance(self, days):
+        return Performance.objects.create(
+            play=self.play,
+            theater_hall=self.hall,
+            show_time=now() + timedelta(days=days, hours=1),
+        )
+
+    def book(self, user, performance, *seats):
+        reservation = Reservation.objects.create(user=user)
+        return [
+            Ticket.objects.create(
+                row=1, seat=seat, performance=performance, reservation=reservation
+            )
+            for seat in seats
+        ]
+
+    def test_upcoming_tickets_in_keyset_pages(self):
+        later, sooner = self.performance(5), self.performance(2)
+        self.book(self.user, later, 1)
+        self.book(self.user, sooner, 1, 2)
+        self.book(self.other, sooner, 3)
+        self.book(self.user, self.performance(-1), 1)
+
+        seen = []
+        url = TICKETS_URL + "?page_size=2"
+        while url:
+            # The throttle window and the page.
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [
+                (ticket["performance"], ticket["seat"])
+                for ticket in response.data["results"]
+            ]
+            url = response.data["next"]
+        self.assertEqual(seen, [(sooner.id, 1), (sooner.id, 2), (later.id, 1)])
+
+        ticket = response.data["results"][0]
+        self.assertEqual((ticket["play"], ticket["hall"]), ("Hamlet", "Main"))
+
+    def test_past_tickets_latest_first(self):
+        older, recent = self.performance(-5), self.performance(-2)
+        self.book(self.user, older, 1)
+        self.book(self.user, recent, 1)
+        self.book(self.user, self.performance(1), 1)
+        response = self.client.get(TICKETS_URL, {"when": "past"})
+        self.assertEqual(
+            [ticket["performance"] for ticket in response.data["results"]],
+            [recent.id, older.id],
+        )
+
+    def test_export_upcoming_tickets(self):
+        upcoming = self.book(self.user, self.performance(3), 4, 5)
+        self.book(self.user, self.performance(-3), 1)
+        response = self.client.get(EXPORT_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+
+        passes = read_passes(response.data["payload"])
+        self.assertEqual(passes["user"], self.user.id)
+        self.assertEqual(
+            [(ticket["id"], ticket["seat"]) for ticket in passes["tickets"]],
+            [(ticket.id, ticket.seat) for ticket in upcoming],
+        )
+        key_id, body, signature = response.data["payload"].split(".")
+        forged = f"{key_id}.{body[::-1]}.{signature}"
+        self.assertIsNone(read_passes(forged))
+
+    def test_passes_are_checked_with_the_public_key(self):
+        self.book(self.user, self.performance(3), 4)
+        payload = self.client.get(EXPORT_URL).data["payload"]
+        key = self.client.get(reverse("device-key")).data
+        self.assertEqual(key["algorithm"], "Ed25519")
+
+        signed, signature = payload.rsplit(".", 1)
+        public_key = Ed25519PublicKey.from_public_bytes(
+            urlsafe_b64decode(key["public_key"] + "=")
+        )
+        public_key.verify(
+            urlsafe_b64decode(signature + "=="),
+            f"{PASS_SALT}:{signed}".encode(),
+        )
+        self.assertEqual(signed.split(".")[0], key["key_id"])
+
+    def test_export_without_upcoming_tickets(self):
+        response = self.client.get(EXPORT_URL)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
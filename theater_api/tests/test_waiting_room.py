@@ -0,0 +1,151 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api import waiting_room
+from theater_api.models import (
+    Performance,
+    Play,
+    QueuePlace,
+    TheaterHall,
+    WaitingRoom,
+)
+from theater_api.throttling import SlidingWindowRateThrottle
+
+User = get_user_model()
+
+
+class WaitingRoomTests(APITestCase):
+    def setUp(self):
+        waiting_room._rates.clear()
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet", description="Tragedy"),
+            theater_hall=TheaterHall.objects.create(
+                name="Main Hall", rows=5, seats_in_row=5
+            ),
+            show_time=now() + timedelta(days=1),
+        )
+        self.user = User.objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.admin = User.objects.create_user(
+            email="admin@example.com", password="testpass123", is_staff=True
+        )
+        self.queue_url = reverse("performance-queue", args=[self.performance.id])
+
+    def open_room(self, rate=1):
+        self.client.force_authenticate(self.admin)
+        url = reverse("performance-waiting-room", args=[self.performance.id])
+        response = self.client.put(url, {"admissions_per_minute": rate})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return url
+
+    def join(self, user, token=""):
+        self.client.force_authenticate(user)
+        return self.client.post(self.queue_url, HTTP_X_QUEUE_TOKEN=token)
+
+    def book(self, seat, token=""):
+        payload = {
+            "tickets": [{"row": 1, "seat": seat, "performance": self.performance.id}]
+        }
+        return self.client.post(
+            reverse("reservation-list"),
+            payload,
+            format="json",
+            HTTP_X_QUEUE_TOKEN=token,
+        )
+
+    def test_performance_without_waiting_room(self):
+        self.assertEqual(self.join(self.user).status_code, 404)
+        self.assertEqual(self.book(1).status_code, status.HTTP_201_CREATED)
+
+    def test_only_admin_opens_waiting_room(self):
+        self.client.force_authenticate(self.user)
+        url = reverse("performance-waiting-room", args=[self.performance.id])
+        response = self.client.put(url, {"admissions_per_minute": 10})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_tokens_are_admitted_at_the_configured_rate(self):
+        self.open_room(rate=1)
+        first = self.join(self.admin)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(first.data["position"], 1)
+        self.assertTrue(first.data["admitted"])
+
+        second = self.join(self.user)
+        self.assertEqual(second.data["position"], 2)
+        self.assertFalse(second.data["admitted"])
+        self.assertGreater(int(second["Retry-After"]), 50)
+
+        again = self.join(self.user, second.data["token"])
+        self.assertEqual(again.data["position"], 2)
+        self.assertEqual(WaitingRoom.objects.get().issued, 2)
+
+    def test_one_place_per_user(self):
+        self.open_room(rate=1)
+        self.join(self.admin)
+        first = self.join(self.user)
+        self.assertEqual(self.join(self.user).data["position"], 2)
+        self.assertEqual(self.join(self.user).data["admit_at"], first.data["admit_at"])
+        self.assertEqual(WaitingRoom.objects.get().issued, 2)
+        self.assertEqual(QueuePlace.objects.count(), 2)
+
+        # Once the admission window has passed the user queues again.
+        QueuePlace.objects.filter(user=self.user).update(admit_at=0)
+        self.assertEqual(self.join(self.user).data["position"], 3)
+
+    def test_joining_is_throttled(self):
+        self.open_room(rate=100)
+        with mock.patch.dict(
+            SlidingWindowRateThrottle.THROTTLE_RATES, {"user": "2/minute"}
+        ):
+            self.assertEqual(self.join(self.user).status_code, 201)
+            token = self.join(self.user).data["token"]
+            self.assertEqual(
+                self.join(self.user).status_code, status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            response = self.client.get(self.queue_url, HTTP_X_QUEUE_TOKEN=token)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_booking_requires_admitted_token(self):
+        self.open_room()
+        admitted = self.join(self.admin).data["token"]
+        waiting = self.join(self.user).data["token"]
+
+        response = self.book(1)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertNotIn("position", response.data)
+
+        response = self.book(1, waiting)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.data["position"], 2)
+        self.assertIn("Retry-After", response)
+
+        url = reverse("performance-available-tickets", args=[self.performance.id])
+        response = self.client.get(url, HTTP_X_QUEUE_TOKEN=waiting)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # Tokens are bound to the user they were issued to.
+        self.assertEqual(self.book(1, admitted).status_code, 429)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.book(1, admitted).status_code, status.HTTP_201_CREATED)
+
+    def test_queue_status_needs_no_database(self):
+        self.open_room()
+        token = self.join(self.user).data["token"]
+        with self.assertNumQueries(0):
+            response = self.client.get(self.queue_url, HTTP_X_QUEUE_TOKEN=token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["position"], 1)
+        self.assertEqual(self.client.get(self.queue_url).status_code, 400)
+
+    def test_closing_waiting_room(self):
+        url = self.open_room()
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.book(1).status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,185 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from theater_api.models import (
+    Performance,
+    Play,
+    Reservation,
+    Task,
+    TheaterHall,
+    Ticket,
+    WaitlistEntry,
+)
+from theater_api.waitlist import expire_offers, offer_seats, pick_seats
+
+User = get_user_model()
+
+
+class WaitlistTests(APITestCase):
+    def setUp(self):
+        self.performance = Performance.objects.create(
+            play=Play.objects.create(title="Hamlet", description="Tragedy"),
+            theater_hall=TheaterHall.objects.create(
+                name="Small Hall", rows=1, seats_in_row=3
+            ),
+            show_time=now() + timedelta(days=1),
+        )
+        self.buyer = self.create_user("buyer@example.com")
+        self.reservation = self.book(self.buyer, 1, 2, 3)
+        self.first = self.create_user("first@example.com")
+        self.second = self.create_user("second@example.com")
+
+    def create_user(self, email):
+        return User.objects.create_user(email=email, password="testpass123")
+
+    def book(self, user, *seats):
+        self.client.force_authenticate(user)
+        payload = {
+            "tickets": [
+                {"row": 1, "seat": seat, "performance": self.performance.id}
+                for seat in seats
+            ]
+        }
+        response = self.client.post(reverse("reservation-list"), payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def join(self, user, seats):
+        self.client.force_authenticate(user)
+        url = reverse("performance-waitlist", args=[self.performance.id])
+        return self.client.post(url, {"seats": seats})
+
+    def release(self, seat):
+        ticket = self.reservation["tickets"][seat - 1]
+        self.client.force_authenticate(self.buyer)
+        url = reverse(
+            "reservation-cancel-ticket", args=[self.reservation["id"], ticket["id"]]
+        )
+        self.assertEqual(
+            self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT
+        )
+
+    def entry(self, user):
+        return WaitlistEntry.objects.get(performance=self.performance, user=user)
+
+    def test_join_only_when_not_enough_seats(self):
+        self.release(1)
+        self.assertEqual(self.join(self.first, 1).status_code, 400)
+        response = self.join(self.first, 2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["status"], WaitlistEntry.WAITING)
+        self.assertEqual(self.join(self.first, 2).status_code, 400)
+
+    def test_released_seat_queues_matcher(self):
+        self.join(self.first, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.release(2)
+        self.assertTrue(
+            Task.objects.filter(
+                name="offer_released_seats",
+                payload={"performance_id": self.performance.id},
+            ).exists()
+        )
+
+    def test_offers_go_to_first_entry_that_fits(self):
+        self.join(self.first, 2)
+        self.join(self.second, 1)
+        self.release(3)
+
+        self.assertEqual(offer_seats(self.performance.id), 1)
+        self.assertEqual(self.entry(self.first).status, WaitlistEntry.WAITING)
+        offer = self.entry(self.second)
+        self.assertEqual(offer.status, WaitlistEntry.OFFERED)
+        self.assertEqual(
+            list(offer.reservation.tickets.values_list("row", "seat")), [(1, 3)]
+        )
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.sold_count, 3)
+
+    def test_accept_offer(self):
+        self.join(self.first, 1)
+        self.release(1)
+        offer_seats(self.performance.id)
+
+        self.client.force_authenticate(self.first)
+        url = reverse("waitlistentry-accept", args=[self.entry(self.first).id])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], WaitlistEntry.ACCEPTED)
+        reservation = Reservation.objects.get(id=response.data["reservation"])
+        self.assertEqual(reservation.user, self.first)
+        self.assertEqual(self.client.post(url).status_code, 409)
+
+    def test_held_seats_are_not_sold_until_accepted(self):
+        self.join(self.first, 1)
+        self.release(1)
+        offer_seats(self.performance.id)
+        self.assertEqual(
+            Reservation.objects.get(user=self.first).status, Reservation.HELD
+        )
+
+        self.client.force_authenticate(self.first)
+        self.assertEqual(self.client.get(reverse("my-tickets")).data["results"], [])
+        self.assertEqual(self.client.get(reverse("reservation-list")).data, [])
+        self.assertEqual(
+            self.client.get(reverse("my-tickets-export")).status_code,
+            status.HTTP_204_NO_CONTENT,
+        )
+
+        url = reverse("waitlistentry-accept", args=[self.entry(self.first).id])
+        self.client.post(url)
+        self.assertEqual(len(self.client.get(reverse("my-tickets")).data["results"]), 1)
+        self.assertEqual(len(self.client.get(reverse("reservation-list")).data), 1)
+        self.performance.refresh_from_db()
+        self.assertTrue(self.performance.sales_dirty)
+
+    def test_expired_offer_moves_to_next_in_line(self):
+        self.join(self.first, 1)
+        self.join(self.second, 1)
+        self.release(2)
+        offer_seats(self.performance.id)
+        WaitlistEntry.objects.filter(user=self.first).update(
+            offer_expires_at=now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(expire_offers(), 1)
+        expired = self.entry(self.first)
+        self.assertEqual(expired.status, WaitlistEntry.EXPIRED)
+        self.assertIsNone(expired.reservation)
+        self.assertFalse(Ticket.objects.filter(reservation__user=self.first).exists())
+
+        out = StringIO()
+        call_command("sweep_waitlist", stdout=out)
+        self.assertIn("0 offers expired, 1 offers made.", out.getvalue())
+        self.assertEqual(self.entry(self.second).status, WaitlistEntry.OFFERED)
+
+        self.client.force_authenticate(self.first)
+        url = reverse("waitlistentry-accept", args=[expired.id])
+        self.assertEqual(self.client.post(url).status_code, 409)
+
+    def test_leaving_waitlist_releases_offer(self):
+        self.join(self.first, 1)
+        self.release(1)
+        offer_seats(self.performance.id)
+
+        self.client.force_authenticate(self.first)
+        url = reverse("waitlistentry-detail", args=[self.entry(self.first).id])
+        self.assertEqual(
+            self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT
+        )
+        self.assertFalse(WaitlistEntry.objects.exists())
+        self.performance.refresh_from_db()
+        self.assertEqual(self.performance.sold_count, 2)
+
+    def test_pick_seats_prefers_adjacent(self):
+        free = [(1, 1), (1, 3), (1, 4), (2, 1), (2, 2), (2, 3)]
+        self.assertEqual(pick_seats(free, 2), [(1, 3), (1, 4)])
+        self.assertEqual(pick_seats(free, 3), [(2, 1), (2, 2), (2, 3)])
+        self.assertEqual(pick_seats(free, 4), free[:4])
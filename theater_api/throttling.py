@@ -0,0 +1,127 @@
+from django.db import connections, router
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    SimpleRateThrottle,
+    UserRateThrottle,
+)
+
+from theater_api.models import ThrottleWindow
+
+# The hits of the previous window and of the current one (this request not
+# included) as of %(window)s, whichever window the row was last written in.
+PREVIOUS_HITS = """CASE
+    WHEN {table}.window_index = %(window)s THEN {table}.previous_hits
+    WHEN {table}.window_index = %(window)s - 1 THEN {table}.hits
+    ELSE 0
+END"""
+CURRENT_HITS = (
+    "CASE WHEN {table}.window_index = %(window)s THEN {table}.hits ELSE 0 END"
+)
+
+# Checks the limit and counts the hit in one statement, so a rejected request
+# is not counted. When the update is skipped the row is read back instead,
+# which tells wait() how long the client has to back off.
+HIT_SQL = """
+    WITH hit AS (
+        INSERT INTO {table} (key, window_index, hits, previous_hits)
+        VALUES (%(key)s, %(window)s, 1, 0)
+        ON CONFLICT (key) DO UPDATE SET
+            previous_hits = {previous},
+            hits = {current} + 1,
+            window_index = EXCLUDED.window_index
+        WHERE {previous} * %(overlap)s + {current} + 1 <= %(limit)s
+        RETURNING hits - 1 AS hits, previous_hits
+    )
+    SELECT true, hits, previous_hits FROM hit
+    UNION ALL
+    SELECT false, {current}, {previous} FROM {table}
+    WHERE key = %(key)s AND NOT EXISTS (SELECT 1 FROM hit)
+"""
+
+
+def register_hit(
+    key: str, window_index: int, overlap: float, limit: int
+) -> tuple[bool, int, int]:
+    """Count a hit unless it would exceed ``limit``.
+
+    Returns whether the hit was allowed with the hits of the current window
+    before it and of the previous window.
+    """
+    connection = connections[router.db_for_write(ThrottleWindow)]
+    table = connection.ops.quote_name(ThrottleWindow._meta.db_table)
+    sql = HIT_SQL.format(
+        table=table,
+        previous=PREVIOUS_HITS.format(table=table),
+        current=CURRENT_HITS.format(table=table),
+    )
+    params = {"key": key, "window": window_index, "overlap": overlap, "limit": limit}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """Sliding-window counter shared by all processes through the database.
+
+    Every key owns a single ThrottleWindow row holding the hits of the current
+    and the previous fixed window. The previous window is weighted by the part
+    of it still covered by the sliding window, so no request history is kept.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        window_index, self.elapsed = divmod(self.timer(), self.duration)
+        allowed, self.hits, self.previous_hits = register_hit(
+            self.key,
+            int(window_index),
+            1 - self.elapsed / self.duration,
+            self.num_requests,
+        )
+        return allowed
+
+    def wait(self):
+        remaining = self.duration - self.elapsed
+        if self.hits >= self.num_requests or not self.previous_hits:
+            return remaining
+
+        free_at = self.duration * (
+            1 - (self.num_requests - self.hits - 1) / self.previous_hits
+        )
+        return min(max(free_at - self.elapsed, 0), remaining)
+
+    @classmethod
+    def prune(cls):
+        """Delete the windows of every scope that ended before the previous one.
+
+        Such a row no longer weighs in allow_request and the next hit of its
+        key inserts a fresh one.
+        """
+        now = cls.timer()
+        deleted = 0
+        for scope, rate in cls.THROTTLE_RATES.items():
+            _, duration = cls.parse_rate(cls, rate)
+            if duration is None:
+                continue
+            prefix = cls.cache_format % {"scope": scope, "ident": ""}
+            deleted += ThrottleWindow.objects.filter(
+                key__startswith=prefix, window_index__lt=now // duration - 1
+            ).delete()[0]
+        return deleted
+
+
+class AnonSlidingWindowThrottle(SlidingWindowRateThrottle, AnonRateThrottle):
+    pass
+
+
+class UserSlidingWindowThrottle(SlidingWindowRateThrottle, UserRateThrottle):
+    pass
+
+
+class AvailableTicketsThrottle(SlidingWindowRateThrottle, UserRateThrottle):
+    scope = "available_tickets"
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.signing import BadSignature
+from django.db.models import F
+from django.utils import timezone
+
+from theater_api import device_signing
+from theater_api.models import Reservation, Ticket
+
+PASS_SALT = "theater_api.ticket_pass"
+# Passes stay valid this long after the last performance in them ends.
+PASS_GRACE = timedelta(hours=6)
+
+
+def ticket_history(user):
+    """The user's tickets with their performance, play and hall in one query."""
+    return (
+        Ticket.objects.filter(
+            reservation__user=user, reservation__status=Reservation.CONFIRMED
+        )
+        .annotate(
+            show_time=F("performance__show_time"),
+            play=F("performance__play__title"),
+            hall=F("performance__theater_hall__name"),
+        )
+        .values(
+            "id",
+            "row",
+            "seat",
+            "price",
+            "reservation_id",
+            "performance_id",
+            "show_time",
+            "play",
+            "hall",
+        )
+    )
+
+
+def export_passes(user):
+    """Sign the user's upcoming tickets into one compact payload.
+
+    The payload holds [ticket id, performance id, row, seat] for each ticket
+    and is signed with the device key, so door devices can check it with the
+    public key alone, without a connection to the API.
+    """
+    tickets = list(
+        Ticket.objects.filter(
+            reservation__user=user,
+            reservation__status=Reservation.CONFIRMED,
+            performance__show_time__gte=timezone.now(),
+        )
+        .order_by("performance__show_time", "id")
+        .values_list("id", "performance_id", "row", "seat", "performance__ends_at")
+    )
+    if not tickets:
+        return None
+    expires_at = max(ticket[4] for ticket in tickets) + PASS_GRACE
+    payload = device_signing.dumps(
+        {
+            "u": user.id,
+            "x": int(expires_at.timestamp()),
+            "t": [list(ticket[:4]) for ticket in tickets],
+        },
+        PASS_SALT,
+    )
+    return {"payload": payload, "count": len(tickets), "expires_at": expires_at}
+
+
+def read_passes(payload):
+    """Return the user and tickets of a payload, or None if it is not valid."""
+    try:
+        data = device_signing.loads(payload, PASS_SALT)
+    except BadSignature:
+        return None
+    expires_at = datetime.fromtimestamp(data["x"], dt_timezone.utc)
+    if expires_at < timezone.now():
+        return None
+    return {
+        "user": data["u"],
+        "expires_at": expires_at,
+        "tickets": [
+            {"id": ticket_id, "performance": performance_id, "row": row, "seat": seat}
+            for ticket_id, performance_id, row, seat in data["t"]
+        ],
+    }
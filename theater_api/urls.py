@@ -1,13 +1,22 @@
 from django.urls import path, include
 from rest_framework import routers
 
+from theater_api.metrics import metrics_view
 from theater_api.views import (
+    AnalyticsView,
+    DeviceKeyView,
+    MyTicketPassesView,
+    MyTicketsView,
     GenreViewSet,
     ActorViewSet,
     PlayViewSet,
     TheaterHallViewSet,
     PerformanceViewSet,
     ReservationViewSet,
+    PlaySearchView,
+    PriceTierViewSet,
+    SeatZoneViewSet,
+    WaitlistViewSet,
 )
 
 router = routers.DefaultRouter()
@@ -15,9 +24,18 @@ router.register("genres", GenreViewSet)
 router.register("actors", ActorViewSet)
 router.register("plays", PlayViewSet)
 router.register("theaterHalls", TheaterHallViewSet)
+router.register("priceTiers", PriceTierViewSet)
+router.register("seatZones", SeatZoneViewSet)
 router.register("performances", PerformanceViewSet)
 router.register("reservations", ReservationViewSet)
+router.register("waitlist", WaitlistViewSet)
 
 urlpatterns = [
+    path("_metrics", metrics_view, name="metrics"),
+    path("search/", PlaySearchView.as_view(), name="search"),
+    path("analytics/", AnalyticsView.as_view(), name="analytics"),
+    path("me/tickets/", MyTicketsView.as_view(), name="my-tickets"),
+    path("me/tickets/export/", MyTicketPassesView.as_view(), name="my-tickets-export"),
+    path("device-key/", DeviceKeyView.as_view(), name="device-key"),
     path("", include(router.urls)),
 ]
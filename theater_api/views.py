@@ -1,56 +1,152 @@
-from datetime import timedelta
+from datetime import datetime, time
 
-from django.db.models import Count, Q, F
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from drf_spectacular.utils import extend_schema, OpenApiParameter
+from django.utils.dateparse import parse_date, parse_datetime
+from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiParameter
 
-from rest_framework import viewsets
+from rest_framework import generics, mixins, serializers, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import (
+    IsAdminUser,
+    IsAuthenticatedOrReadOnly,
+    IsAuthenticated,
+)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_extensions.mixins import DetailSerializerMixin
 
+from theater_api import analytics, device_signing, door
+from theater_api.catalog import PlayImportSerializer, import_plays
+from theater_api.cancellation import (
+    cancel_performance,
+    cancel_reservation,
+    release_tickets,
+)
 from theater_api.models import (
     Genre,
     Actor,
     Play,
+    PriceTier,
+    SeatZone,
     TheaterHall,
     Performance,
     Reservation,
     Ticket,
+    WaitingRoom,
+    WaitlistEntry,
+)
+from theater_api.exceptions import OfferExpired
+from theater_api.heatmap import hall_heatmap
+from theater_api.metrics import SerializerTimingMixin
+from theater_api.pagination import (
+    PerformanceCursorPagination,
+    TicketHistoryPagination,
+)
+from theater_api.permissions import AdmittedFromWaitingRoom, IsAdminAllOrReadOnly
+from theater_api.popularity import week_most_popular
+from theater_api.pricing import price_maps
+from theater_api.recommendations import (
+    TOP_K,
+    most_booked_plays,
+    similar_plays,
 )
-from theater_api.permissions import IsAdminAllOrReadOnly
+from theater_api.search import search_plays
+from theater_api.throttling import AvailableTicketsThrottle
 from theater_api.serializers import (
     GenreSerializer,
     ActorSerializer,
     PlayListSerializer,
     PlayDetailSerializer,
+    PlaySearchSerializer,
+    PlayRecommendationSerializer,
+    PriceTierSerializer,
+    SeatZoneSerializer,
     TheaterHallSerializer,
     PerformanceListSerializer,
     PerformanceDetailSerializer,
     ReservationSerializer,
+    WaitlistEntrySerializer,
+    WaitingRoomSerializer,
+    QueueStatusSerializer,
+    TicketHistorySerializer,
+    TicketPassExportSerializer,
+    DeviceKeySerializer,
+)
+from theater_api.tasks import enqueue
+from theater_api.ticket_passes import export_passes, ticket_history
+from theater_api.waiting_room import (
+    TOKEN_HEADER,
+    forget_rate,
+    issue_token,
+    read_token,
+    token_status,
 )
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAuthenticated, IsAdminAllOrReadOnly)
 
 
-class ActorViewSet(viewsets.ModelViewSet):
+class ActorViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     queryset = Actor.objects.all().order_by("first_name")
     serializer_class = ActorSerializer
     permission_classes = (IsAuthenticated, IsAdminAllOrReadOnly)
 
 
-class TheaterHallViewSet(viewsets.ModelViewSet):
+class TheaterHallViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
     queryset = TheaterHall.objects.all()
     serializer_class = TheaterHallSerializer
     permission_classes = (IsAuthenticated, IsAdminAllOrReadOnly)
 
+    @extend_schema(
+        responses=inline_serializer(
+            name="HallHeatmap",
+            fields={
+                "hall": serializers.IntegerField(),
+                "rows": serializers.IntegerField(),
+                "seats_in_row": serializers.IntegerField(),
+                "performances": serializers.IntegerField(),
+                "tickets": serializers.IntegerField(),
+                "max": serializers.IntegerField(),
+                "counts": serializers.ListField(
+                    child=serializers.ListField(child=serializers.IntegerField()),
+                    help_text="tickets sold per seat, one list per row",
+                ),
+            },
+        )
+    )
+    @action(detail=True, methods=["get"])
+    def heatmap(self, request, pk=None):
+        return Response(hall_heatmap(self.get_object()))
+
+
+class PriceTierViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
+    queryset = PriceTier.objects.all()
+    serializer_class = PriceTierSerializer
+    permission_classes = (IsAuthenticated, IsAdminAllOrReadOnly)
+
+
+class SeatZoneViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
+    queryset = SeatZone.objects.select_related("tier")
+    serializer_class = SeatZoneSerializer
+    permission_classes = (IsAuthenticated, IsAdminAllOrReadOnly)
+
+    def get_queryset(self):
+        hall = self.request.query_params.get("hall")
+        if hall:
+            if not hall.isdigit():
+                raise ValidationError({"hall": "Expected a theater hall id."})
+            return self.queryset.filter(theater_hall_id=int(hall))
+        return self.queryset
 
-class PlayViewSet(DetailSerializerMixin, viewsets.ModelViewSet):
+
+class PlayViewSet(SerializerTimingMixin, DetailSerializerMixin, viewsets.ModelViewSet):
     queryset = Play.objects.prefetch_related("genres", "actors")
     serializer_detail_class = PlayDetailSerializer
     serializer_class = PlayListSerializer
@@ -84,34 +180,432 @@ class PlayViewSet(DetailSerializerMixin, viewsets.ModelViewSet):
 
     @staticmethod
     def get_week_most_popular_name() -> dict:
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        return (
-            Play.objects.annotate(
-                last_week_tickets=Count(
-                    "performances__tickets",
-                    filter=Q(performances__show_time__gte=seven_days_ago),
-                )
+        return week_most_popular()
+
+    @extend_schema(
+        request=PlayImportSerializer(many=True),
+        responses={
+            201: inline_serializer(
+                name="PlayImportResult",
+                fields={
+                    "created": serializers.IntegerField(),
+                    "genres_created": serializers.IntegerField(),
+                },
             )
-            .order_by("-last_week_tickets")
-            .values("id", "title")
-            .first()
+        },
+    )
+    @action(detail=False, methods=["post"], url_path="import")
+    def bulk_import(self, request):
+        serializer = PlayImportSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        plays, genres_created = import_plays(serializer.validated_data)
+        return Response(
+            {"created": len(plays), "genres_created": genres_created}, status=201
         )
 
+    @staticmethod
+    def _limit(request):
+        limit = request.query_params.get("limit", "10")
+        if not limit.isdigit() or not 1 <= int(limit) <= TOP_K:
+            raise ValidationError({"limit": f"Expected a number from 1 to {TOP_K}."})
+        return int(limit)
 
-class PerformanceViewSet(viewsets.ModelViewSet, DetailSerializerMixin):
-    queryset = Performance.objects.select_related(
-        "play", "theater_hall"
-    ).prefetch_related("tickets")
+    @staticmethod
+    def _scored_plays(scored):
+        plays = Play.objects.in_bulk([play_id for play_id, _ in scored])
+        results = []
+        for play_id, score in scored:
+            if play_id in plays:
+                plays[play_id].score = score
+                results.append(plays[play_id])
+        return PlayRecommendationSerializer(results, many=True).data
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="limit",
+                type=int,
+                location="query",
+                description=f"number of plays, 10 by default and {TOP_K} at most",
+            ),
+        ],
+        responses=PlayRecommendationSerializer(many=True),
+    )
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        play = self.get_object()
+        return Response(
+            self._scored_plays(similar_plays.similar(play.id, self._limit(request)))
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="limit",
+                type=int,
+                location="query",
+                description=f"number of plays, 10 by default and {TOP_K} at most",
+            ),
+        ],
+        responses=PlayRecommendationSerializer(many=True),
+    )
+    @action(detail=False, methods=["get"])
+    def recommended(self, request):
+        limit = self._limit(request)
+        booked = set(
+            Ticket.objects.filter(reservation__user=request.user)
+            .values_list("performance__play_id", flat=True)
+            .distinct()
+        )
+        scored = similar_plays.recommend(booked, limit)
+        if not scored:
+            scored = [(play_id, 0.0) for play_id in most_booked_plays(booked, limit)]
+        return Response(self._scored_plays(scored))
+
+
+class PlaySearchView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="q",
+                type=str,
+                location="query",
+                description="words to look up in play titles, descriptions, actors and genres; the last letters of a word and a single typo may be omitted",
+            ),
+        ],
+        responses=PlaySearchSerializer(many=True),
+    )
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response({"error": "Query parameter q is required."}, status=400)
+        return Response(PlaySearchSerializer(search_plays(query), many=True).data)
+
+
+class PerformanceViewSet(
+    SerializerTimingMixin, viewsets.ModelViewSet, DetailSerializerMixin
+):
+    queryset = Performance.objects.select_related("play", "theater_hall")
     serializer_class = PerformanceListSerializer
     serializer_detail_class = PerformanceDetailSerializer
     permission_classes = (IsAuthenticated, IsAdminAllOrReadOnly)
+    pagination_class = PerformanceCursorPagination
+
+    @staticmethod
+    def _params_to_ints(name, value):
+        try:
+            return [int(str_id) for str_id in value.split(",") if str_id.strip()]
+        except ValueError:
+            raise ValidationError({name: "Expected comma separated ids."})
+
+    @staticmethod
+    def _param_to_datetime(name, value, end_of_day=False):
+        try:
+            day = parse_date(value)
+            moment = parse_datetime(value) if day is None else None
+        except ValueError:
+            day = moment = None
+        if day is not None:
+            moment = datetime.combine(day, time.max if end_of_day else time.min)
+        if moment is None:
+            raise ValidationError({name: "Expected a date or a datetime."})
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def get_throttles(self):
+        # Queue status is read from the token alone and polled often.
+        if self.action == "queue" and self.request.method == "GET":
+            return []
+        return super().get_throttles()
+
+    def get_queryset(self):
+        queryset = self.queryset
+        if self.action != "list":
+            return queryset
+
+        queryset = queryset.annotate(
+            tickets_available=F("theater_hall__rows") * F("theater_hall__seats_in_row")
+            - F("sold_count")
+        )
+        params = self.request.query_params
+
+        date_from = params.get("date_from")
+        if date_from:
+            queryset = queryset.filter(
+                show_time__gte=self._param_to_datetime("date_from", date_from)
+            )
+
+        date_to = params.get("date_to")
+        if date_to:
+            queryset = queryset.filter(
+                show_time__lte=self._param_to_datetime(
+                    "date_to", date_to, end_of_day=True
+                )
+            )
+
+        play = params.get("play")
+        if play:
+            queryset = queryset.filter(play_id__in=self._params_to_ints("play", play))
+
+        hall = params.get("hall")
+        if hall:
+            queryset = queryset.filter(
+                theater_hall_id__in=self._params_to_ints("hall", hall)
+            )
+
+        genre = params.get("genre")
+        if genre:
+            queryset = queryset.filter(
+                play__in=Play.objects.filter(genres__name__iexact=genre.strip())
+            )
+
+        has_seats = params.get("has_seats")
+        if has_seats:
+            if has_seats.lower() in ("true", "1"):
+                queryset = queryset.filter(tickets_available__gt=0)
+            elif has_seats.lower() in ("false", "0"):
+                queryset = queryset.filter(tickets_available__lte=0)
+            else:
+                raise ValidationError({"has_seats": "Expected true or false."})
 
+        return queryset
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="date_from",
+                type=str,
+                location="query",
+                description="date or datetime, performances starting at or after it",
+            ),
+            OpenApiParameter(
+                name="date_to",
+                type=str,
+                location="query",
+                description="date (inclusive) or datetime, performances starting until it",
+            ),
+            OpenApiParameter(
+                name="play",
+                type=str,
+                location="query",
+                description="comma separated play ids",
+            ),
+            OpenApiParameter(
+                name="hall",
+                type=str,
+                location="query",
+                description="comma separated theater hall ids",
+            ),
+            OpenApiParameter(
+                name="genre",
+                type=str,
+                location="query",
+                description="genre name of the play",
+            ),
+            OpenApiParameter(
+                name="has_seats",
+                type=bool,
+                location="query",
+                description="only performances that still have (or have no) free seats",
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=201)
+
+    @extend_schema(
+        request=None,
+        responses=inline_serializer(
+            "PerformanceCancellation", {"released": serializers.IntegerField()}
+        ),
+    )
+    @action(detail=True, methods=["post"])
+    def cancel(self, request, pk=None):
+        return Response({"released": cancel_performance(self.get_object())})
+
+    @extend_schema(
+        responses=inline_serializer(
+            "DoorSnapshot",
+            {
+                "performance": serializers.IntegerField(),
+                "version": serializers.IntegerField(),
+                "count": serializers.IntegerField(),
+                "snapshot": serializers.CharField(
+                    help_text="signed [ticket id, row, seat, checked in] rows"
+                ),
+            },
+        )
+    )
+    @action(detail=True, methods=["get"], permission_classes=(IsAdminUser,))
+    def door(self, request, pk=None):
+        return Response(door.snapshot(self.get_object().id))
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="since",
+                type=int,
+                location="query",
+                required=True,
+                description="version of the scanner's snapshot or last delta",
+            ),
+        ],
+        responses=inline_serializer(
+            "DoorChanges",
+            {
+                "version": serializers.IntegerField(),
+                "checked_in": serializers.ListField(
+                    child=serializers.ListField(child=serializers.IntegerField())
+                ),
+                "cancelled": serializers.ListField(
+                    child=serializers.ListField(child=serializers.IntegerField())
+                ),
+            },
+        ),
+    )
     @action(
         detail=True,
         methods=["get"],
-        url_path="available-tickets",
+        url_path="door/changes",
+        permission_classes=(IsAdminUser,),
+    )
+    def door_changes(self, request, pk=None):
+        since = request.query_params.get("since", "")
+        if not since.isdigit():
+            raise ValidationError({"since": "Expected a version number."})
+        return Response(door.changes(self.get_object().id, int(since)))
+
+    @extend_schema(
+        request=inline_serializer(
+            "DoorCheckInRequest",
+            {"tickets": serializers.ListField(child=serializers.IntegerField())},
+        ),
+        responses=inline_serializer(
+            "DoorCheckIn",
+            {
+                "checked_in": serializers.ListField(child=serializers.IntegerField()),
+                "already_checked_in": serializers.ListField(
+                    child=serializers.IntegerField()
+                ),
+                "unknown": serializers.ListField(child=serializers.IntegerField()),
+            },
+        ),
+    )
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="door/check-in",
+        permission_classes=(IsAdminUser,),
+    )
+    def door_check_in(self, request, pk=None):
+        tickets = request.data.get("tickets")
+        if not isinstance(tickets, list) or not all(
+            isinstance(ticket, int) for ticket in tickets
+        ):
+            raise ValidationError({"tickets": "Expected a list of ticket ids."})
+        return Response(door.check_in(self.get_object().id, tickets))
+
+    @extend_schema(request=WaitlistEntrySerializer, responses=WaitlistEntrySerializer)
+    @action(detail=True, methods=["post"], permission_classes=(IsAuthenticated,))
+    def waitlist(self, request, pk=None):
+        performance = self.get_object()
+        serializer = WaitlistEntrySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        hall = performance.theater_hall
+        free = hall.rows * hall.seats_in_row - performance.sold_count
+        if free >= serializer.validated_data["seats"]:
+            raise ValidationError(
+                {"seats": "Enough seats are free, book them directly."}
+            )
+        try:
+            with transaction.atomic():
+                serializer.save(performance=performance, user=request.user)
+        except IntegrityError:
+            raise ValidationError(
+                {"performance": "You are already on the waitlist of this performance."}
+            )
+        return Response(serializer.data, status=201)
+
+    def waiting_room_performances(self, request):
+        return [int(self.kwargs["pk"])] if self.kwargs["pk"].isdigit() else []
+
+    @extend_schema(
+        request=None,
+        responses=QueueStatusSerializer,
+        parameters=[
+            OpenApiParameter(
+                name="X-Queue-Token",
+                type=str,
+                location="header",
+                description="queue token from an earlier POST, to check its status",
+            ),
+        ],
+    )
+    @action(
+        detail=True,
+        methods=["get", "post"],
         permission_classes=(IsAuthenticated,),
     )
+    def queue(self, request, pk=None):
+        token = request.META.get(TOKEN_HEADER, "")
+        data = read_token(token)
+        if (
+            data is None
+            or data["user"] != request.user.id
+            or str(data["performance"]) != pk
+        ):
+            if request.method == "GET":
+                return Response({"error": "Valid X-Queue-Token required."}, status=400)
+            token = issue_token(int(pk), request.user.id) if pk.isdigit() else None
+            if token is None:
+                return Response(
+                    {"error": "This performance has no waiting room."}, status=404
+                )
+            data = read_token(token)
+
+        queue_status = token_status(data)
+        response = Response(
+            QueueStatusSerializer({"token": token, **queue_status}).data,
+            status=201 if request.method == "POST" else 200,
+        )
+        if queue_status["wait"]:
+            response["Retry-After"] = str(queue_status["wait"])
+        return response
+
+    @extend_schema(request=WaitingRoomSerializer, responses=WaitingRoomSerializer)
+    @action(detail=True, methods=["put", "delete"], url_path="waiting-room")
+    def waiting_room(self, request, pk=None):
+        performance = self.get_object()
+        if request.method == "DELETE":
+            WaitingRoom.objects.filter(performance=performance).delete()
+            forget_rate(performance.id)
+            return Response(status=204)
+
+        room = WaitingRoom.objects.filter(performance=performance).first()
+        serializer = WaitingRoomSerializer(room, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(performance=performance)
+        forget_rate(performance.id)
+        return Response(serializer.data)
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path="available-tickets",
+        permission_classes=(IsAuthenticated, AdmittedFromWaitingRoom),
+        throttle_classes=(AvailableTicketsThrottle,),
+    )
     def available_tickets(self, request, pk=None):
         performance = self.get_object()
         hall = performance.theater_hall
@@ -131,15 +625,26 @@ class PerformanceViewSet(viewsets.ModelViewSet, DetailSerializerMixin):
         else:
             rows = range(1, hall.rows + 1)
 
+        if performance.sold_count >= hall.rows * hall.seats_in_row:
+            return Response([])
+
+        price_map = price_maps.get(hall)
+        multiplier = performance.price_multiplier
         all_seats = [
-            {"row": row, "seat": seat}
+            {
+                "row": row,
+                "seat": seat,
+                "price": str(price_map.price(row, seat, multiplier)),
+            }
             for row in rows
             for seat in range(1, hall.seats_in_row + 1)
         ]
 
-        booked = set(
-            Ticket.objects.filter(performance=performance).values_list("row", "seat")
-        )
+        # sold_count is not trusted to be exact here, the tickets are.
+        tickets = Ticket.objects.filter(performance=performance)
+        if row_filter:
+            tickets = tickets.filter(row=row_filter)
+        booked = set(tickets.values_list("row", "seat"))
 
         available = [
             seat for seat in all_seats if (seat["row"], seat["seat"]) not in booked
@@ -148,10 +653,237 @@ class PerformanceViewSet(viewsets.ModelViewSet, DetailSerializerMixin):
         return Response(available)
 
 
-class ReservationViewSet(viewsets.ModelViewSet):
-    queryset = Reservation.objects.select_related("user")
+class ReservationViewSet(SerializerTimingMixin, viewsets.ModelViewSet):
+    queryset = Reservation.objects.select_related("user").prefetch_related(
+        Prefetch(
+            "tickets",
+            queryset=Ticket.objects.select_related(
+                "performance__play", "performance__theater_hall"
+            ),
+        )
+    )
     serializer_class = ReservationSerializer
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, AdmittedFromWaitingRoom)
+
+    def waiting_room_performances(self, request):
+        if self.action != "create" or not isinstance(request.data, dict):
+            return []
+        tickets = request.data.get("tickets")
+        if not isinstance(tickets, list):
+            return []
+        return {
+            int(ticket["performance"])
+            for ticket in tickets
+            if isinstance(ticket, dict) and str(ticket.get("performance")).isdigit()
+        }
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False) or self.request.user.is_staff:
+            return self.queryset
+        return self.queryset.filter(
+            user=self.request.user, status=Reservation.CONFIRMED
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        cancel_reservation(instance)
+
+    @extend_schema(request=None, responses={204: None})
+    @action(detail=True, methods=["delete"], url_path=r"tickets/(?P<ticket_id>\d+)")
+    def cancel_ticket(self, request, pk=None, ticket_id=None):
+        reservation = self.get_object()
+        if not release_tickets(reservation.tickets.filter(id=ticket_id)):
+            raise NotFound("No such ticket in this reservation.")
+        return Response(status=204)
+
+
+class WaitlistViewSet(
+    SerializerTimingMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    queryset = WaitlistEntry.objects.all()
+    serializer_class = WaitlistEntrySerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return self.queryset
+        return self.queryset.filter(user=self.request.user).order_by("-created_at")
+
+    def perform_destroy(self, instance):
+        if instance.status == WaitlistEntry.OFFERED and instance.reservation:
+            cancel_reservation(instance.reservation)
+        instance.delete()
+
+    @extend_schema(request=None)
+    @action(detail=True, methods=["post"])
+    def accept(self, request, pk=None):
+        with transaction.atomic():
+            entry = get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+            if (
+                entry.status != WaitlistEntry.OFFERED
+                or entry.reservation_id is None
+                or entry.offer_expires_at < timezone.now()
+            ):
+                raise OfferExpired()
+            entry.status = WaitlistEntry.ACCEPTED
+            entry.save(update_fields=["status"])
+            Reservation.objects.filter(id=entry.reservation_id).update(
+                status=Reservation.CONFIRMED
+            )
+            # The held tickets were skipped by the sales rollups.
+            Performance.objects.filter(id=entry.performance_id).update(sales_dirty=True)
+            enqueue(
+                "send_reservation_confirmation", reservation_id=entry.reservation_id
+            )
+        return Response(self.get_serializer(entry).data)
+
+
+class AnalyticsView(APIView):
+    permission_classes = (IsAdminUser,)
+    group_choices = ("day", "play", "hall", "genre", "performance")
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="date_from",
+                type=str,
+                location="query",
+                required=True,
+                description="start of the period, a date (YYYY-MM-DD) or a datetime",
+            ),
+            OpenApiParameter(
+                name="date_to",
+                type=str,
+                location="query",
+                required=True,
+                description="end of the period, inclusive; with two dates the daily rollups are used, otherwise the hourly ones",
+            ),
+            OpenApiParameter(
+                name="group_by",
+                type=str,
+                location="query",
+                enum=group_choices,
+                description="day (default), play, hall, genre or performance",
+            ),
+        ],
+        responses=inline_serializer(
+            name="Analytics",
+            fields={
+                "sales": inline_serializer(
+                    name="AnalyticsSales",
+                    fields={
+                        "key": serializers.CharField(),
+                        "label": serializers.CharField(),
+                        "tickets": serializers.IntegerField(),
+                        "revenue": serializers.DecimalField(
+                            max_digits=12, decimal_places=2
+                        ),
+                    },
+                    many=True,
+                ),
+                "occupancy": inline_serializer(
+                    name="AnalyticsOccupancy",
+                    fields={
+                        "key": serializers.CharField(),
+                        "label": serializers.CharField(),
+                        "performances": serializers.IntegerField(),
+                        "sold": serializers.IntegerField(),
+                        "capacity": serializers.IntegerField(),
+                        "rate": serializers.FloatField(),
+                    },
+                    many=True,
+                ),
+            },
+        ),
+    )
+    def get(self, request):
+        params = request.query_params
+        date_from, date_to = params.get("date_from"), params.get("date_to")
+        if not date_from or not date_to:
+            return Response(
+                {"error": "Query parameters date_from and date_to are required."},
+                status=400,
+            )
+        group_by = params.get("group_by", "day")
+        if group_by not in self.group_choices:
+            raise ValidationError(
+                {"group_by": f"Expected one of {', '.join(self.group_choices)}."}
+            )
+
+        start = PerformanceViewSet._param_to_datetime("date_from", date_from)
+        end = PerformanceViewSet._param_to_datetime("date_to", date_to, end_of_day=True)
+        try:
+            days = parse_date(date_from), parse_date(date_to)
+        except ValueError:
+            days = None, None
+        if None in days:
+            sales = analytics.sales(start, end, group_by, daily=False)
+        else:
+            sales = analytics.sales(*days, group_by, daily=True)
+
+        return Response(
+            {
+                "sales": sales,
+                "occupancy": analytics.occupancy(start, end, group_by),
+            }
+        )
+
+
+class MyTicketsView(SerializerTimingMixin, generics.ListAPIView):
+    serializer_class = TicketHistorySerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = TicketHistoryPagination
+
+    @property
+    def past(self):
+        return self.request.query_params.get("when") == "past"
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Ticket.objects.none()
+        now = timezone.now()
+        tickets = ticket_history(self.request.user)
+        if self.past:
+            return tickets.filter(show_time__lt=now)
+        return tickets.filter(show_time__gte=now)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="when",
+                type=str,
+                location="query",
+                enum=("upcoming", "past"),
+                description="upcoming tickets, soonest first (default), or past ones, latest first",
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class MyTicketPassesView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(responses={200: TicketPassExportSerializer, 204: None})
+    def get(self, request):
+        passes = export_passes(request.user)
+        if passes is None:
+            return Response(status=204)
+        return Response(TicketPassExportSerializer(passes).data)
+
+
+class DeviceKeyView(APIView):
+    """Public key that checks ticket passes and door snapshots offline."""
+
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(responses=DeviceKeySerializer)
+    def get(self, request):
+        return Response(DeviceKeySerializer(device_signing.public_key_info()).data)
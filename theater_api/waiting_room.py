@@ -0,0 +1,123 @@
+import math
+import time
+from datetime import datetime, timezone
+
+from django.core import signing
+from django.db import transaction
+
+from theater_api.caches import TTLCache
+from theater_api.exceptions import NotAdmitted
+from theater_api.models import QueuePlace, WaitingRoom
+
+TOKEN_HEADER = "HTTP_X_QUEUE_TOKEN"
+TOKEN_SALT = "theater_api.waiting_room"
+# How long an admitted token may be used for booking.
+ADMISSION_WINDOW = 15 * 60
+
+# performance id -> admissions per minute, or 0 without a waiting room.
+_rates = TTLCache(maxsize=4096, ttl=10)
+
+
+def admission_rate(performance_id):
+    rate = _rates.get(performance_id)
+    if rate is None:
+        rate = (
+            WaitingRoom.objects.filter(performance_id=performance_id)
+            .values_list("admissions_per_minute", flat=True)
+            .first()
+        ) or 0
+        _rates.set(performance_id, rate)
+    return rate
+
+
+def forget_rate(performance_id):
+    _rates.pop(performance_id)
+
+
+def issue_token(performance_id, user_id):
+    """Token for the user's admission slot in the performance's waiting room.
+
+    Each user holds one slot per room: asking again returns it unchanged
+    until its admission window has passed, then the user queues anew. Slots
+    are spaced 60 / admissions_per_minute seconds apart and never lie in the
+    past, so an idle room does not admit a burst later on. Returns None if
+    the performance has no waiting room.
+    """
+    now = time.time()
+    with transaction.atomic():
+        room = (
+            WaitingRoom.objects.select_for_update()
+            .filter(performance_id=performance_id)
+            .first()
+        )
+        if room is None:
+            return None
+        place = QueuePlace.objects.filter(room=room, user_id=user_id).first()
+        if place is None or place.admit_at + ADMISSION_WINDOW < now:
+            room.issued += 1
+            room.next_slot = max(
+                room.next_slot + 60.0 / room.admissions_per_minute, now
+            )
+            room.save(update_fields=["issued", "next_slot"])
+            place, _ = QueuePlace.objects.update_or_create(
+                room=room,
+                user_id=user_id,
+                defaults={"position": room.issued, "admit_at": room.next_slot},
+            )
+    return signing.dumps(
+        {
+            "p": performance_id,
+            "u": user_id,
+            "n": place.position,
+            "a": place.admit_at,
+        },
+        salt=TOKEN_SALT,
+        compress=True,
+    )
+
+
+def read_token(token):
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+    return {
+        "performance": data["p"],
+        "user": data["u"],
+        "position": data["n"],
+        "admit_at": data["a"],
+    }
+
+
+def token_status(data):
+    wait = max(0, math.ceil(data["admit_at"] - time.time()))
+    return {
+        "position": data["position"],
+        "admit_at": datetime.fromtimestamp(data["admit_at"], timezone.utc),
+        "admitted": wait == 0,
+        "wait": wait,
+    }
+
+
+def request_tokens(request):
+    tokens = {}
+    for token in request.META.get(TOKEN_HEADER, "").split(","):
+        data = read_token(token.strip()) if token.strip() else None
+        if data is not None and data["user"] == request.user.id:
+            tokens[data["performance"]] = data
+    return tokens
+
+
+def check_admission(request, performance_ids):
+    """Raise NotAdmitted unless the request may book these performances."""
+    queued = [pk for pk in performance_ids if admission_rate(pk)]
+    if not queued:
+        return
+    tokens = request_tokens(request)
+    now = time.time()
+    for performance_id in queued:
+        token = tokens.get(performance_id)
+        if token is None or token["admit_at"] + ADMISSION_WINDOW < now:
+            raise NotAdmitted(performance_id)
+        if token["admit_at"] > now:
+            raise NotAdmitted(performance_id, token_status(token))
@@ -0,0 +1,169 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from theater_api.cancellation import release_tickets
+from theater_api.models import Performance, Reservation, Ticket, WaitlistEntry
+from theater_api.pricing import price_maps
+from theater_api.tasks import enqueue, task
+
+OFFER_TTL = timedelta(minutes=15)
+BATCH_SIZE = 100
+
+
+class SeatsTaken(Exception):
+    pass
+
+
+def free_seats(performance):
+    hall = performance.theater_hall
+    booked = set(
+        Ticket.objects.filter(performance=performance).values_list("row", "seat")
+    )
+    return [
+        (row, seat)
+        for row in range(1, hall.rows + 1)
+        for seat in range(1, hall.seats_in_row + 1)
+        if (row, seat) not in booked
+    ]
+
+
+def pick_seats(free, count):
+    """Prefer ``count`` adjacent seats in one row, else the first free ones."""
+    for start in range(len(free) - count + 1):
+        (first_row, first_seat), (last_row, last_seat) = (
+            free[start],
+            free[start + count - 1],
+        )
+        if first_row == last_row and last_seat - first_seat == count - 1:
+            return free[start : start + count]
+    return free[:count]
+
+
+def hold_seats(entry, performance, seats):
+    with transaction.atomic():
+        reservation = Reservation.objects.create(
+            user_id=entry.user_id, status=Reservation.HELD
+        )
+        Ticket.objects.bulk_create(
+            [
+                Ticket(
+                    row=row,
+                    seat=seat,
+                    performance=performance,
+                    reservation=reservation,
+                    price=price_maps.price(performance, row, seat),
+                )
+                for row, seat in seats
+            ],
+            ignore_conflicts=True,
+        )
+        # A concurrent booking won one of the seats.
+        if reservation.tickets.count() != len(seats):
+            raise SeatsTaken
+    return reservation
+
+
+def offer_seats(performance_id, batch_size=BATCH_SIZE):
+    """Offer free seats to the waiting users of a performance.
+
+    Entries are served in the order they joined. An entry that asks for more
+    seats than are free is skipped, so smaller requests behind it can still
+    be served. Returns the number of offers made.
+    """
+    performance = Performance.objects.select_related("theater_hall").get(
+        id=performance_id
+    )
+    hall = performance.theater_hall
+    free_count = hall.rows * hall.seats_in_row - performance.sold_count
+    if free_count <= 0:
+        return 0
+
+    offered = held = 0
+    with transaction.atomic():
+        entries = (
+            WaitlistEntry.objects.filter(
+                performance=performance,
+                status=WaitlistEntry.WAITING,
+                seats__lte=free_count,
+            )
+            .order_by("created_at", "id")
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        free = free_seats(performance)
+        for entry in entries:
+            if entry.seats > len(free):
+                continue
+            seats = pick_seats(free, entry.seats)
+            try:
+                reservation = hold_seats(entry, performance, seats)
+            except SeatsTaken:
+                free = free_seats(performance)
+                continue
+            free = [seat for seat in free if seat not in seats]
+            entry.status = WaitlistEntry.OFFERED
+            entry.reservation = reservation
+            entry.offer_expires_at = timezone.now() + OFFER_TTL
+            entry.save(update_fields=["status", "reservation", "offer_expires_at"])
+            enqueue("send_waitlist_offer", entry_id=entry.id)
+            offered += 1
+            held += len(seats)
+            if not free:
+                break
+        Performance.adjust_sold_counts({performance.id: held})
+    return offered
+
+
+def expire_offers(batch_size=BATCH_SIZE):
+    """Release the seats of offers past their deadline, a batch at a time."""
+    expired = 0
+    while True:
+        with transaction.atomic():
+            entries = list(
+                WaitlistEntry.objects.filter(
+                    status=WaitlistEntry.OFFERED,
+                    offer_expires_at__lt=timezone.now(),
+                )
+                .order_by("offer_expires_at")
+                .select_for_update(skip_locked=True)[:batch_size]
+            )
+            if not entries:
+                break
+            release_tickets(
+                Ticket.objects.filter(
+                    reservation_id__in=[entry.reservation_id for entry in entries]
+                )
+            )
+            WaitlistEntry.objects.filter(id__in=[entry.id for entry in entries]).update(
+                status=WaitlistEntry.EXPIRED, reservation=None
+            )
+            expired += len(entries)
+        if len(entries) < batch_size:
+            break
+    return expired
+
+
+@task
+def offer_released_seats(performance_id):
+    offer_seats(performance_id)
+
+
+@task
+def send_waitlist_offer(entry_id):
+    entry = (
+        WaitlistEntry.objects.select_related("user", "performance__play")
+        .filter(id=entry_id, status=WaitlistEntry.OFFERED)
+        .first()
+    )
+    if entry is None:
+        return
+    send_mail(
+        f"{entry.seats} seats for {entry.performance.play.title} are waiting for you",
+        f"Accept the offer before {entry.offer_expires_at:%Y-%m-%d %H:%M} "
+        f"or the seats go to the next person on the waitlist.",
+        settings.DEFAULT_FROM_EMAIL,
+        [entry.user.email],
+    )
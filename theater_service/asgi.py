@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "theater_service.settings")
 
 application = get_asgi_application()
+
+# Serve static files in development, as runserver did.
+if settings.DEBUG:
+    application = ASGIStaticFilesHandler(application)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 import os
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -26,10 +27,14 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+# "production" drops the debug tooling and enables the caching/pooling below.
+DJANGO_ENV = os.getenv("DJANGO_ENV", "development")
+PRODUCTION = DJANGO_ENV == "production"
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.getenv("ALLOWED_HOSTS", "").split(",") if host]
 
 # Application definition
 
@@ -40,16 +45,16 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "theater_api",
     "user",
     "rest_framework",
     "drf_spectacular",
-    "debug_toolbar",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "theater_api.middleware.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -58,6 +63,15 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+if PRODUCTION:
+    MIDDLEWARE.insert(0, "django.middleware.gzip.GZipMiddleware")
+else:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("theater_api.middleware.RequestMetricsMiddleware") + 1,
+        "debug_toolbar.middleware.DebugToolbarMiddleware",
+    )
+
 ROOT_URLCONF = "theater_service.urls"
 
 TEMPLATES = [
@@ -75,6 +89,18 @@ TEMPLATES = [
     },
 ]
 
+if PRODUCTION:
+    TEMPLATES[0]["APP_DIRS"] = False
+    TEMPLATES[0]["OPTIONS"]["loaders"] = [
+        (
+            "django.template.loaders.cached.Loader",
+            [
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ],
+        ),
+    ]
+
 WSGI_APPLICATION = "theater_service.wsgi.application"
 
 # Database
@@ -89,9 +115,40 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT"),
+        "CONN_MAX_AGE": int(os.getenv("CONN_MAX_AGE", 60 if PRODUCTION else 0)),
+        "CONN_HEALTH_CHECKS": PRODUCTION,
     }
 }
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+elif PRODUCTION:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR", "/var/tmp/theater_cache"),
+        }
+    }
+
+
+# Email
+# https://docs.djangoproject.com/en/5.2/topics/email/
+
+EMAIL_BACKEND = os.getenv(
+    "EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend"
+)
+EMAIL_HOST = os.getenv("EMAIL_HOST", "localhost")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", 25))
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "tickets@theater.local")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -111,6 +168,28 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+
+# Memory-hard hashers verify faster than PBKDF2 for the same cost to an
+# attacker. Argon2 needs argon2-cffi, scrypt only OpenSSL. Hashes made by
+# the other hashers are upgraded to the preferred one on the next login.
+PASSWORD_HASHER = os.getenv(
+    "PASSWORD_HASHER", "argon2" if find_spec("argon2") else "scrypt"
+)
+_PASSWORD_HASHERS = {
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+    "pbkdf2_sha256": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "pbkdf2_sha1": "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+]
+
+# Threads serving logins, registrations and password changes, see user.views.
+LOGIN_THREADS = int(os.getenv("LOGIN_THREADS", os.cpu_count() or 1))
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -141,13 +220,15 @@ AUTH_USER_MODEL = "user.User"
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "theater_api.throttling.AnonSlidingWindowThrottle",
+        "theater_api.throttling.UserSlidingWindowThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "10/day", "user": "30/day"},
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "10/day",
+        "user": "30/day",
+        "available_tickets": "120/hour",
+    },
+    "DEFAULT_AUTHENTICATION_CLASSES": ("user.authentication.CachedJWTAuthentication",),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -157,8 +238,27 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,
 }
 
+# Generated at image build time by `manage.py generate_schema`, see Dockerfile.
+OPENAPI_SCHEMA_FILE = Path(
+    os.getenv(
+        "OPENAPI_SCHEMA_FILE",
+        BASE_DIR / "openapi" / f"schema-{SPECTACULAR_SETTINGS['VERSION']}.yaml",
+    )
+)
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=180),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
 }
+
+# Sales rollups skip tickets younger than this, so booking transactions still
+# open with lower ticket ids can commit first. Keep it above the longest
+# booking transaction, see theater_api.analytics.
+SALES_SETTLE_SECONDS = int(os.getenv("SALES_SETTLE_SECONDS", 60))
+
+# Ed25519 private key (PEM) signing the payloads door scanners check offline,
+# see theater_api.device_signing. Scanners only get the public key.
+DEVICE_SIGNING_KEY = os.getenv("DEVICE_SIGNING_KEY")
+if not DEVICE_SIGNING_KEY and os.getenv("DEVICE_SIGNING_KEY_FILE"):
+    DEVICE_SIGNING_KEY = Path(os.getenv("DEVICE_SIGNING_KEY_FILE")).read_text()
@@ -0,0 +1,68 @@
+import time
+
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from theater_api.caches import TTLCache
+
+USER_FIELDS = ("id", "email", "is_staff", "is_superuser", "is_active")
+
+validated_tokens = TTLCache(maxsize=10000, ttl=300)
+# Saves and deletes invalidate records in this process; the short TTL bounds
+# how long other processes and queryset updates can serve a stale record.
+user_records = TTLCache(maxsize=10000, ttl=30)
+
+
+def invalidate_user(user_id):
+    user_records.pop(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that skips signature checks and the user query
+    for tokens and users seen recently by this process.
+
+    The user is rebuilt from the cached record with every other field
+    deferred, so saving it only writes the cached columns.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = validated_tokens.get(raw_token)
+        if token is None or token["exp"] <= time.time():
+            token = super().get_validated_token(raw_token)
+            validated_tokens.set(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        field_names = [
+            field.attname
+            for field in self.user_model._meta.concrete_fields
+            if field.attname in USER_FIELDS
+        ]
+        record = user_records.get(user_id)
+        if record is None:
+            record = (
+                self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values_list(*field_names)
+                .first()
+            )
+            if record is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_records.set(user_id, record)
+
+        user = self.user_model.from_db(
+            router.db_for_read(self.user_model), field_names, record
+        )
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
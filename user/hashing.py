@@ -0,0 +1,12 @@
+"""Password hashing for process pools, importable before Django is set up."""
+
+import django
+from django.contrib.auth.hashers import make_password
+
+
+def setup_worker():
+    django.setup()
+
+
+def hash_passwords(passwords):
+    return [make_password(password) for password in passwords]
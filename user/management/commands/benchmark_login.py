@@ -0,0 +1,91 @@
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from user.views import obtain_token_pair
+
+HASHERS = {
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+    "pbkdf2_sha256": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD = "benchmark-Passw0rd"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure token logins per second and per CPU second for each password "
+        "hasher. Test users are removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=200)
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--threads", type=int, default=settings.LOGIN_THREADS)
+        parser.add_argument(
+            "--hashers", nargs="+", choices=list(HASHERS), default=list(HASHERS)
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['logins']} logins, {options['threads']} threads, "
+            f"{os.cpu_count()} cores"
+        )
+        for algorithm in options["hashers"]:
+            with override_settings(PASSWORD_HASHERS=[HASHERS[algorithm]]):
+                try:
+                    encoded = make_password(PASSWORD)
+                except ValueError as error:
+                    self.stdout.write(f"{algorithm:<14} skipped: {error}")
+                    continue
+                self.run(algorithm, encoded, options)
+
+    def run(self, algorithm, encoded, options):
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f"benchmark-login-{n}@example.com", password=encoded)
+            for n in range(options["users"])
+        )
+
+        def login(index):
+            started = time.perf_counter()
+            status, _ = obtain_token_pair(
+                {"email": users[index % len(users)].email, "password": PASSWORD}
+            )
+            return status, time.perf_counter() - started
+
+        def worker(indexes):
+            try:
+                return [login(index) for index in indexes]
+            finally:
+                connection.close()
+
+        threads = options["threads"]
+        chunks = [range(n, options["logins"], threads) for n in range(threads)]
+        try:
+            cpu_started = time.process_time()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                results = [
+                    result for chunk in executor.map(worker, chunks) for result in chunk
+                ]
+            elapsed = time.perf_counter() - started
+            cpu = time.process_time() - cpu_started
+
+            failed = sum(status != 200 for status, _ in results)
+            latencies = [latency for _, latency in results]
+            self.stdout.write(
+                f"{algorithm:<14} {len(results) / elapsed:8.1f} logins/s  "
+                f"{len(results) / cpu:8.1f} logins per CPU second  "
+                f"p50 {statistics.median(latencies) * 1000:.1f} ms  "
+                f"failed {failed}"
+            )
+        finally:
+            get_user_model().objects.filter(id__in=[user.id for user in users]).delete()
@@ -0,0 +1,141 @@
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from user.hashing import hash_passwords, setup_worker
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Create user accounts in bulk from a CSV file with an email and an "
+        "optional password column. Existing emails are skipped and users "
+        "without a password get an unusable one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row")
+        parser.add_argument("--group", help="add the new users to this group")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="processes hashing the passwords",
+        )
+
+    def read_rows(self, path):
+        try:
+            with open(path, newline="", encoding="utf-8") as file:
+                reader = csv.DictReader(file)
+                if "email" not in (reader.fieldnames or ()):
+                    raise CommandError(f"{path} has no email column.")
+                rows = {}
+                for row in reader:
+                    email = get_user_model().objects.normalize_email(
+                        row["email"].strip()
+                    )
+                    if email:
+                        rows[email] = row.get("password") or None
+                return list(rows.items())
+        except OSError as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+
+    def known_emails(self, emails):
+        return set(
+            get_user_model()
+            .objects.filter(email__in=emails)
+            .values_list("email", flat=True)
+        )
+
+    def insert(self, users):
+        """Insert the users and return the ones this run created.
+
+        Emails registered since known_emails() make the batch insert fail,
+        and the users are then inserted one by one.
+        """
+        User = get_user_model()
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+            created = users
+        except IntegrityError:
+            created = []
+            for user in users:
+                # Undo what a partly run bulk_create set before rolling back.
+                user.pk = None
+                user._state.adding = True
+                try:
+                    with transaction.atomic():
+                        user.save(force_insert=True)
+                except IntegrityError:
+                    continue
+                created.append(user)
+        if any(user.pk is None for user in created):
+            # The backend does not return the ids of bulk inserted rows.
+            return list(User.objects.filter(email__in=[user.email for user in created]))
+        return created
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        rows = self.read_rows(options["path"])
+        group = None
+        if options["group"]:
+            group, _ = Group.objects.get_or_create(name=options["group"])
+
+        batch_size = options["batch_size"]
+        created = skipped = 0
+        # Spawned workers do not inherit the open database connection.
+        with ProcessPoolExecutor(
+            max_workers=options["processes"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_worker,
+        ) as executor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start : start + batch_size]
+                # Hashing is the expensive part, so known emails skip it.
+                existing = self.known_emails([email for email, _ in batch])
+                batch = [row for row in batch if row[0] not in existing]
+                skipped += len(existing)
+                if not batch:
+                    continue
+
+                passwords = [password for _, password in batch]
+                chunk = max(1, len(passwords) // options["processes"])
+                encoded = [
+                    password
+                    for hashed in executor.map(
+                        hash_passwords,
+                        [
+                            passwords[n : n + chunk]
+                            for n in range(0, len(passwords), chunk)
+                        ],
+                    )
+                    for password in hashed
+                ]
+                with transaction.atomic():
+                    new_users = self.insert(
+                        [
+                            User.objects.build_user(email, password)
+                            for (email, _), password in zip(batch, encoded)
+                        ]
+                    )
+                    if group is not None:
+                        User.groups.through.objects.bulk_create(
+                            [
+                                User.groups.through(user_id=user.pk, group_id=group.id)
+                                for user in new_users
+                            ],
+                            ignore_conflicts=True,
+                        )
+                created += len(new_users)
+                skipped += len(batch) - len(new_users)
+
+        self.stdout.write(f"{created} users created, {skipped} skipped.")
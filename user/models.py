@@ -10,11 +10,15 @@ class UserManager(BaseUserManager):
 
     use_in_migrations = True
 
-    def _create_user(self, email, password, **extra_fields):
+    def build_user(self, email, encoded_password, **extra_fields):
+        """An unsaved user with an already hashed password, for bulk_create."""
         if not email:
             raise ValueError("The given email must be set")
         email = self.normalize_email(email)
-        user = self.model(email=email, **extra_fields)
+        return self.model(email=email, password=encoded_password, **extra_fields)
+
+    def _create_user(self, email, password, **extra_fields):
+        user = self.build_user(email, None, **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
         return user
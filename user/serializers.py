@@ -1,22 +1,36 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 
+from user.exceptions import EmailTaken
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
         fields = ("id", "email", "password", "is_staff")
         read_only_fields = ("is_staff",)
-        extra_kwargs = {"password": {"write_only": True, "min_length": 5}}
+        extra_kwargs = {
+            "password": {"write_only": True, "min_length": 5},
+            # The unique index rejects duplicates, see create and update.
+            "email": {"validators": []},
+        }
 
     def create(self, validated_data):
-        return get_user_model().objects.create_user(**validated_data)
+        try:
+            with transaction.atomic():
+                return get_user_model().objects.create_user(**validated_data)
+        except IntegrityError:
+            raise EmailTaken()
 
     def update(self, instance, validated_data):
         password = validated_data.pop("password", None)
-        user = super().update(instance, validated_data)
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
+        try:
+            with transaction.atomic():
+                user = super().update(instance, validated_data)
+        except IntegrityError:
+            raise EmailTaken()
 
         return user
@@ -1,3 +1,305 @@
-from django.test import TestCase
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, APITransactionTestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from theater_api.throttling import SlidingWindowRateThrottle
+from user.authentication import CachedJWTAuthentication, user_records
+from user.serializers import UserSerializer
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_records.clear()
+        self.user = User.objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.authentication = CachedJWTAuthentication()
+        token = AccessToken.for_user(self.user)
+        self.request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+
+    def test_user_loaded_once(self):
+        with self.assertNumQueries(1):
+            user, _ = self.authentication.authenticate(self.request)
+        with self.assertNumQueries(0):
+            user, _ = self.authentication.authenticate(self.request)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.email, "user@example.com")
+        self.assertFalse(user.is_staff)
+
+    def test_cached_user_saves_only_loaded_fields(self):
+        user, _ = self.authentication.authenticate(self.request)
+        user.is_staff = True
+        user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_staff)
+        self.assertTrue(self.user.check_password("testpass123"))
+
+    def test_update_invalidates_cached_user(self):
+        self.authentication.authenticate(self.request)
+        serializer = UserSerializer(
+            self.user, data={"email": "new@example.com"}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        with self.assertNumQueries(1):
+            user, _ = self.authentication.authenticate(self.request)
+        self.assertEqual(user.email, "new@example.com")
+
+    def test_orm_save_invalidates_cached_user(self):
+        self.authentication.authenticate(self.request)
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate(self.request)
+
+    def test_delete_invalidates_cached_user(self):
+        self.authentication.authenticate(self.request)
+        User.objects.filter(pk=self.user.pk).delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate(self.request)
+
+
+class TokenLoginTests(TransactionTestCase):
+    url = reverse("token_obtain_pair")
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+
+    def login(self, password="testpass123", **extra):
+        return self.client.post(
+            self.url,
+            {"email": "user@example.com", "password": password, **extra},
+            content_type="application/json",
+        )
+
+    def test_login_returns_token_pair(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        token = AccessToken(response.json()["access"])
+        self.assertEqual(token["user_id"], self.user.id)
+        self.assertIn("refresh", response.json())
+
+    def test_wrong_password(self):
+        response = self.login(password="wrong")
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("detail", response.json())
+
+    def test_missing_password(self):
+        response = self.client.post(
+            self.url, {"email": "user@example.com"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.json())
+
+    def test_form_encoded_login(self):
+        response = self.client.post(
+            self.url, {"email": "user@example.com", "password": "testpass123"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_pbkdf2_hash_upgraded_on_login(self):
+        with override_settings(
+            PASSWORD_HASHERS=["django.contrib.auth.hashers.PBKDF2PasswordHasher"]
+        ):
+            self.user.set_password("testpass123")
+            self.user.save()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith(f"{settings.PASSWORD_HASHER}$"))
+
+    @mock.patch.object(
+        SlidingWindowRateThrottle, "THROTTLE_RATES", {"anon": "2/day", "user": None}
+    )
+    def test_login_is_throttled(self):
+        for _ in range(2):
+            self.login(password="wrong")
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+
+class RegisterTests(TransactionTestCase):
+    url = reverse("user:register")
+
+    def register(self, email="new@example.com", password="testpass123"):
+        return self.client.post(
+            self.url,
+            {"email": email, "password": password},
+            content_type="application/json",
+        )
+
+    def test_register(self):
+        response = self.register()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["email"], "new@example.com")
+        self.assertNotIn("password", response.json())
+        self.assertTrue(User.objects.get().check_password("testpass123"))
+
+    def test_duplicate_email_conflicts(self):
+        self.register()
+        response = self.register()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_invalid_data(self):
+        response = self.register(email="not an email", password="123")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {"email", "password"})
+
+
+class MeTests(APITransactionTestCase):
+    url = reverse("user:me")
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_retrieve(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response.data,
+            {"id": self.user.id, "email": "user@example.com", "is_staff": False},
+        )
+
+    def test_update(self):
+        response = self.client.patch(
+            self.url, {"email": "renamed@example.com", "password": "newpass123"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, "renamed@example.com")
+        self.assertTrue(self.user.check_password("newpass123"))
+
+    def test_password_change_is_hashed_on_the_login_pool(self):
+        threads = []
+        set_password = User.set_password
+
+        def record_thread(user, raw_password):
+            threads.append(threading.current_thread().name)
+            set_password(user, raw_password)
+
+        with mock.patch.object(User, "set_password", record_thread):
+            response = self.client.patch(self.url, {"password": "newpass123"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(threads[0].startswith("login"))
+
+    def test_taken_email_conflicts(self):
+        User.objects.create_user(email="taken@example.com", password="testpass123")
+        response = self.client.patch(self.url, {"email": "taken@example.com"})
+        self.assertEqual(response.status_code, 409)
+
+    def test_cannot_make_self_staff(self):
+        self.client.patch(self.url, {"is_staff": True})
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_staff)
+
+
+class ProvisionUsersTests(TestCase):
+    def provision(self, rows, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as file:
+            file.write("\n".join(rows))
+            file.flush()
+            out = StringIO()
+            call_command(
+                "provision_users", file.name, "--processes", "1", *args, stdout=out
+            )
+        return out.getvalue()
+
+    def test_provision_users(self):
+        User.objects.create_user(email="old@acme.com", password="testpass123")
+        out = self.provision(
+            [
+                "email,password",
+                "a@acme.com,secret123",
+                "b@acme.com,",
+                "old@acme.com,other123",
+                "c@acme.com,secret456",
+            ],
+            "--group",
+            "Acme",
+            "--batch-size",
+            "2",
+        )
+        self.assertEqual(out.strip(), "3 users created, 1 skipped.")
+        self.assertTrue(
+            User.objects.get(email="a@acme.com").check_password("secret123")
+        )
+        self.assertFalse(User.objects.get(email="b@acme.com").has_usable_password())
+        self.assertTrue(
+            User.objects.get(email="old@acme.com").check_password("testpass123")
+        )
+        self.assertEqual(
+            sorted(
+                Group.objects.get(name="Acme").user_set.values_list("email", flat=True)
+            ),
+            ["a@acme.com", "b@acme.com", "c@acme.com"],
+        )
+
+    def test_concurrently_registered_email_is_skipped(self):
+        User.objects.create_user(email="b@acme.com", password="testpass123")
+        # As if b@acme.com registered after the command looked up known emails.
+        with mock.patch(
+            "user.management.commands.provision_users.Command.known_emails",
+            return_value=set(),
+        ):
+            out = self.provision(
+                ["email,password", "a@acme.com,secret123", "b@acme.com,other123"],
+                "--group",
+                "Acme",
+            )
+        self.assertEqual(out.strip(), "1 users created, 1 skipped.")
+        self.assertEqual(
+            list(
+                Group.objects.get(name="Acme").user_set.values_list("email", flat=True)
+            ),
+            ["a@acme.com"],
+        )
+        self.assertTrue(
+            User.objects.get(email="b@acme.com").check_password("testpass123")
+        )
+
+    def test_fallback_forgets_ids_of_a_rolled_back_batch(self):
+        taken = User.objects.create_user(email="b@acme.com", password="testpass123")
+
+        def partial_bulk_create(users, *args, **kwargs):
+            # A first batch got its ids before a later one failed.
+            users[0].pk = taken.pk
+            users[0]._state.adding = False
+            raise IntegrityError
+
+        with mock.patch.object(
+            type(User.objects), "bulk_create", side_effect=partial_bulk_create
+        ):
+            out = self.provision(["email,password", "a@acme.com,secret123"])
+        self.assertEqual(out.strip(), "1 users created, 0 skipped.")
+        self.assertTrue(User.objects.filter(email="a@acme.com").exists())
+
+    def test_missing_email_column(self):
+        with self.assertRaises(CommandError):
+            self.provision(["name", "someone"])
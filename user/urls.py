@@ -0,0 +1,10 @@
+from django.urls import path
+
+from user.views import MeView, RegisterView, off_request_thread
+
+app_name = "user"
+
+urlpatterns = [
+    path("register/", off_request_thread(RegisterView.as_view()), name="register"),
+    path("me/", off_request_thread(MeView.as_view()), name="me"),
+]
@@ -1,3 +1,61 @@
-from django.shortcuts import render
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework import generics
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from theater_api.metrics import SerializerTimingMixin
+from user.serializers import UserSerializer
+
+# Password hashing is CPU bound, so logins, registrations and password changes
+# get a pool of their own instead of tying up the threads that serve the other
+# requests.
+login_executor = ThreadPoolExecutor(
+    max_workers=settings.LOGIN_THREADS, thread_name_prefix="login"
+)
+
+
+def off_request_thread(view):
+    """Serve the sync ``view`` from the login pool.
+
+    Under ASGI Django runs sync views on one shared thread, where a password
+    hash would hold up every other sync view. The async wrapper hands the
+    whole request to the pool instead. It keeps the attributes of a DRF view,
+    so drf-spectacular still documents the endpoint.
+    """
+
+    def serve(request, *args, **kwargs):
+        close_old_connections()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            close_old_connections()
+
+    run = sync_to_async(serve, thread_sensitive=False, executor=login_executor)
+
+    @functools.wraps(view)
+    async def offloaded(request, *args, **kwargs):
+        return await run(request, *args, **kwargs)
+
+    return offloaded
+
+
+obtain_token = off_request_thread(TokenObtainPairView.as_view())
+
+
+class RegisterView(SerializerTimingMixin, generics.CreateAPIView):
+    serializer_class = UserSerializer
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+
+class MeView(SerializerTimingMixin, generics.RetrieveUpdateAPIView):
+    serializer_class = UserSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_object(self):
+        return self.request.user